@@ -1,12 +1,19 @@
 """Claude-powered competitive intelligence analysis agent."""
 
 import json
+import logging
+from collections.abc import Callable, Iterable, Iterator
 from typing import Any
+from urllib.parse import urlparse
 
 from anthropic import Anthropic
 from pydantic import BaseModel
 
+from compress import compress_text, find_boilerplate, strip_html
 from config import settings
+from rate_limit import anthropic_limiter
+
+logger = logging.getLogger(__name__)
 
 # HappyCo context for the agent
 HAPPYCO_CONTEXT = """
@@ -43,8 +50,17 @@ class IntelAnalysis(BaseModel):
     source_url: str | None = None
 
 
+def _site(item: dict[str, Any]) -> str:
+    """Host an item was scraped from; boilerplate is only detected among pages of one site."""
+    return urlparse(item.get("url") or "").netloc.lower()
+
+
 def _build_user_message(items: list[dict[str, Any]], competitor: str) -> str:
-    """Build the user message from raw scraped data."""
+    """Build the user message from raw scraped data (HTML stripped, content compressed)."""
+    pages_by_site: dict[str, list[str | None]] = {}
+    for item in items:
+        pages_by_site.setdefault(_site(item), []).append(item.get("raw_content"))
+    boilerplate = {site: find_boilerplate(pages) for site, pages in pages_by_site.items()}
     formatted = []
     for i, item in enumerate(items, 1):
         parts = [f"Item {i}:"]
@@ -53,16 +69,172 @@ def _build_user_message(items: list[dict[str, Any]], competitor: str) -> str:
         if item.get("url"):
             parts.append(f"  URL: {item['url']}")
         if item.get("snippet"):
-            parts.append(f"  Snippet: {item['snippet']}")
+            parts.append(f"  Snippet: {strip_html(item['snippet'])}")
         if item.get("date"):
             parts.append(f"  Date: {item['date']}")
-        if item.get("raw_content"):
-            parts.append(f"  Content: {item['raw_content'][:2000]}")  # Limit length
+        content = compress_text(item.get("raw_content"), boilerplate=boilerplate[_site(item)])
+        if content:
+            parts.append(f"  Content: {content}")
         formatted.append("\n".join(parts))
     body = "\n\n".join(formatted)
     return f"Competitor: {competitor}\n\nAnalyze the following scraped data and return a JSON array of intel analyses.\nOne analysis per item. Use the exact keys: summary, threat_level, threat_reason, happyco_response, signal_type, confidence, source_url.\n\n{body}\n\nReturn ONLY valid JSON. No markdown or extra text."
 
 
+def _iter_json_objects(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Yield the raw text of each top-level JSON object as soon as its closing brace arrives.
+
+    Works on a stream of text chunks, so objects inside a JSON array are emitted while
+    the rest of the array is still being generated. Anything outside an object (array
+    brackets, commas, markdown code fences) is skipped; a bare object is yielded as-is.
+    """
+    buf: list[str] = []
+    depth = 0
+    in_string = False
+    escaped = False
+    for chunk in chunks:
+        for ch in chunk:
+            if depth == 0:
+                if ch == "{":
+                    depth = 1
+                    buf = [ch]
+                continue
+            buf.append(ch)
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    yield "".join(buf)
+                    buf = []
+
+
+def _to_analysis(raw: str, item: dict[str, Any] | None) -> IntelAnalysis:
+    """Parse one JSON object into IntelAnalysis, filling source_url from the scraped item."""
+    d = json.loads(raw)
+    if item and item.get("url") and not d.get("source_url"):
+        d = {**d, "source_url": item["url"]}
+    return IntelAnalysis(**d)
+
+
+def _parse_batch(
+    raws: Iterable[str],
+    items: list[dict[str, Any]],
+) -> Iterator[tuple[int, IntelAnalysis | None]]:
+    """Yield (position, analysis) per object; analysis is None when the object is malformed or invalid."""
+    for i, raw in enumerate(raws):
+        if i >= len(items):
+            break
+        try:
+            yield i, _to_analysis(raw, items[i])
+        except ValueError as e:  # JSONDecodeError and pydantic ValidationError
+            logger.warning("Discarding invalid analysis for item %d: %s", i, e)
+            yield i, None
+
+
+def _analyze_with_retries(
+    items: list[dict[str, Any]],
+    run_batch: Callable[[list[dict[str, Any]]], Iterable[str]],
+) -> Iterator[tuple[int, IntelAnalysis]]:
+    """
+    Salvage every valid analysis, then re-submit only the missing or invalid items.
+
+    run_batch sends one request for the given items and returns the raw JSON objects
+    from the response. Follow-up requests contain just the items that failed, up to
+    settings.agent_retry_budget extra requests; items still failing after that are dropped.
+    """
+    remaining = list(range(len(items)))
+    for attempt in range(settings.agent_retry_budget + 1):
+        subset = [items[i] for i in remaining]
+        succeeded: set[int] = set()
+        for j, analysis in _parse_batch(run_batch(subset), subset):
+            if analysis is not None:
+                succeeded.add(j)
+                yield remaining[j], analysis
+        remaining = [idx for j, idx in enumerate(remaining) if j not in succeeded]
+        if not remaining:
+            return
+        logger.warning(
+            "Agent attempt %d left %d of %d items without a valid analysis",
+            attempt + 1,
+            len(remaining),
+            len(items),
+        )
+    logger.error("Giving up on %d items after retry budget exhausted", len(remaining))
+
+
+def _needs_escalation(analysis: IntelAnalysis) -> bool:
+    """Fast-tier results that look MEDIUM/HIGH or are low-confidence go to the main model."""
+    levels = {lvl.strip().upper() for lvl in settings.agent_escalation_threat_levels.split(",") if lvl.strip()}
+    return (
+        analysis.threat_level.upper() in levels
+        or analysis.confidence < settings.agent_escalation_min_confidence
+    )
+
+
+BatchRunner = Callable[[str], Callable[[list[dict[str, Any]]], Iterable[str]]]
+
+
+def _analyze_tiered(
+    items: list[dict[str, Any]],
+    batch_runner: BatchRunner,
+) -> Iterator[tuple[int, IntelAnalysis]]:
+    """
+    Analyze items with settings.agent_fast_model first, escalating only where needed.
+
+    Fast-tier analyses that stay LOW with enough confidence are final. Escalated items,
+    and items the fast model could not analyze, are re-analyzed by settings.agent_model;
+    if that fails for an item, its fast-tier analysis is kept.
+    """
+    fast_results: dict[int, IntelAnalysis] = {}
+    settled: set[int] = set()
+    for i, analysis in _analyze_with_retries(items, batch_runner(settings.agent_fast_model)):
+        if _needs_escalation(analysis):
+            fast_results[i] = analysis
+        else:
+            settled.add(i)
+            yield i, analysis
+
+    escalated = [i for i in range(len(items)) if i not in settled]
+    if not escalated:
+        return
+    logger.info("Escalating %d of %d items to %s", len(escalated), len(items), settings.agent_model)
+    done: set[int] = set()
+    for j, analysis in _analyze_with_retries([items[i] for i in escalated], batch_runner(settings.agent_model)):
+        done.add(j)
+        yield escalated[j], analysis
+    for j, i in enumerate(escalated):
+        if j not in done and i in fast_results:
+            yield i, fast_results[i]
+
+
+def _analyze(
+    items: list[dict[str, Any]],
+    batch_runner: BatchRunner,
+) -> Iterator[tuple[int, IntelAnalysis]]:
+    if settings.agent_tiering_enabled:
+        yield from _analyze_tiered(items, batch_runner)
+    else:
+        yield from _analyze_with_retries(items, batch_runner(settings.agent_model))
+
+
+def _get_client() -> Anthropic:
+    api_key = settings.anthropic_api_key
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY is required for agent analysis")
+    # Retries are owned by the shared adaptive limiter, not the SDK
+    return Anthropic(api_key=api_key, max_retries=0)
+
+
 def analyze_scraped_data(
     items: list[dict[str, Any]],
     competitor: str,
@@ -70,48 +242,78 @@ def analyze_scraped_data(
     """
     Analyze raw scraped data with Claude and return structured intel.
 
+    Malformed or truncated output is salvaged per item; only the items without a valid
+    analysis are re-requested (see _analyze_with_retries). With tiering enabled, a fast
+    model handles every item and only likely MEDIUM/HIGH or low-confidence items are
+    escalated to the main model (see _analyze_tiered).
+
     Args:
         items: List of dicts with title, url, snippet, date, optionally raw_content
         competitor: Competitor name (e.g. AppFolio, Buildium)
 
     Returns:
-        List of IntelAnalysis, one per input item
+        List of IntelAnalysis in input order, one per item that was analyzed successfully
     """
     if not items:
         return []
 
-    api_key = settings.anthropic_api_key
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY is required for agent analysis")
+    client = _get_client()
 
-    client = Anthropic(api_key=api_key)
-    user_message = _build_user_message(items, competitor)
+    def batch_runner(model: str) -> Callable[[list[dict[str, Any]]], Iterable[str]]:
+        def run_batch(batch: list[dict[str, Any]]) -> Iterable[str]:
+            user_message = _build_user_message(batch, competitor)
+            raw = anthropic_limiter.call(
+                lambda: client.messages.with_raw_response.create(
+                    model=model,
+                    max_tokens=4096,
+                    system=HAPPYCO_CONTEXT,
+                    messages=[{"role": "user", "content": user_message}],
+                )
+            )
+            response = raw.parse()
+            text = ""
+            for block in response.content:
+                if hasattr(block, "text"):
+                    text += block.text
+            return _iter_json_objects([text])
 
-    response = client.messages.create(
-        model="claude-sonnet-4-5",
-        max_tokens=4096,
-        system=HAPPYCO_CONTEXT,
-        messages=[{"role": "user", "content": user_message}],
-    )
+        return run_batch
+
+    results = dict(_analyze(items, batch_runner))
+    return [results[i] for i in sorted(results)]
+
+
+def stream_scraped_data(
+    items: list[dict[str, Any]],
+    competitor: str,
+) -> Iterator[tuple[int, IntelAnalysis]]:
+    """
+    Streaming variant of analyze_scraped_data.
+
+    Consumes the Claude response as it is generated and yields (item_index, IntelAnalysis)
+    as soon as each object in the JSON array closes, so callers can embed and store
+    earlier items while later ones are still being written. Items that fail validation
+    are re-requested after the stream ends, and escalated items are yielded as the
+    main model finishes them.
+    """
+    if not items:
+        return
+
+    client = _get_client()
+
+    def batch_runner(model: str) -> Callable[[list[dict[str, Any]]], Iterator[str]]:
+        def run_batch(batch: list[dict[str, Any]]) -> Iterator[str]:
+            user_message = _build_user_message(batch, competitor)
+            with anthropic_limiter.stream(
+                lambda: client.messages.stream(
+                    model=model,
+                    max_tokens=4096,
+                    system=HAPPYCO_CONTEXT,
+                    messages=[{"role": "user", "content": user_message}],
+                )
+            ) as stream:
+                yield from _iter_json_objects(stream.text_stream)
+
+        return run_batch
 
-    text = ""
-    for block in response.content:
-        if hasattr(block, "text"):
-            text += block.text
-
-    # Parse JSON from response (handle potential markdown code blocks)
-    text = text.strip()
-    if text.startswith("```"):
-        lines = text.split("\n")
-        text = "\n".join(lines[1:-1] if lines[-1].strip() == "```" else lines[1:])
-    data = json.loads(text)
-
-    if isinstance(data, dict):
-        data = [data]
-
-    analyses = []
-    for i, d in enumerate(data):
-        if i < len(items) and items[i].get("url") and not d.get("source_url"):
-            d = {**d, "source_url": items[i]["url"]}
-        analyses.append(IntelAnalysis(**d))
-    return analyses
+    yield from _analyze(items, batch_runner)
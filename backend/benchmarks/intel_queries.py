@@ -0,0 +1,195 @@
+"""Benchmark /intel listing and semantic search queries with and without indexes.
+
+Seeds a scratch table shaped like intel_items (random competitors, signal types,
+timestamps and random embeddings) at each size, times the hot-path queries before
+and after creating the indexes from migrations/004_intel_indexes.sql and
+005_intel_keyset_indexes.sql, and reports HNSW recall@k against the exact
+(sequential scan) results.
+
+Usage (from backend/, against a disposable database, needs DATABASE_URL):
+    python -m benchmarks.intel_queries --sizes 10000 100000 1000000
+
+Random vectors have no cluster structure, so recall here is a pessimistic bound;
+the table is dropped afterwards. Seeding 1M rows of 1536 dims takes several
+minutes and ~6 GB; use --dims 512 to benchmark shortened embeddings.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import init_db
+
+TABLE = "bench_intel_items"
+COMPETITORS = ["appfolio", "buildium", "yardi", "entrata", "rentmanager", "realpage"]
+SIGNAL_TYPES = ["PRODUCT_LAUNCH", "PRICING_CHANGE", "MARKETING_SHIFT", "HIRING_SIGNAL", "CUSTOMER_COMPLAINT", "PARTNERSHIP"]
+SEED_CHUNK = 50_000
+TOP_K = 20
+
+
+def _vector_literal(v: np.ndarray) -> str:
+    return "[" + ",".join(f"{x:.6f}" for x in v) + "]"
+
+
+async def _seed(session: AsyncSession, rows: int, dims: int) -> None:
+    await session.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    await session.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    await session.execute(
+        text(
+            f"""
+            CREATE TABLE {TABLE} (
+                id BIGSERIAL PRIMARY KEY,
+                competitor VARCHAR(100) NOT NULL,
+                signal_type VARCHAR(50) NOT NULL,
+                detected_at TIMESTAMPTZ NOT NULL,
+                embedding vector({dims})
+            )
+            """
+        )
+    )
+    for start in range(0, rows, SEED_CHUNK):
+        n = min(SEED_CHUNK, rows - start)
+        # The g.i reference makes the embedding subquery run per row; cosine distance
+        # ignores vector length, so the vectors need no normalizing
+        await session.execute(
+            text(
+                f"""
+                INSERT INTO {TABLE} (competitor, signal_type, detected_at, embedding)
+                SELECT
+                    (CAST(:competitors AS text[]))[1 + floor(random() * :n_competitors)::int],
+                    (CAST(:signal_types AS text[]))[1 + floor(random() * :n_signal_types)::int],
+                    now() - random() * interval '730 days',
+                    ARRAY(SELECT random() - 0.5 FROM generate_series(1, :dims) WHERE g.i > 0)::vector
+                FROM generate_series(1, :n) AS g(i)
+                """
+            ),
+            {
+                "competitors": COMPETITORS,
+                "n_competitors": len(COMPETITORS),
+                "signal_types": SIGNAL_TYPES,
+                "n_signal_types": len(SIGNAL_TYPES),
+                "dims": dims,
+                "n": n,
+            },
+        )
+        await session.commit()
+    await session.execute(text(f"ANALYZE {TABLE}"))
+    await session.commit()
+
+
+async def _create_indexes(session: AsyncSession) -> float:
+    started = time.perf_counter()
+    await session.execute(text("SET maintenance_work_mem = '512MB'"))
+    await session.execute(
+        text(f"CREATE INDEX ON {TABLE} USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)")
+    )
+    await session.execute(text(f"CREATE INDEX ON {TABLE} (competitor, detected_at DESC, id DESC)"))
+    await session.execute(text(f"CREATE INDEX ON {TABLE} (signal_type, detected_at DESC, id DESC)"))
+    await session.execute(text(f"ANALYZE {TABLE}"))
+    await session.commit()
+    return time.perf_counter() - started
+
+
+async def _time_query(session: AsyncSession, sql: str, params_list: list[dict]) -> tuple[list[float], list[list[int]]]:
+    """Latency (ms) and returned ids per execution."""
+    latencies: list[float] = []
+    results: list[list[int]] = []
+    for params in params_list:
+        started = time.perf_counter()
+        rows = (await session.execute(text(sql), params)).scalars().all()
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append(list(rows))
+    return latencies, results
+
+
+def _summary(latencies: list[float]) -> str:
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50 {statistics.median(ordered):8.2f} ms  p95 {p95:8.2f} ms"
+
+
+async def _run_queries(
+    session: AsyncSession,
+    query_vectors: list[str],
+    ef_search: int | None,
+) -> dict[str, tuple[list[float], list[list[int]]]]:
+    rng = np.random.default_rng(0)
+    by_competitor = [{"v": COMPETITORS[i]} for i in rng.integers(len(COMPETITORS), size=len(query_vectors))]
+    by_signal = [{"v": SIGNAL_TYPES[i]} for i in rng.integers(len(SIGNAL_TYPES), size=len(query_vectors))]
+    out = {
+        "list by competitor": await _time_query(
+            session,
+            f"SELECT id FROM {TABLE} WHERE competitor = :v ORDER BY detected_at DESC, id DESC LIMIT 100",
+            by_competitor,
+        ),
+        "list by signal_type": await _time_query(
+            session,
+            f"SELECT id FROM {TABLE} WHERE signal_type = :v ORDER BY detected_at DESC, id DESC LIMIT 100",
+            by_signal,
+        ),
+    }
+    if ef_search is not None:
+        await session.execute(text(f"SET hnsw.ef_search = {int(ef_search)}"))
+    out["semantic search"] = await _time_query(
+        session,
+        f"SELECT id FROM {TABLE} ORDER BY embedding <=> CAST(CAST(:q AS text) AS vector) LIMIT {TOP_K}",
+        [{"q": q} for q in query_vectors],
+    )
+    return out
+
+
+async def benchmark(sizes: list[int], dims: int, runs: int, ef_search_values: list[int]) -> None:
+    factory = init_db(settings.database_url)
+    rng = np.random.default_rng(42)
+    vectors = rng.random((runs, dims)) - 0.5
+    query_vectors = [_vector_literal(v / np.linalg.norm(v)) for v in vectors]
+
+    async with factory() as session:
+        try:
+            for rows in sizes:
+                print(f"\n== {rows:,} rows, {dims} dims ==")
+                started = time.perf_counter()
+                await _seed(session, rows, dims)
+                print(f"seeded in {time.perf_counter() - started:.1f}s")
+
+                exact = await _run_queries(session, query_vectors, None)
+                for name, (latencies, _) in exact.items():
+                    print(f"no index   {name:<22} {_summary(latencies)}")
+
+                print(f"indexes built in {await _create_indexes(session):.1f}s")
+                for ef_search in ef_search_values:
+                    indexed = await _run_queries(session, query_vectors, ef_search)
+                    for name, (latencies, ids) in indexed.items():
+                        line = f"indexed    {name:<22} {_summary(latencies)}"
+                        if name == "semantic search":
+                            truth = exact[name][1]
+                            recall = np.mean([len(set(a) & set(b)) / TOP_K for a, b in zip(ids, truth, strict=True)])
+                            line += f"  ef_search {ef_search:<4} recall@{TOP_K} {recall:.3f}"
+                        print(line)
+                await session.commit()
+        finally:
+            await session.rollback()
+            await session.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+            await session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dims", type=int, default=settings.embedding_dimensions)
+    parser.add_argument("--runs", type=int, default=50, help="Queries per measurement")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[settings.hnsw_ef_search, 100])
+    args = parser.parse_args()
+    if not settings.database_url:
+        parser.error("DATABASE_URL is not set")
+    asyncio.run(benchmark(args.sizes, args.dims, args.runs, args.ef_search))
+
+
+if __name__ == "__main__":
+    main()
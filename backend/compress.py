@@ -0,0 +1,144 @@
+"""Extractive compression of scraped text before it is sent to Claude.
+
+Strips HTML, drops boilerplate sentences (repeated within an item, or recurring across
+at least BOILERPLATE_MIN_PAGES pages of the same site in a batch), and keeps the highest-scoring sentences up to a per-item
+token budget, in their original order.
+"""
+
+import html
+import math
+import re
+from collections.abc import Iterable
+
+import numpy as np
+
+from config import settings
+from triage import HAPPYCO_PATTERN, SIGNAL_PATTERNS
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SCRIPT_RE = re.compile(r"<(script|style)\b[^>]*>.*?</\1>", re.IGNORECASE | re.DOTALL)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+BOILERPLATE_MIN_PAGES = 3  # Pages of one site a sentence must recur on to count as nav/footer/CTA
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the this to we with you your".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return math.ceil(len(text) / 4)
+
+
+def strip_html(text: str) -> str:
+    """Remove tags (and script/style bodies), unescape entities, collapse whitespace."""
+    text = _SCRIPT_RE.sub(" ", text)
+    text = _TAG_RE.sub(" ", text)
+    return re.sub(r"[^\S\n]+", " ", html.unescape(text)).strip()
+
+
+def split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+
+
+def _normalize(sentence: str) -> str:
+    return " ".join(_WORD_RE.findall(sentence.lower()))
+
+
+def find_boilerplate(texts: Iterable[str | None], *, min_pages: int = BOILERPLATE_MIN_PAGES) -> set[str]:
+    """
+    Normalized sentences that appear in at least min_pages texts (nav, footers, CTAs).
+
+    Pass pages of a single site: real content (a press release quoted on the blog
+    and on a review site) also recurs, but only a site's own template recurs on
+    most of its pages.
+    """
+    seen: dict[str, int] = {}
+    for text in texts:
+        if not text:
+            continue
+        for norm in {_normalize(s) for s in split_sentences(strip_html(text))}:
+            if norm:
+                seen[norm] = seen.get(norm, 0) + 1
+    return {norm for norm, count in seen.items() if count >= min_pages}
+
+
+def _score_sentences(sentences: list[str]) -> np.ndarray:
+    """
+    Score sentences by how much of the item's salient vocabulary they cover.
+
+    Term weights are tf * idf over the item's sentences; sentence score is the sum of
+    its term weights over sqrt(length), plus a bonus for signal/HappyCo keywords and a
+    small lead bias.
+    """
+    tokenized = [[w for w in _WORD_RE.findall(s.lower()) if w not in _STOPWORDS] for s in sentences]
+    vocab = {w: i for i, w in enumerate(sorted({w for toks in tokenized for w in toks}))}
+    n = len(sentences)
+    if not vocab:
+        return np.zeros(n)
+    counts = np.zeros((n, len(vocab)))
+    for row, toks in enumerate(tokenized):
+        for w in toks:
+            counts[row, vocab[w]] += 1
+    df = (counts > 0).sum(axis=0)
+    idf = np.log((1 + n) / (1 + df)) + 1
+    term_weight = counts.sum(axis=0) * idf
+    lengths = np.maximum((counts > 0).sum(axis=1), 1)
+    scores = ((counts > 0) @ term_weight) / np.sqrt(lengths)
+    scores /= max(scores.max(), 1e-9)
+    keyword_bonus = np.array(
+        [
+            0.3 * sum(1 for p in SIGNAL_PATTERNS.values() if p.search(s))
+            + (0.3 if HAPPYCO_PATTERN.search(s) else 0.0)
+            for s in sentences
+        ]
+    )
+    lead_bonus = 0.1 / (1 + np.arange(n))
+    return scores + keyword_bonus + lead_bonus
+
+
+def compress_text(
+    text: str | None,
+    *,
+    token_budget: int | None = None,
+    boilerplate: set[str] | None = None,
+) -> str:
+    """
+    Keep the top-scoring, non-boilerplate sentences of text within token_budget.
+
+    Selected sentences are returned in document order. Defaults to
+    settings.prompt_item_token_budget.
+    """
+    if not text:
+        return ""
+    budget = token_budget if token_budget is not None else settings.prompt_item_token_budget
+    boilerplate = boilerplate or set()
+
+    sentences: list[str] = []
+    seen: set[str] = set()
+    for s in split_sentences(strip_html(text)):
+        norm = _normalize(s)
+        if not norm or norm in seen or norm in boilerplate:
+            continue
+        seen.add(norm)
+        sentences.append(s)
+    if not sentences:
+        return ""
+
+    joined = " ".join(sentences)
+    if estimate_tokens(joined) <= budget:
+        return joined
+
+    scores = _score_sentences(sentences)
+    chosen: list[int] = []
+    used = 0
+    for i in np.argsort(-scores, kind="stable"):
+        cost = estimate_tokens(sentences[i]) + 1
+        if used + cost > budget:
+            continue
+        chosen.append(int(i))
+        used += cost
+    if not chosen:
+        # A single sentence longer than the budget: keep its head
+        return sentences[int(np.argmax(scores))][: budget * 4]
+    return " ".join(sentences[i] for i in sorted(chosen))
@@ -49,6 +49,7 @@ class Settings(BaseSettings):
     # App
     port: int = 8000
     cors_origins: str = ""  # Comma-separated extra origins (e.g. Vercel URL)
+    run_scheduler_in_api: bool = True  # False when a separate worker (python -m worker) runs scheduled jobs
 
     # Database
     database_url: str | None = None
@@ -56,6 +57,69 @@ class Settings(BaseSettings):
     # AI
     anthropic_api_key: str | None = None
     openai_api_key: str | None = None
+    agent_model: str = "claude-sonnet-4-5"
+    agent_fast_model: str = "claude-haiku-4-5"
+    agent_tiering_enabled: bool = True  # Fast model first; escalate likely MEDIUM/HIGH items
+    agent_escalation_threat_levels: str = "HIGH,MEDIUM"  # Comma-separated
+    agent_escalation_min_confidence: float = 0.7  # Escalate fast-tier results below this
+    agent_retry_budget: int = 2  # Follow-up requests for items with missing/invalid analyses
+    prompt_item_token_budget: int = 500  # Max tokens of compressed raw_content per item in the prompt
+
+    # Pre-triage (local relevance filter before the agent)
+    triage_enabled: bool = True
+    triage_threshold: float = 0.2  # Items scoring below this skip the main analysis lane
+    triage_low_priority_max: int = 0  # Below-threshold items analyzed in a later lane; 0 = drop
+    triage_model_max_age_hours: float = 24  # Each process retrains its triage model from stored intel this often
+
+    embedding_backend: str = "openai"  # openai | onnx | hashing
+    embedding_dimensions: int = 1536  # Stored vector size; OpenAI text-embedding-3 can shorten to any size
+    embedding_storage: str = "vector"  # vector (float32) | halfvec (float16, pgvector >= 0.7)
+    hnsw_ef_search: int = 40  # HNSW candidate list size for semantic search (higher = better recall, slower)
+    hnsw_iterative_scan: str = "relaxed_order"  # Keep scanning HNSW until filters fill the limit (pgvector >= 0.8); "" to disable
+    hybrid_search_candidates: int = 50  # Per-retriever candidates fused by reciprocal rank in /intel/search
+    embedding_onnx_model_dir: str = "models/all-MiniLM-L6-v2"  # model.onnx + tokenizer.json
+    embedding_batch_size: int = 256  # Texts per embeddings request in the streaming pipeline's embed stage
+    embedding_cache_size: int = 10_000  # In-process LRU entries in front of the embedding_cache table
+
+    # Provider rate limiting (shared adaptive limiter per API)
+    anthropic_max_concurrency: int = 8
+    openai_max_concurrency: int = 8
+    api_max_retries: int = 5
+    api_backoff_base_seconds: float = 1.0
+    api_backoff_max_seconds: float = 60.0
+
+    # Scheduled jobs
+    job_lease_ttl_seconds: int = 300  # Lease lifetime; renewed every third of it while a job runs
+    # Streaming pipeline for all competitors (weekly job, POST /intel/run); workers per stage
+    pipeline_scrape_concurrency: int = 4
+    pipeline_analyze_concurrency: int = 4
+    pipeline_embed_concurrency: int = 1
+    pipeline_write_concurrency: int = 1
+    pipeline_batch_items: int = 25  # Scraped items per analysis batch
+    pipeline_stream_buffer: int = 8  # Batches queued between stages before producers wait (backpressure)
+    pipeline_batch_wait_seconds: float = 2  # Longest an embed/write batch waits for more rows before going
+    pipeline_timeout_seconds: float = 1800  # Time limit per scrape and per analysis batch
+
+    # Source polling: each (competitor, source) is scraped on its own adaptive interval
+    source_polling_enabled: bool = True
+    source_poll_tick_minutes: int = 15  # How often the scheduler looks for due sources
+    source_poll_min_hours: float = 6  # Floor: fastest interval for a source that keeps changing
+    source_poll_max_hours: float = 336  # Ceiling: slowest interval for a stale source (14 days)
+    source_poll_seen_keys: int = 1000  # Item keys remembered per source to detect new items
+
+    # Durable pipeline queue (services.pipeline_queue, consumed by python -m worker)
+    pipeline_queue_batch_size: int = 4  # Jobs a worker claims per stage per poll
+    pipeline_queue_chunk_items: int = 25  # Scraped items per analyze job
+    pipeline_queue_max_attempts: int = 3  # Tries per stage before a job is marked failed
+    pipeline_queue_visibility_seconds: int = 900  # A claimed job is reclaimable after this (crashed worker)
+    pipeline_queue_poll_seconds: float = 5  # Idle wait between polls when no job is claimable
+
+    # Retention (monthly intel_items partitions)
+    retention_enabled: bool = False  # Archive and detach old partitions (needs archive_dir)
+    retention_drop: bool = False  # Also drop archived partitions; otherwise they stay detached
+    retention_months: int = 24  # Partitions older than this are archived to Parquet and detached
+    partition_months_ahead: int = 3  # Future monthly partitions kept created
+    archive_dir: str = ""  # Absolute path on durable storage, or s3:// / gs:// URI, for Parquet archives
 
     # Scraping
     serpapi_key: str | None = None
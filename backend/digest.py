@@ -5,6 +5,7 @@ from datetime import UTC, date, datetime, timedelta
 from typing import Any
 
 import resend
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
@@ -12,8 +13,8 @@ from models import Digest, IntelItem
 from services.intel_service import get_intel_items
 
 
-def _item_to_dict(item: IntelItem) -> dict[str, Any]:
-    """Convert IntelItem to serializable dict for digest content."""
+def _item_to_dict(item: IntelItem | Row) -> dict[str, Any]:
+    """Convert an IntelItem (or a get_intel_items row) to serializable dict for digest content."""
     return {
         "id": str(item.id),
         "competitor": item.competitor,
@@ -27,7 +28,7 @@ def _item_to_dict(item: IntelItem) -> dict[str, Any]:
     }
 
 
-def _group_by_threat(items: list[IntelItem]) -> dict[str, list[IntelItem]]:
+def _group_by_threat(items: list[IntelItem | Row]) -> dict[str, list[IntelItem | Row]]:
     """Group intel items by threat level (HIGH, MEDIUM, LOW)."""
     grouped: dict[str, list[IntelItem]] = defaultdict(list)
     order = ("HIGH", "MEDIUM", "LOW")
@@ -100,7 +101,7 @@ async def build_digest(
 
     Returns (content_dict for JSONB, week_of date).
     """
-    items = await get_intel_items(session, limit=limit)
+    items = await get_intel_items(session, limit=limit)  # lean rows, no raw_content/embedding
     # Filter to items from the last N days
     cutoff = datetime.now(UTC) - timedelta(days=since_days)
     recent = [i for i in items if i.detected_at and i.detected_at >= cutoff]
@@ -1,32 +1,270 @@
-"""OpenAI embeddings for semantic search. Uses text-embedding-3-small (1536 dims)."""
+"""Embeddings for semantic search, behind a pluggable backend.
 
+Backends (EMBEDDING_BACKEND):
+- openai: text-embedding-3-small via the OpenAI API (default 1536 dims, or shortened)
+- onnx: local sentence-embedding model via ONNX Runtime (CPU, batched)
+- hashing: dependency-free signed hashing vectorizer, for dev, tests and air-gapped runs
+
+The stored vector dimension is settings.embedding_dimensions; the active backend must
+produce vectors of that size (see migrations/optional/embedding_dimensions.sql to change it).
+settings.embedding_storage picks float32 `vector` or float16 `halfvec` columns
+(see migrations/optional/halfvec_embeddings.sql).
+"""
+
+import logging
+import re
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Protocol
+
+import numpy as np
 from openai import OpenAI
 
+from compress import estimate_tokens
 from config import settings
+from rate_limit import openai_limiter
+
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+except ImportError:
+    onnxruntime = None  # type: ignore
+    Tokenizer = None  # type: ignore
+
+logger = logging.getLogger(__name__)
 
 EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1536
+MAX_INPUT_CHARS = 8000  # Per-input truncation (well under the 8191-token model limit)
+MAX_BATCH_INPUTS = 2048  # Provider limit on inputs per embeddings request
+MAX_BATCH_TOKENS = 300_000  # Provider limit on total tokens per embeddings request
+LOCAL_BATCH_SIZE = 32  # Texts per ONNX inference call
 
 
-def get_embedding(text: str) -> list[float] | None:
+class EmbeddingBackend(Protocol):
+    """Produces embeddings for a batch of texts, aligned with input (None on failure)."""
+
+    name: str  # Model identifier, also used in embedding cache keys
+    dimensions: int
+
+    def embed(self, texts: list[str]) -> list[list[float] | None]: ...
+
+
+# --- OpenAI ---
+
+
+@lru_cache(maxsize=4)
+def _get_client(api_key: str) -> OpenAI:
+    # Retries are owned by the shared adaptive limiter, not the SDK
+    return OpenAI(api_key=api_key, max_retries=0)
+
+
+def _chunk_for_requests(texts: list[str]) -> list[list[int]]:
+    """Group input positions into requests under the per-request input and token limits."""
+    chunks: list[list[int]] = []
+    current: list[int] = []
+    tokens = 0
+    for i, text in enumerate(texts):
+        cost = estimate_tokens(text)
+        if current and (len(current) >= MAX_BATCH_INPUTS or tokens + cost > MAX_BATCH_TOKENS):
+            chunks.append(current)
+            current, tokens = [], 0
+        current.append(i)
+        tokens += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _embed_batch(
+    client: OpenAI,
+    texts: list[str],
+    dimensions: int = EMBEDDING_DIMENSIONS,
+) -> list[list[float] | None]:
+    """
+    Embed texts in one request, preserving order.
+
+    If the provider rejects the request as invalid, the batch is split in half and
+    retried so one bad input only costs its own slot (None) rather than the whole
+    batch. Other failures (already retried by the limiter) mark the batch as None.
+    """
+    kwargs = {"dimensions": dimensions} if dimensions != EMBEDDING_DIMENSIONS else {}
+    try:
+        raw = openai_limiter.call(
+            lambda: client.embeddings.with_raw_response.create(model=EMBEDDING_MODEL, input=texts, **kwargs)
+        )
+        out: list[list[float] | None] = [None] * len(texts)
+        for d in raw.parse().data:
+            out[d.index] = d.embedding
+        return out
+    except Exception as e:
+        if len(texts) == 1 or getattr(e, "status_code", None) not in (400, 422):
+            logger.warning("Embedding request for %d inputs failed: %s", len(texts), e)
+            return [None] * len(texts)
+        mid = len(texts) // 2
+        return _embed_batch(client, texts[:mid], dimensions) + _embed_batch(client, texts[mid:], dimensions)
+
+
+class OpenAIBackend:
+    """
+    text-embedding-3 via the OpenAI API.
+
+    Below the native 1536 dims, the API's `dimensions` parameter returns shortened
+    vectors that keep most of the retrieval quality at a fraction of the size.
+    """
+
+    name = EMBEDDING_MODEL
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def embed(self, texts: list[str]) -> list[list[float] | None]:
+        api_key = settings.openai_api_key
+        if not api_key:
+            return [None] * len(texts)
+        client = _get_client(api_key)
+        results: list[list[float] | None] = [None] * len(texts)
+        for chunk in _chunk_for_requests(texts):
+            batch = _embed_batch(client, [texts[i] for i in chunk], self.dimensions)
+            for i, embedding in zip(chunk, batch, strict=True):
+                results[i] = embedding
+        return results
+
+
+# --- Local backends ---
+
+
+class HashingBackend:
+    """
+    Signed feature hashing of unigrams and bigrams, log-scaled and L2-normalized.
+
+    Lexical rather than semantic, but deterministic, free and fast enough to embed
+    thousands of texts per second on CPU.
+    """
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self.name = f"hashing-v1-{dimensions}"
+
+    def embed(self, texts: list[str]) -> list[list[float] | None]:
+        rows: list[int] = []
+        cols: list[int] = []
+        signs: list[float] = []
+        for r, text in enumerate(texts):
+            tokens = re.findall(r"\w+", text.lower())
+            for gram in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:], strict=False)]:
+                h = zlib.crc32(gram.encode())
+                rows.append(r)
+                cols.append(h % self.dimensions)
+                signs.append(-1.0 if h & 0x80000000 else 1.0)
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (rows, cols), signs)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1)
+        return [(matrix[i] / norms[i]).tolist() if norms[i] > 0 else None for i in range(len(texts))]
+
+
+class OnnxBackend:
     """
-    Generate embedding for text using OpenAI.
+    Sentence-embedding model (e.g. all-MiniLM-L6-v2) exported to ONNX, run on CPU.
 
-    Returns 1536-dim vector, or None if API key missing or request fails.
+    model_dir must contain model.onnx and tokenizer.json. Token embeddings are
+    mean-pooled over the attention mask and L2-normalized.
     """
-    api_key = settings.openai_api_key
-    if not api_key:
-        return None
 
-    text = (text or "").strip()
-    if not text:
-        return None
+    def __init__(self, model_dir: str):
+        if onnxruntime is None or Tokenizer is None:
+            raise ImportError("onnxruntime and tokenizers are required for the onnx embedding backend. Install: pip install onnxruntime tokenizers")
+        path = Path(model_dir)
+        self._session = onnxruntime.InferenceSession(str(path / "model.onnx"), providers=["CPUExecutionProvider"])
+        self._tokenizer = Tokenizer.from_file(str(path / "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=256)
+        self._tokenizer.enable_padding()
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        self.dimensions = int(self._session.get_outputs()[0].shape[-1])
+        self.name = f"onnx-{path.name}"
+
+    def embed(self, texts: list[str]) -> list[list[float] | None]:
+        results: list[list[float] | None] = []
+        for start in range(0, len(texts), LOCAL_BATCH_SIZE):
+            encodings = self._tokenizer.encode_batch(texts[start : start + LOCAL_BATCH_SIZE])
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            tokens = self._session.run(None, {k: v for k, v in feeds.items() if k in self._input_names})[0]
+            mask = feeds["attention_mask"][..., None].astype(np.float32)
+            pooled = (tokens * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-9)
+            results.extend(pooled.tolist())
+        return results
+
+
+@lru_cache(maxsize=2)
+def _onnx_or_fallback(model_dir: str, dimensions: int) -> EmbeddingBackend:
+    """
+    The ONNX backend for model_dir, or hashing if it cannot serve `dimensions`.
 
+    The outcome, including a fallback, is cached, so a broken setup is reported once
+    instead of reloading the model for every text.
+    """
     try:
-        client = OpenAI(api_key=api_key)
-        resp = client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=text[:8000],  # limit input length
+        onnx = OnnxBackend(model_dir)
+    except Exception as e:
+        logger.error("ONNX embedding backend unavailable (%s); using hashing backend", e)
+        return HashingBackend(dimensions)
+    if onnx.dimensions != dimensions:
+        logger.error(
+            "ONNX model outputs %d dims but EMBEDDING_DIMENSIONS is %d; using hashing backend",
+            onnx.dimensions,
+            dimensions,
         )
-        return resp.data[0].embedding
-    except Exception:
-        return None
+        return HashingBackend(dimensions)
+    return onnx
+
+
+def get_backend() -> EmbeddingBackend:
+    """
+    Backend selected by settings.embedding_backend.
+
+    If the onnx backend cannot be loaded (missing package or model files) or its
+    output size does not match settings.embedding_dimensions, falls back to hashing
+    so local runs still get embeddings that fit the schema.
+    """
+    backend = settings.embedding_backend
+    if backend == "hashing":
+        return HashingBackend(settings.embedding_dimensions)
+    if backend == "onnx":
+        return _onnx_or_fallback(settings.embedding_onnx_model_dir, settings.embedding_dimensions)
+    return OpenAIBackend(settings.embedding_dimensions)
+
+
+def get_embeddings(texts: list[str], backend: EmbeddingBackend | None = None) -> list[list[float] | None]:
+    """
+    Generate embeddings for many texts with backend (default: the active one), in as
+    few calls as possible.
+
+    Output is aligned with input; an entry is None when its text is empty or its
+    embedding failed (e.g. OpenAI key missing or request failed).
+    """
+    results: list[list[float] | None] = [None] * len(texts)
+    positions = [i for i, t in enumerate(texts) if (t or "").strip()]
+    prepared = [texts[i].strip()[:MAX_INPUT_CHARS] for i in positions]
+    if not prepared:
+        return results
+
+    for i, embedding in zip(positions, (backend or get_backend()).embed(prepared), strict=True):
+        results[i] = embedding
+    return results
+
+
+def get_embedding(text: str) -> list[float] | None:
+    """
+    Generate embedding for text with the active backend.
+
+    Returns a settings.embedding_dimensions vector, or None if the text is empty or the
+    backend cannot embed it (e.g. OpenAI key missing or request failed).
+    """
+    return get_embeddings([text])[0]
@@ -1,5 +1,6 @@
 """FastAPI application entry point."""
 
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -12,6 +13,7 @@ from routes.digest import router as digest_router
 from routes.health import router as health_router
 from routes.intel import router as intel_router
 from scheduler import shutdown_scheduler, start_scheduler
+from services.pipeline_queue import run_queue_worker
 
 
 @asynccontextmanager
@@ -19,8 +21,17 @@ async def lifespan(app: FastAPI):
     validate_required_env()
     if settings.database_url:
         init_db(settings.database_url)
-    start_scheduler()
+    # Without a separate worker, the API also drains the pipeline queue the scheduler fills
+    queue_stop = asyncio.Event()
+    consumer = None
+    if settings.run_scheduler_in_api:
+        start_scheduler()
+        if settings.database_url:
+            consumer = asyncio.create_task(run_queue_worker(queue_stop))
     yield
+    queue_stop.set()
+    if consumer is not None:
+        await consumer
     shutdown_scheduler()
 
 
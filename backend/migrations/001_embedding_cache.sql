@@ -0,0 +1,16 @@
+-- Persistent embedding cache keyed by (model, dimensions, SHA-256 of normalized text).
+-- Lets repeated summaries and popular /intel/search queries skip the embeddings API.
+
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    model VARCHAR(100) NOT NULL,
+    dimensions INTEGER NOT NULL,
+    text_hash CHAR(64) NOT NULL,
+    embedding vector NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (model, dimensions, text_hash)
+);
+
+ALTER TABLE embedding_cache ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access on embedding_cache" ON embedding_cache
+    FOR ALL USING (auth.role() = 'service_role');
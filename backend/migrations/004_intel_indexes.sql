@@ -0,0 +1,41 @@
+-- HNSW index for semantic search. The /intel listing indexes are in
+-- 005_intel_keyset_indexes.sql.
+--
+-- HNSW replaces the ivfflat index from the initial schema: it needs no training data
+-- (so it can be built on an empty table) and gives better recall/latency trade-offs.
+-- Query-time recall is tuned per transaction via HNSW_EF_SEARCH (hnsw.ef_search).
+-- The operator class follows the existing column: halfvec_cosine_ops for halfvec(N),
+-- vector_cosine_ops for vector(N); any other type stops the migration.
+--
+-- Building HNSW over many rows is memory-hungry; raise maintenance_work_mem for the
+-- session if the build spills. On a busy table, run the CREATE INDEX by hand with
+-- CONCURRENTLY (outside a transaction) and the operator class for your column type to
+-- avoid blocking writes.
+
+SET maintenance_work_mem = '256MB';
+
+DO $$
+DECLARE
+    type_name text;
+    dims integer;
+    col_type text;
+BEGIN
+    SELECT t.typname, a.atttypmod, format_type(a.atttypid, a.atttypmod)
+    INTO type_name, dims, col_type
+    FROM pg_attribute a JOIN pg_type t ON t.oid = a.atttypid
+    WHERE a.attrelid = 'intel_items'::regclass AND a.attname = 'embedding' AND NOT a.attisdropped;
+
+    IF type_name IS NULL OR type_name NOT IN ('vector', 'halfvec') OR dims <= 0 THEN
+        RAISE EXCEPTION 'intel_items.embedding must be vector(N) or halfvec(N), found %',
+            coalesce(col_type, 'no such column');
+    END IF;
+
+    DROP INDEX IF EXISTS idx_intel_embedding;
+    EXECUTE format(
+        'CREATE INDEX idx_intel_embedding ON intel_items '
+        'USING hnsw (embedding %I) WITH (m = 16, ef_construction = 64)',
+        type_name || '_cosine_ops'
+    );
+END $$;
+
+ANALYZE intel_items;
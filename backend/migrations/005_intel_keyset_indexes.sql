@@ -0,0 +1,15 @@
+-- Filter + newest-first listing for /intel (get_intel_items) with keyset pagination:
+-- order is (detected_at DESC, id DESC), so the listing indexes carry id as a
+-- tie-breaker. Each page is then a single index range scan starting at the cursor,
+-- with no sort and no OFFSET. These cover the single-column detected_at, competitor
+-- and signal_type indexes from the initial schema, which are dropped.
+
+CREATE INDEX IF NOT EXISTS idx_intel_detected_id ON intel_items (detected_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_intel_competitor_detected_id ON intel_items (competitor, detected_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_intel_signal_type_detected_id ON intel_items (signal_type, detected_at DESC, id DESC);
+
+DROP INDEX IF EXISTS idx_intel_detected_at;
+DROP INDEX IF EXISTS idx_intel_competitor;
+DROP INDEX IF EXISTS idx_intel_signal_type;
+
+ANALYZE intel_items;
@@ -0,0 +1,17 @@
+-- Full-text search column for hybrid /intel/search (lexical + vector, rank-fused).
+--
+-- A stored generated column stays in sync on every insert/update without application
+-- code; adding it rewrites the table, which backfills existing rows. The expression
+-- must match models.SEARCH_TSV_EXPRESSION. raw_content is capped at 100k characters
+-- to stay under the 1 MB tsvector limit.
+
+ALTER TABLE intel_items
+    ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(summary, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(threat_reason, '')), 'B') ||
+        setweight(to_tsvector('english', left(coalesce(raw_content, ''), 100000)), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_intel_search_tsv ON intel_items USING gin (search_tsv);
+
+ANALYZE intel_items;
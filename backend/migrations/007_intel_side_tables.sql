@@ -0,0 +1,82 @@
+-- Narrow the hot intel_items table: move raw_content (and its full-text search
+-- document) to intel_item_content and embeddings to intel_item_embeddings, both keyed
+-- by item id. List endpoints then scan only small rows; content and vectors are joined
+-- in by get_intel_by_id and search.
+--
+-- The embedding column and its HNSW operator class follow the existing
+-- intel_items.embedding type (vector(N) or halfvec(N)); any other type stops the
+-- migration. The scripts in optional/ resize or convert intel_item_embeddings.embedding
+-- afterwards.
+
+-- Content: lz4 TOAST compression (PostgreSQL 14+) for scraped text
+CREATE TABLE intel_item_content (
+    item_id UUID PRIMARY KEY REFERENCES intel_items(id) ON DELETE CASCADE,
+    raw_content TEXT,
+    search_tsv tsvector
+);
+ALTER TABLE intel_item_content ALTER COLUMN raw_content SET COMPRESSION lz4;
+
+INSERT INTO intel_item_content (item_id, raw_content, search_tsv)
+SELECT id, raw_content, search_tsv FROM intel_items;
+
+CREATE INDEX idx_intel_content_search_tsv ON intel_item_content USING gin (search_tsv);
+
+-- Embeddings: only items that have one get a row
+SET maintenance_work_mem = '256MB';
+
+DO $$
+DECLARE
+    type_name text;
+    dims integer;
+    col_type text;
+BEGIN
+    SELECT t.typname, a.atttypmod, format_type(a.atttypid, a.atttypmod)
+    INTO type_name, dims, col_type
+    FROM pg_attribute a JOIN pg_type t ON t.oid = a.atttypid
+    WHERE a.attrelid = 'intel_items'::regclass AND a.attname = 'embedding' AND NOT a.attisdropped;
+
+    IF type_name IS NULL OR type_name NOT IN ('vector', 'halfvec') OR dims <= 0 THEN
+        RAISE EXCEPTION 'intel_items.embedding must be vector(N) or halfvec(N), found %',
+            coalesce(col_type, 'no such column');
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE intel_item_embeddings ('
+        '    item_id UUID PRIMARY KEY REFERENCES intel_items(id) ON DELETE CASCADE,'
+        '    embedding %s NOT NULL)',
+        col_type
+    );
+
+    INSERT INTO intel_item_embeddings (item_id, embedding)
+    SELECT id, embedding FROM intel_items WHERE embedding IS NOT NULL;
+
+    EXECUTE format(
+        'CREATE INDEX idx_intel_embeddings_hnsw ON intel_item_embeddings '
+        'USING hnsw (embedding %I) WITH (m = 16, ef_construction = 64)',
+        type_name || '_cosine_ops'
+    );
+END $$;
+
+-- Drops idx_intel_embedding and idx_intel_search_tsv with the columns
+ALTER TABLE intel_items
+    DROP COLUMN search_tsv,
+    DROP COLUMN embedding,
+    DROP COLUMN raw_content;
+
+-- RLS
+ALTER TABLE intel_item_content ENABLE ROW LEVEL SECURITY;
+ALTER TABLE intel_item_embeddings ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access on intel_item_content" ON intel_item_content
+    FOR ALL USING (auth.role() = 'service_role');
+
+CREATE POLICY "Service role full access on intel_item_embeddings" ON intel_item_embeddings
+    FOR ALL USING (auth.role() = 'service_role');
+
+ANALYZE intel_items;
+ANALYZE intel_item_content;
+ANALYZE intel_item_embeddings;
+
+-- Dropped columns keep their space until the table is rewritten. Afterwards, run on
+-- its own (it cannot run inside a transaction and locks the table while it runs):
+--   VACUUM FULL intel_items;
@@ -0,0 +1,75 @@
+-- Range-partition intel_items by month on detected_at, so "last N days" queries scan
+-- only recent partitions. Partitions are named intel_items_yYYYYmMM; the daily
+-- retention job (services/retention.py) creates upcoming months and archives months
+-- older than RETENTION_MONTHS to Parquet before detaching them.
+--
+-- A partitioned table's primary key must include the partition key, so the key
+-- becomes (id, detected_at) and the side tables' foreign keys are dropped (the
+-- retention job deletes side rows together with their partition). Rows are copied
+-- into a new table; run during a quiet period.
+
+BEGIN;
+
+ALTER TABLE intel_item_content DROP CONSTRAINT IF EXISTS intel_item_content_item_id_fkey;
+ALTER TABLE intel_item_embeddings DROP CONSTRAINT IF EXISTS intel_item_embeddings_item_id_fkey;
+
+ALTER TABLE intel_items RENAME TO intel_items_unpartitioned;
+
+CREATE TABLE intel_items (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    competitor VARCHAR(100) NOT NULL,
+    signal_type VARCHAR(50) NOT NULL,
+    threat_level VARCHAR(20) NOT NULL CHECK (threat_level IN ('HIGH', 'MEDIUM', 'LOW')),
+    threat_reason TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    happyco_response TEXT NOT NULL,
+    confidence FLOAT NOT NULL CHECK (confidence >= 0 AND confidence <= 1),
+    source_url TEXT,
+    detected_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, detected_at)
+) PARTITION BY RANGE (detected_at);
+
+-- One partition per month from the oldest row through three months ahead
+DO $$
+DECLARE
+    month DATE := date_trunc('month', COALESCE((SELECT min(detected_at) FROM intel_items_unpartitioned), now()) AT TIME ZONE 'UTC');
+    last DATE := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months';
+BEGIN
+    WHILE month <= last LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF intel_items FOR VALUES FROM (%L) TO (%L)',
+            'intel_items_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+            month::text || ' 00:00+00',
+            (month + interval '1 month')::date::text || ' 00:00+00'
+        );
+        month := month + interval '1 month';
+    END LOOP;
+END $$;
+
+-- Catches rows outside the monthly ranges if the retention job falls behind
+CREATE TABLE intel_items_default PARTITION OF intel_items DEFAULT;
+
+INSERT INTO intel_items SELECT
+    id, competitor, signal_type, threat_level, threat_reason, summary, happyco_response,
+    confidence, source_url, detected_at, created_at
+FROM intel_items_unpartitioned;
+
+DROP TABLE intel_items_unpartitioned;
+
+-- Indexes on the parent are created on every partition (keyset listing, see 005)
+CREATE INDEX idx_intel_detected_id ON intel_items (detected_at DESC, id DESC);
+CREATE INDEX idx_intel_competitor_detected_id ON intel_items (competitor, detected_at DESC, id DESC);
+CREATE INDEX idx_intel_signal_type_detected_id ON intel_items (signal_type, detected_at DESC, id DESC);
+CREATE INDEX idx_intel_threat_level ON intel_items (threat_level);
+-- Lookup by id alone (get_intel_by_id, side-table joins)
+CREATE INDEX idx_intel_id ON intel_items (id);
+
+ALTER TABLE intel_items ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access on intel_items" ON intel_items
+    FOR ALL USING (auth.role() = 'service_role');
+
+COMMIT;
+
+ANALYZE intel_items;
@@ -0,0 +1,17 @@
+-- Leases for scheduled jobs, so that with several API workers or replicas each job
+-- runs in one process only (services/job_lease.py). A lease row is taken when it
+-- has expired and the job has not completed within its minimum interval; the holder
+-- renews it while the job runs. Plain rows rather than advisory locks, because
+-- session-level locks do not survive the Supabase transaction pooler.
+
+CREATE TABLE IF NOT EXISTS job_leases (
+    job_id VARCHAR(100) PRIMARY KEY,
+    holder VARCHAR(255) NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL,
+    last_completed_at TIMESTAMPTZ
+);
+
+ALTER TABLE job_leases ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access on job_leases" ON job_leases
+    FOR ALL USING (auth.role() = 'service_role');
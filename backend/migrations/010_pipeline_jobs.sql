@@ -0,0 +1,35 @@
+-- Durable, staged pipeline queue (services/pipeline_queue.py). A scrape job fans out
+-- into analyze jobs of pipeline_queue_chunk_items scraped items each; those advance
+-- through embed and store. payload holds the output of the last completed stage, so a
+-- failed or interrupted job resumes there instead of repeating paid LLM work.
+-- Workers claim jobs with FOR UPDATE SKIP LOCKED and mark them running until
+-- locked_until; a job whose worker died becomes claimable again after that.
+
+CREATE TABLE IF NOT EXISTS pipeline_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    run_id UUID NOT NULL,
+    competitor_id UUID NOT NULL REFERENCES competitors(id) ON DELETE CASCADE,
+    competitor VARCHAR(255) NOT NULL,
+    stage VARCHAR(20) NOT NULL CHECK (stage IN ('scrape', 'analyze', 'embed', 'store')),
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    payload JSONB NOT NULL DEFAULT '{}',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    run_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    locked_by VARCHAR(255),
+    locked_until TIMESTAMPTZ,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Claim path: only unfinished jobs, per stage, oldest first
+CREATE INDEX IF NOT EXISTS idx_pipeline_jobs_claim
+    ON pipeline_jobs (stage, created_at)
+    WHERE status IN ('pending', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_jobs_run ON pipeline_jobs (run_id);
+
+ALTER TABLE pipeline_jobs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access on pipeline_jobs" ON pipeline_jobs
+    FOR ALL USING (auth.role() = 'service_role');
@@ -0,0 +1,25 @@
+-- Per-(competitor, source) polling schedules (services/source_polling.py). Each source
+-- is scraped when next_poll_at passes; the interval shrinks toward
+-- SOURCE_POLL_MIN_HOURS while the source keeps producing new items and grows toward
+-- SOURCE_POLL_MAX_HOURS while it does not. seen_keys remembers items already queued
+-- for analysis so repeat polls only analyze what is new. Rows are created by the
+-- polling job for every active competitor.
+
+CREATE TABLE IF NOT EXISTS source_schedules (
+    competitor_id UUID NOT NULL REFERENCES competitors(id) ON DELETE CASCADE,
+    source VARCHAR(20) NOT NULL CHECK (source IN ('blog', 'reviews', 'jobs')),
+    interval_seconds INTEGER NOT NULL,
+    next_poll_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_polled_at TIMESTAMPTZ,
+    last_changed_at TIMESTAMPTZ,
+    last_error TEXT,
+    seen_keys JSONB NOT NULL DEFAULT '[]',
+    PRIMARY KEY (competitor_id, source)
+);
+
+CREATE INDEX IF NOT EXISTS idx_source_schedules_due ON source_schedules (next_poll_at);
+
+ALTER TABLE source_schedules ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access on source_schedules" ON source_schedules
+    FOR ALL USING (auth.role() = 'service_role');
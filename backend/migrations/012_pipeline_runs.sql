@@ -0,0 +1,12 @@
+-- Pipeline runs triggered from POST /intel/run (services/pipeline_queue.py). A run is
+-- the set of pipeline_jobs sharing a run_id. Runs can be cancelled, and a competitor
+-- has at most one pending or running scrape job, so a second trigger joins the run
+-- already in flight instead of scraping twice.
+
+ALTER TABLE pipeline_jobs DROP CONSTRAINT IF EXISTS pipeline_jobs_status_check;
+ALTER TABLE pipeline_jobs ADD CONSTRAINT pipeline_jobs_status_check
+    CHECK (status IN ('pending', 'running', 'done', 'failed', 'cancelled'));
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_pipeline_jobs_in_flight_scrape
+    ON pipeline_jobs (competitor_id)
+    WHERE stage = 'scrape' AND status IN ('pending', 'running');
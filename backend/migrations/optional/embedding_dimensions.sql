@@ -0,0 +1,18 @@
+-- OPTIONAL, not part of the numbered chain: change the stored embedding size, e.g. to
+-- 384 for the local onnx backend (all-MiniLM-L6-v2). Run it on its own, after
+-- 007_intel_side_tables.sql, only when switching EMBEDDING_BACKEND / EMBEDDING_DIMENSIONS;
+-- set both to match, then edit the size below.
+--
+-- Vectors from a different backend live in a different space and cannot be reused, so
+-- they are deleted here; the weekly job re-embeds items without a stored vector
+-- (services.intel_service.backfill_embeddings). When switching backend at the same
+-- size, run only the TRUNCATE.
+
+DROP INDEX IF EXISTS idx_intel_embeddings_hnsw;
+
+TRUNCATE intel_item_embeddings;
+ALTER TABLE intel_item_embeddings ALTER COLUMN embedding TYPE vector(384);
+
+SET maintenance_work_mem = '256MB';
+CREATE INDEX idx_intel_embeddings_hnsw ON intel_item_embeddings
+    USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
@@ -0,0 +1,26 @@
+-- OPTIONAL, not part of the numbered chain: store shortened text-embedding-3 vectors
+-- as half precision (pgvector >= 0.7). Run it on its own, after 007_intel_side_tables.sql.
+-- Example: 1536-dim float32 (6 KB/row) -> 512-dim halfvec (1 KB/row). Set
+-- EMBEDDING_DIMENSIONS=512 and EMBEDDING_STORAGE=halfvec, then edit the size below.
+--
+-- text-embedding-3 vectors can be shortened by keeping their leading components and
+-- re-normalizing, which is what the API returns for the `dimensions` parameter, so
+-- existing rows are re-projected in place instead of re-embedded. Only valid for
+-- OpenAI text-embedding-3 vectors; for other backends use embedding_dimensions.sql.
+
+DROP INDEX IF EXISTS idx_intel_embeddings_hnsw;
+
+ALTER TABLE intel_item_embeddings
+    ALTER COLUMN embedding TYPE halfvec(512)
+    USING l2_normalize(subvector(embedding, 1, 512))::halfvec(512);
+
+SET maintenance_work_mem = '256MB';
+CREATE INDEX idx_intel_embeddings_hnsw ON intel_item_embeddings
+    USING hnsw (embedding halfvec_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- Re-project cached full-size vectors so pipeline runs keep hitting the cache
+INSERT INTO embedding_cache (model, dimensions, text_hash, embedding, created_at)
+SELECT model, 512, text_hash, l2_normalize(subvector(embedding, 1, 512)), created_at
+FROM embedding_cache
+WHERE model = 'text-embedding-3-small' AND dimensions = 1536
+ON CONFLICT DO NOTHING;
@@ -1,17 +1,36 @@
 from datetime import date, datetime
 from uuid import uuid4
 
-from pgvector.sqlalchemy import Vector
-from sqlalchemy import Boolean, Date, DateTime, Float, String, Text, func, true
-from sqlalchemy.dialects.postgresql import JSONB, UUID
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from pgvector.sqlalchemy import HALFVEC, Vector
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, String, Text, func, true
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, UUID
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+
+from config import settings
 
 
 class Base(DeclarativeBase):
     pass
 
 
+def _embedding_type():
+    """pgvector column type for stored embeddings: float16 halfvec or float32 vector."""
+    if settings.embedding_storage == "halfvec":
+        return HALFVEC(settings.embedding_dimensions)
+    return Vector(settings.embedding_dimensions)
+
+
 class IntelItem(Base):
+    """
+    Hot listing columns only. Large, rarely read data lives in side tables keyed by id:
+    raw content and its search document in intel_item_content, vectors in
+    intel_item_embeddings.
+
+    In the database the table is range-partitioned by month on detected_at, with
+    primary key (id, detected_at); side tables therefore carry no foreign key and are
+    cleaned up by services.retention when a partition is archived.
+    """
+
     __tablename__ = "intel_items"
 
     id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
@@ -23,11 +42,35 @@ class IntelItem(Base):
     happyco_response: Mapped[str] = mapped_column(Text, nullable=False)
     confidence: Mapped[float] = mapped_column(Float, nullable=False)
     source_url: Mapped[str | None] = mapped_column(Text, nullable=True)
-    raw_content: Mapped[str | None] = mapped_column(Text, nullable=True)
-    embedding: Mapped[list[float] | None] = mapped_column(Vector(1536), nullable=True)
     detected_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+    # Loaded explicitly (e.g. get_intel_by_id); lazy loads would be implicit I/O under asyncio
+    content: Mapped["IntelItemContent | None"] = relationship(
+        primaryjoin="IntelItem.id == foreign(IntelItemContent.item_id)",
+        lazy="raise",
+        uselist=False,
+        viewonly=True,
+    )
+
+
+class IntelItemContent(Base):
+    """Scraped source text (lz4-compressed TOAST) and the full-text search document."""
+
+    __tablename__ = "intel_item_content"
+
+    item_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    raw_content: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # summary (weight A), threat_reason (B), raw_content head (C); written at insert
+    search_tsv: Mapped[str | None] = mapped_column(TSVECTOR, nullable=True, deferred=True)
+
+
+class IntelItemEmbedding(Base):
+    __tablename__ = "intel_item_embeddings"
+
+    item_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    embedding: Mapped[list[float]] = mapped_column(_embedding_type(), nullable=False)
+
 
 class Digest(Base):
     __tablename__ = "digests"
@@ -52,3 +95,66 @@ class Competitor(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default=true())
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class EmbeddingCache(Base):
+    __tablename__ = "embedding_cache"
+
+    model: Mapped[str] = mapped_column(String(100), primary_key=True)
+    dimensions: Mapped[int] = mapped_column(Integer, primary_key=True)
+    text_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    embedding: Mapped[list[float]] = mapped_column(Vector(), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class JobLease(Base):
+    """Time-limited lease that lets one process at a time run a scheduled job (services.job_lease)."""
+
+    __tablename__ = "job_leases"
+
+    job_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    holder: Mapped[str] = mapped_column(String(255), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class PipelineJob(Base):
+    """
+    One unit of work in the durable pipeline queue (services.pipeline_queue).
+
+    A job moves through stages scrape -> analyze -> embed -> store; payload holds the
+    last completed stage's output, so a retry or a crashed worker resumes from there.
+    """
+
+    __tablename__ = "pipeline_jobs"
+
+    id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    run_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    competitor_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    competitor: Mapped[str] = mapped_column(String(255), nullable=False)
+    stage: Mapped[str] = mapped_column(String(20), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, server_default="pending")
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False, server_default="{}")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    run_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    locked_by: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class SourceSchedule(Base):
+    """When to next poll one (competitor, source), adapted to how often it changes (services.source_polling)."""
+
+    __tablename__ = "source_schedules"
+
+    competitor_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    source: Mapped[str] = mapped_column(String(20), primary_key=True)
+    interval_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
+    next_poll_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_polled_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_changed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Keys of items already queued for analysis (most recent first, capped)
+    seen_keys: Mapped[list] = mapped_column(JSONB, nullable=False, server_default="[]")
@@ -0,0 +1,277 @@
+"""Adaptive concurrency limiting for the LLM and embedding APIs.
+
+One AdaptiveLimiter per provider is shared by every thread that calls it. Concurrency
+follows AIMD: each success adds 1/limit to the limit, each 429/overload halves it.
+Rate-limit headers (requests/tokens remaining and reset times) pause new requests
+before the provider starts rejecting them, and retries use jittered exponential
+backoff that honors retry-after.
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import AbstractContextManager, contextmanager
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, TypeVar
+
+import anthropic
+import openai
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+OVERLOAD_STATUS = frozenset({429, 503, 529})
+_CONNECTION_ERRORS = (anthropic.APIConnectionError, openai.APIConnectionError)
+
+# (requests remaining, tokens remaining, requests reset, tokens reset) per provider
+_HEADER_NAMES = (
+    (
+        "anthropic-ratelimit-requests-remaining",
+        "anthropic-ratelimit-tokens-remaining",
+        "anthropic-ratelimit-requests-reset",
+        "anthropic-ratelimit-tokens-reset",
+    ),
+    (
+        "x-ratelimit-remaining-requests",
+        "x-ratelimit-remaining-tokens",
+        "x-ratelimit-reset-requests",
+        "x-ratelimit-reset-tokens",
+    ),
+)
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_number(value: Any) -> float | None:
+    if not isinstance(value, str):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _parse_reset(value: Any) -> float | None:
+    """Seconds until reset from "1.5", "6m0s"/"120ms" (OpenAI) or an RFC 3339 time (Anthropic)."""
+    if not isinstance(value, str) or not value:
+        return None
+    if (seconds := _parse_number(value)) is not None:
+        return seconds
+    if parts := _DURATION_RE.findall(value):
+        return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return max((reset_at - datetime.now(UTC)).total_seconds(), 0.0)
+
+
+def _headers_of(obj: Any) -> Mapping[str, str] | None:
+    headers = getattr(obj, "headers", None)
+    return headers if isinstance(headers, Mapping) else None
+
+
+def retry_after_seconds(headers: Mapping[str, str] | None) -> float | None:
+    """Delay requested by retry-after-ms / retry-after (seconds or HTTP date)."""
+    if not headers:
+        return None
+    if (ms := _parse_number(headers.get("retry-after-ms"))) is not None:
+        return ms / 1000
+    value = headers.get("retry-after")
+    if (seconds := _parse_number(value)) is not None:
+        return seconds
+    if isinstance(value, str):
+        try:
+            return max((parsedate_to_datetime(value) - datetime.now(UTC)).total_seconds(), 0.0)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def _status_of(error: Exception) -> int | None:
+    status = getattr(error, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limiter with header-driven pacing and jittered retries."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.name = name
+        self.max_concurrency = max(max_concurrency, min_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.requests_remaining: float | None = None
+        self.tokens_remaining: float | None = None
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    # --- Slot management ---
+
+    def _acquire(self) -> None:
+        with self._cond:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def _release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def _pause(self, seconds: float) -> None:
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    # --- Feedback ---
+
+    def record_success(self, headers: Mapping[str, str] | None = None) -> None:
+        """Additive increase, unless the provider reports its per-minute budget is nearly spent."""
+        pause = None
+        with self._cond:
+            for req_name, tok_name, req_reset, tok_reset in _HEADER_NAMES if headers else ():
+                requests = _parse_number(headers.get(req_name))
+                tokens = _parse_number(headers.get(tok_name))
+                if requests is None and tokens is None:
+                    continue
+                self.requests_remaining, self.tokens_remaining = requests, tokens
+                if requests is not None and requests < 1:
+                    pause = _parse_reset(headers.get(req_reset))
+                elif tokens is not None and tokens < 1:
+                    pause = _parse_reset(headers.get(tok_reset))
+                break
+            scarce = self.requests_remaining is not None and self.requests_remaining <= self.limit
+            if not scarce:
+                self.limit = min(self.limit + 1 / self.limit, float(self.max_concurrency))
+            self._cond.notify_all()
+        if pause:
+            logger.info("%s rate limit budget spent; pausing %.1fs", self.name, pause)
+            self._pause(pause)
+
+    def record_overload(self, delay: float | None = None) -> None:
+        """Multiplicative decrease; optionally hold all new requests for delay seconds."""
+        with self._cond:
+            self.limit = max(self.limit / 2, float(self.min_concurrency))
+        logger.warning("%s overloaded; concurrency limit now %d", self.name, int(self.limit))
+        if delay:
+            self._pause(delay)
+
+    def _backoff(self, attempt: int, error: Exception) -> float | None:
+        """Delay before retrying error, or None if it should not be retried."""
+        status = _status_of(error)
+        if status is None and not isinstance(error, _CONNECTION_ERRORS):
+            return None
+        if status is not None and status not in RETRYABLE_STATUS:
+            return None
+        if attempt >= self.max_retries:
+            return None
+        retry_after = retry_after_seconds(_headers_of(getattr(error, "response", None)))
+        if status in OVERLOAD_STATUS:
+            self.record_overload(retry_after)
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    # --- Public API ---
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """
+        Run fn inside a concurrency slot, retrying overloads and transient errors.
+
+        The result's headers (e.g. a with_raw_response object) feed the limiter.
+        """
+        attempt = 0
+        while True:
+            self._acquire()
+            try:
+                result = fn()
+            except Exception as e:
+                self._release()
+                delay = self._backoff(attempt, e)
+                if delay is None:
+                    raise
+                logger.warning("%s request failed (%s); retry %d in %.1fs", self.name, e, attempt + 1, delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._release()
+            self.record_success(_headers_of(result))
+            return result
+
+    @contextmanager
+    def stream(self, open_stream: Callable[[], AbstractContextManager[T]]) -> Iterator[T]:
+        """
+        Hold a slot for the lifetime of a streaming response.
+
+        Opening the stream is retried like call(); an overload raised mid-stream is
+        recorded and re-raised, since partial output cannot be replayed here.
+        """
+        attempt = 0
+        while True:
+            self._acquire()
+            try:
+                manager = open_stream()
+                stream = manager.__enter__()
+            except Exception as e:
+                self._release()
+                delay = self._backoff(attempt, e)
+                if delay is None:
+                    raise
+                logger.warning("%s stream failed to open (%s); retry %d in %.1fs", self.name, e, attempt + 1, delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            break
+        try:
+            yield stream
+        except BaseException as e:
+            if isinstance(e, Exception) and _status_of(e) in OVERLOAD_STATUS:
+                self.record_overload()
+            manager.__exit__(type(e), e, e.__traceback__)
+            raise
+        else:
+            manager.__exit__(None, None, None)
+            self.record_success(_headers_of(getattr(stream, "response", None)))
+        finally:
+            self._release()
+
+
+anthropic_limiter = AdaptiveLimiter(
+    "anthropic",
+    max_concurrency=settings.anthropic_max_concurrency,
+    max_retries=settings.api_max_retries,
+    backoff_base=settings.api_backoff_base_seconds,
+    backoff_max=settings.api_backoff_max_seconds,
+)
+
+openai_limiter = AdaptiveLimiter(
+    "openai",
+    max_concurrency=settings.openai_max_concurrency,
+    max_retries=settings.api_max_retries,
+    backoff_base=settings.api_backoff_base_seconds,
+    backoff_max=settings.api_backoff_max_seconds,
+)
@@ -1,25 +1,32 @@
-"""Intel API: list and run pipeline."""
+"""Intel API: list, search, and queue and track pipeline runs."""
 
-from uuid import UUID
+from datetime import datetime
+from typing import Literal
+from uuid import UUID, uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_session, get_session_optional
 from services.intel_service import (
+    encode_cursor,
     get_intel_by_id,
+    get_intel_hybrid_search,
     get_intel_items,
     get_intel_semantic_search,
     get_tracked_competitors_from_db,
-    run_pipeline,
 )
+from services.pipeline_queue import cancel_run, enqueue_pipeline, get_run_progress
 
 router = APIRouter(prefix="/intel", tags=["intel"])
 
+_EMPTY_PAGE = {"items": [], "count": 0, "next_cursor": None}
+
 
 def _intel_to_dict(item) -> dict:
-    """Convert IntelItem to JSON-serializable dict."""
+    """Convert an IntelItem (or a get_intel_items row) to a JSON-serializable dict."""
     return {
         "id": str(item.id),
         "competitor": item.competitor,
@@ -35,34 +42,68 @@ def _intel_to_dict(item) -> dict:
     }
 
 
+async def _intel_page(session: AsyncSession, limit: int, cursor: str | None, **filters) -> JSONResponse:
+    """One page of intel items plus next_cursor (None on the last page)."""
+    try:
+        items = await get_intel_items(session, limit=limit + 1, cursor=cursor, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    items = items[:limit]
+    # Plain dicts of str/float/None: skip FastAPI's jsonable_encoder pass
+    return JSONResponse({"items": [_intel_to_dict(i) for i in items], "count": len(items), "next_cursor": next_cursor})
+
+
 @router.get("")
 async def list_intel(
     session: AsyncSession | None = Depends(get_session_optional),
     competitor: str | None = Query(None, description="Filter by competitor"),
     signal_type: str | None = Query(None, description="Filter by signal type"),
     limit: int = Query(100, ge=1, le=500),
-) -> dict:
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+) -> JSONResponse:
     """List intel items with optional filters. Returns empty when DB is not configured or unreachable."""
     if session is None:
-        return {"items": [], "count": 0}
+        return JSONResponse(_EMPTY_PAGE)
     try:
-        items = await get_intel_items(
-            session, competitor=competitor, signal_type=signal_type, limit=limit
+        return await _intel_page(
+            session, limit, cursor, competitor=competitor, signal_type=signal_type
         )
-        return {"items": [_intel_to_dict(i) for i in items], "count": len(items)}
     except (OSError, OperationalError):
         # DB unreachable (e.g. bad host, offline, getaddrinfo failed)
-        return {"items": [], "count": 0}
+        return JSONResponse(_EMPTY_PAGE)
 
 
 @router.get("/search")
 async def search_intel(
-    q: str = Query(..., min_length=1, description="Search query for semantic similarity"),
+    q: str = Query(..., min_length=1, description='Search query; wrap in quotes for exact terms'),
     session: AsyncSession = Depends(get_session),
     limit: int = Query(20, ge=1, le=100),
+    mode: Literal["hybrid", "semantic"] = Query("hybrid", description="hybrid (lexical + vector) or semantic only"),
+    competitor: str | None = Query(None, description="Filter by competitor"),
+    signal_type: str | None = Query(None, description="Filter by signal type"),
+    threat_level: str | None = Query(None, description="Filter by threat level (HIGH, MEDIUM, LOW)"),
+    since: datetime | None = Query(None, description="Only items detected at or after this time"),
+    until: datetime | None = Query(None, description="Only items detected before this time"),
+    max_distance: float | None = Query(None, ge=0, le=2, description="Drop matches with cosine distance above this"),
 ) -> dict:
-    """Semantic search: find intel items similar to the query (requires OpenAI embeddings)."""
-    items = await get_intel_semantic_search(session, q, limit=limit)
+    """
+    Search intel items. Hybrid mode fuses full-text and embedding similarity and still
+    works without OpenAI embeddings; semantic mode is embedding similarity only.
+    Filters and max_distance are applied inside the database query.
+    """
+    search = get_intel_hybrid_search if mode == "hybrid" else get_intel_semantic_search
+    items = await search(
+        session,
+        q,
+        limit=limit,
+        max_distance=max_distance,
+        competitor=competitor,
+        signal_type=signal_type,
+        threat_level=threat_level,
+        since=since,
+        until=until,
+    )
     return {"items": [_intel_to_dict(i) for i in items], "count": len(items)}
 
 
@@ -71,12 +112,10 @@ async def list_intel_by_signal(
     signal_type: str,
     session: AsyncSession = Depends(get_session),
     limit: int = Query(100, ge=1, le=500),
-) -> dict:
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+) -> JSONResponse:
     """List intel items by signal type (e.g. PRODUCT_LAUNCH, PRICING_CHANGE)."""
-    items = await get_intel_items(
-        session, signal_type=signal_type, limit=limit
-    )
-    return {"items": [_intel_to_dict(i) for i in items], "count": len(items)}
+    return await _intel_page(session, limit, cursor, signal_type=signal_type)
 
 
 @router.get("/{competitor}")
@@ -84,12 +123,10 @@ async def list_intel_by_competitor(
     competitor: str,
     session: AsyncSession = Depends(get_session),
     limit: int = Query(100, ge=1, le=500),
-) -> dict:
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+) -> JSONResponse:
     """List intel items for a specific competitor."""
-    items = await get_intel_items(
-        session, competitor=competitor, limit=limit
-    )
-    return {"items": [_intel_to_dict(i) for i in items], "count": len(items)}
+    return await _intel_page(session, limit, cursor, competitor=competitor)
 
 
 @router.get("/item/{item_id}")
@@ -97,26 +134,28 @@ async def get_intel_item(
     item_id: UUID,
     session: AsyncSession = Depends(get_session),
 ) -> dict:
-    """Fetch a single intel item by ID."""
+    """Fetch a single intel item by ID, including its scraped source text."""
     item = await get_intel_by_id(session, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Intel item not found")
-    return _intel_to_dict(item)
+    return {**_intel_to_dict(item), "raw_content": item.content.raw_content if item.content else None}
 
 
-@router.post("/run")
+@router.post("/run", status_code=202)
 async def run_intel_pipeline(
     competitor: str | None = Query(None, description="Run for one competitor (name or slug); omit for all"),
     session: AsyncSession = Depends(get_session),
 ) -> dict:
     """
-    Run scrape -> analyze -> store pipeline.
+    Queue a scrape -> analyze -> embed -> store run and return its id immediately.
 
     Specify ?competitor=AppFolio or ?competitor=appfolio for one, or omit to run for all tracked competitors.
+    A competitor whose previous run is still in flight joins that run instead of starting another.
+    Follow progress at GET /intel/runs/{run_id}.
     """
     competitors = await get_tracked_competitors_from_db(session)
     if not competitors:
-        return {"created": 0, "competitors_run": [], "message": "No competitors configured"}
+        return {"run_id": None, "competitors_run": [], "runs": [], "message": "No competitors configured"}
 
     if competitor:
         key = competitor.strip().lower()
@@ -136,12 +175,32 @@ async def run_intel_pipeline(
             )
         competitors = [comp_match]
 
-    total_created = 0
+    new_run_id = uuid4()
+    runs = []
     for comp in competitors:
-        created = await run_pipeline(comp, session)
-        total_created += len(created)
-
+        run_id, joined = await enqueue_pipeline(session, comp, run_id=new_run_id)
+        runs.append({"competitor": comp.name, "run_id": str(run_id), "joined": joined})
+    started = [r for r in runs if not r["joined"]]
     return {
-        "created": total_created,
-        "competitors_run": [c.name for c in competitors],
+        "run_id": (started or runs)[0]["run_id"],
+        "competitors_run": [r["competitor"] for r in runs],
+        "runs": runs,
     }
+
+
+@router.get("/runs/{run_id}")
+async def get_run(run_id: UUID, session: AsyncSession = Depends(get_session)) -> dict:
+    """Progress of a pipeline run: per-competitor job counts by stage and status, intel created, errors."""
+    progress = await get_run_progress(session, run_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return progress
+
+
+@router.post("/runs/{run_id}/cancel")
+async def cancel_pipeline_run(run_id: UUID, session: AsyncSession = Depends(get_session)) -> dict:
+    """Cancel a run's queued and in-progress jobs; intel already stored is kept."""
+    cancelled = await cancel_run(session, run_id)
+    if not cancelled and await get_run_progress(session, run_id) is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return {"run_id": str(run_id), "cancelled": cancelled}
@@ -1,15 +1,24 @@
-"""Weekly scheduler for Monday morning digest: scrape -> analyze -> store -> send_digest."""
+"""Scheduler: adaptive source polling, the Monday morning digest and partition retention."""
 
 import logging
-from datetime import UTC
+from datetime import UTC, timedelta
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from config import settings
 from database import session_context
 from digest import create_and_send_digest
-from services.intel_service import get_tracked_competitors_from_db, run_pipeline
+from services.intel_service import (
+    backfill_embeddings,
+    get_tracked_competitors_from_db,
+)
+from services.job_lease import with_lease
+from services.retention import run_retention
+from services.source_polling import poll_due_sources
+from services.streaming_pipeline import run_streaming_pipeline
+from triage import refresh_triage_model
 
 logger = logging.getLogger(__name__)
 
@@ -18,28 +27,51 @@ _scheduler: AsyncIOScheduler | None = None
 
 async def _weekly_digest_job() -> None:
     """
-    Run the full pipeline: scrape all competitors -> analyze -> store -> send digest.
+    Build and send the weekly digest from stored intel.
 
-    Runs every Monday at 7:00 AM (UTC by default; configure timezone in trigger if needed).
+    With source polling on (the default), intel is collected continuously by
+    _source_polling_job and this job only reads it. With polling off it first runs the
+    full pipeline for every competitor. Runs every Monday at 7:00 AM UTC.
     """
     if not settings.database_url:
         logger.warning("Skipping weekly digest: DATABASE_URL not configured")
         return
 
+    # Read-only setup; the session is closed before the pipeline so no transaction idles through it
+    competitors = None
     async with session_context() as session:
-        # 1. Scrape -> Analyze -> Store for each competitor
-        competitors = await get_tracked_competitors_from_db(session)
-        total_created = 0
-        for comp in competitors:
-            try:
-                created = await run_pipeline(comp, session)
-                total_created += len(created)
-                if created:
-                    logger.info("Pipeline created %d intel items for %s", len(created), comp.name)
-            except Exception as e:
-                logger.exception("Pipeline failed for %s: %s", comp.name, e)
-
-        logger.info("Pipeline complete: %d total intel items from %d competitors", total_created, len(competitors))
+        # 0. Retrain the local pre-triage model on the latest stored intel
+        try:
+            await refresh_triage_model(session)
+        except Exception as e:
+            logger.exception("Triage model refresh failed; using rules only: %s", e)
+        if not settings.source_polling_enabled:
+            competitors = await get_tracked_competitors_from_db(session)
+
+    # 1. Without polling: Scrape -> Analyze -> Embed -> Store for all competitors
+    if competitors is not None:
+        results = await run_streaming_pipeline(competitors)
+        failed = [
+            f"{r.competitor} (partial, {r.created} stored)" if r.partial else r.competitor
+            for r in results
+            if not r.ok
+        ]
+        logger.info(
+            "Pipeline complete: %d total intel items from %d competitors (%d failed%s)",
+            sum(r.created for r in results),
+            len(competitors),
+            len(failed),
+            f": {', '.join(failed)}" if failed else "",
+        )
+
+    async with session_context() as session:
+        # Re-embed rows left without a vector (e.g. after switching embedding backend)
+        try:
+            backfilled = await backfill_embeddings(session)
+            if backfilled:
+                logger.info("Backfilled embeddings for %d intel items", backfilled)
+        except Exception as e:
+            logger.exception("Embedding backfill failed: %s", e)
 
         # 2. Build and send digest email
         digest = await create_and_send_digest(session, since_days=7)
@@ -49,6 +81,25 @@ async def _weekly_digest_job() -> None:
             logger.warning("Digest send failed or Resend not configured")
 
 
+async def _source_polling_job() -> None:
+    """Scrape due competitor sources and queue their new items for analysis."""
+    if not settings.database_url or not settings.source_polling_enabled:
+        return
+    queued = await poll_due_sources()
+    if queued:
+        logger.info("Source polling queued %d new items for analysis", queued)
+
+
+async def _retention_job() -> None:
+    """Create upcoming intel_items partitions; if enabled, archive and detach ones past the retention window."""
+    if not settings.database_url:
+        return
+    async with session_context() as session:
+        archived = await run_retention(session)
+    if archived:
+        logger.info("Archived intel partitions: %s", ", ".join(archived))
+
+
 def get_scheduler() -> AsyncIOScheduler:
     """Create and configure the scheduler (call once at startup)."""
     global _scheduler
@@ -57,12 +108,28 @@ def get_scheduler() -> AsyncIOScheduler:
 
     _scheduler = AsyncIOScheduler(timezone=UTC)
     # Every Monday at 7:00 AM UTC
+    # Every process runs the scheduler; job leases make each run happen in one of them
     _scheduler.add_job(
-        _weekly_digest_job,
+        with_lease("weekly_digest", _weekly_digest_job, min_interval=timedelta(days=1)),
         CronTrigger(day_of_week="mon", hour=7, minute=0, timezone=UTC),
         id="weekly_digest",
         name="Weekly Monday Digest",
     )
+    # Due sources are polled every few minutes; each source's own interval adapts to its change rate
+    tick = settings.source_poll_tick_minutes
+    _scheduler.add_job(
+        with_lease("source_polling", _source_polling_job, min_interval=timedelta(minutes=tick / 2)),
+        IntervalTrigger(minutes=tick, timezone=UTC),
+        id="source_polling",
+        name="Adaptive Source Polling",
+    )
+    # Daily at 3:00 AM UTC: keeps next months' partitions ahead of inserts
+    _scheduler.add_job(
+        with_lease("intel_retention", _retention_job, min_interval=timedelta(hours=1)),
+        CronTrigger(hour=3, minute=0, timezone=UTC),
+        id="intel_retention",
+        name="Intel Partition Retention",
+    )
     return _scheduler
 
 
@@ -73,7 +140,11 @@ def start_scheduler() -> None:
         return
     sched = get_scheduler()
     sched.start()
-    logger.info("Scheduler started: weekly digest Mondays 7:00 AM UTC")
+    logger.info(
+        "Scheduler started: source polling every %d min, weekly digest Mondays 7:00 AM UTC, "
+        "retention daily 3:00 AM UTC",
+        settings.source_poll_tick_minutes,
+    )
 
 
 def shutdown_scheduler() -> None:
@@ -94,12 +94,14 @@ def fetch_blog_posts(
     blog_url: str,
     *,
     timeout: float = DEFAULT_TIMEOUT,
+    raise_errors: bool = False,
 ) -> list[dict[str, Any]]:
     """
     Fetch blog posts from a competitor blog URL.
 
     Tries RSS/Atom feed first (common paths: /feed, /rss, /blog/feed).
-    Falls back to HTML link extraction.
+    Falls back to HTML link extraction. With raise_errors, a failure to fetch the
+    blog page itself raises RuntimeError instead of returning [].
 
     Returns:
         List of dicts with title, url, snippet, date (agent-compatible)
@@ -126,7 +128,8 @@ def fetch_blog_posts(
             resp = client.get(blog_url)
             resp.raise_for_status()
             items = _parse_html_articles(resp.text, blog_url)
-        except Exception:
-            pass
+        except Exception as e:
+            if raise_errors:
+                raise RuntimeError(f"Blog scrape failed: {e}") from e
 
     return items
@@ -47,11 +47,18 @@ def fetch_reviews(
     competitor_name: str,
     g2_slug: str | None = None,
     capterra_slug: str | None = None,
+    *,
+    raise_errors: bool = False,
+    errors: list[str] | None = None,
 ) -> list[dict[str, Any]]:
     """
     Fetch reviews for a competitor from G2 and Capterra via Google Search (SerpAPI).
     Raises ValueError if SERPAPI_KEY is missing.
 
+    Both searches always run. A failed search is skipped and its error appended to
+    errors (when given), so the other site's reviews are still returned. With
+    raise_errors, RuntimeError is raised if both searches fail.
+
     Args:
         competitor_name: Display name (e.g. "AppFolio")
         g2_slug: G2 product slug (e.g. "appfolio")
@@ -61,6 +68,7 @@ def fetch_reviews(
         List of dicts with title, url, snippet, date (agent-compatible)
     """
     items: list[dict[str, Any]] = []
+    failures: list[str] = []
     g2_slug = g2_slug or competitor_name.lower().replace(" ", "-")
     capterra_slug = capterra_slug or g2_slug
 
@@ -72,8 +80,8 @@ def fetch_reviews(
             "num": 10,
         })
         items.extend(_parse_google_organic(g2_data))
-    except (httpx.HTTPError, RuntimeError):
-        pass
+    except (httpx.HTTPError, RuntimeError) as e:
+        failures.append(f"G2 reviews scrape failed: {e}")
     # ValueError (missing API key) propagates
 
     # Capterra reviews: site:capterra.com "Competitor" reviews
@@ -92,7 +100,11 @@ def fetch_reviews(
                 items.append(c)
             if len(items) >= MAX_ITEMS_PER_SOURCE * 2:
                 break
-    except (httpx.HTTPError, RuntimeError):
-        pass
+    except (httpx.HTTPError, RuntimeError) as e:
+        failures.append(f"Capterra reviews scrape failed: {e}")
 
+    if errors is not None:
+        errors.extend(failures)
+    if raise_errors and len(failures) == 2:
+        raise RuntimeError("; ".join(failures))
     return items[:MAX_ITEMS_PER_SOURCE * 2]
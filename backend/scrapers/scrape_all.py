@@ -13,6 +13,50 @@ if TYPE_CHECKING:
     from models import Competitor
 
 
+SOURCES = ("blog", "reviews", "jobs")
+
+
+def _source_config(
+    competitor: Competitor | CompetitorSource | str,
+) -> tuple[str, str | None, str | None, str | None]:
+    """(name, blog_url, g2_slug, capterra_slug) for any accepted competitor form."""
+    if isinstance(competitor, str):
+        config = get_competitor(competitor) or {}
+        return competitor, config.get("blog_url"), config.get("g2_slug"), config.get("capterra_slug")
+    if isinstance(competitor, dict):
+        name = (competitor.get("name") or "").strip() or ""
+        return name, competitor.get("blog_url"), competitor.get("g2_slug"), competitor.get("capterra_slug")
+    return competitor.name, competitor.blog_url, competitor.g2_slug, competitor.capterra_slug
+
+
+def scrape_source(
+    competitor: Competitor | CompetitorSource | str,
+    source: str,
+    *,
+    raise_errors: bool = True,
+    errors: list[str] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Scrape one source ("blog", "reviews" or "jobs") for a competitor.
+
+    Accepts the same competitor forms as scrape_competitor. By default fetch errors
+    are raised rather than returned as [], so callers can tell a failed scrape from
+    an empty one. When only part of a source fails (one of the two review searches),
+    the rest is returned and the failure appended to errors (when given). A blog
+    without a configured blog_url returns [].
+    """
+    name, blog_url, g2_slug, capterra_slug = _source_config(competitor)
+    if source == "blog":
+        return fetch_blog_posts(blog_url, raise_errors=raise_errors) if blog_url else []
+    if source == "reviews":
+        return fetch_reviews(
+            name, g2_slug=g2_slug, capterra_slug=capterra_slug, raise_errors=raise_errors, errors=errors
+        )
+    if source == "jobs":
+        return fetch_job_listings(name)
+    raise ValueError(f"Unknown source: {source}")
+
+
 def scrape_competitor(
     competitor: Competitor | CompetitorSource | str,
 ) -> list[dict[str, Any]]:
@@ -30,45 +74,10 @@ def scrape_competitor(
     Returns:
         Combined list of agent-compatible dicts (title, url, snippet, date, raw_content)
     """
-    if isinstance(competitor, str):
-        config = get_competitor(competitor)
-        name = competitor
-        blog_url = (config or {}).get("blog_url")
-        g2_slug = (config or {}).get("g2_slug")
-        capterra_slug = (config or {}).get("capterra_slug")
-    elif isinstance(competitor, dict):
-        name = (competitor.get("name") or "").strip() or ""
-        blog_url = competitor.get("blog_url")
-        g2_slug = competitor.get("g2_slug")
-        capterra_slug = competitor.get("capterra_slug")
-    else:
-        name = competitor.name
-        blog_url = competitor.blog_url
-        g2_slug = competitor.g2_slug
-        capterra_slug = competitor.capterra_slug
-
     items: list[dict[str, Any]] = []
-
-    if blog_url:
+    for source in SOURCES:
         try:
-            items.extend(fetch_blog_posts(blog_url))
+            items.extend(scrape_source(competitor, source, raise_errors=False))
         except Exception:
             pass
-
-    try:
-        items.extend(
-            fetch_reviews(
-                name,
-                g2_slug=g2_slug,
-                capterra_slug=capterra_slug,
-            )
-        )
-    except Exception:
-        pass
-
-    try:
-        items.extend(fetch_job_listings(name))
-    except Exception:
-        pass
-
     return items
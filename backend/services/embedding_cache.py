@@ -0,0 +1,134 @@
+"""Embedding cache: in-process LRU in front of the Postgres embedding_cache table.
+
+Keys are (model, dimensions, SHA-256 of the normalized text), so the same summary or
+search query is only ever sent to the embeddings API once per model.
+"""
+
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from collections import OrderedDict
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from embeddings import EmbeddingBackend, get_backend, get_embeddings
+from models import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+CacheKey = tuple[str, int, str]
+
+_lru: OrderedDict[CacheKey, list[float]] = OrderedDict()
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC, trimmed, internal whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def cache_key(text: str, backend: EmbeddingBackend | None = None) -> CacheKey:
+    """(backend model name, dimensions, SHA-256 of normalized text); backend defaults to the active one."""
+    backend = backend or get_backend()
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return (backend.name, backend.dimensions, digest)
+
+
+def _lru_get(key: CacheKey) -> list[float] | None:
+    embedding = _lru.get(key)
+    if embedding is not None:
+        _lru.move_to_end(key)
+    return embedding
+
+
+def _lru_put(key: CacheKey, embedding: list[float]) -> None:
+    _lru[key] = embedding
+    _lru.move_to_end(key)
+    while len(_lru) > settings.embedding_cache_size:
+        _lru.popitem(last=False)
+
+
+def clear_lru() -> None:
+    _lru.clear()
+
+
+async def _load_from_db(session: AsyncSession, keys: list[CacheKey]) -> dict[CacheKey, list[float]]:
+    stmt = select(
+        EmbeddingCache.model,
+        EmbeddingCache.dimensions,
+        EmbeddingCache.text_hash,
+        EmbeddingCache.embedding,
+    ).where(
+        tuple_(EmbeddingCache.model, EmbeddingCache.dimensions, EmbeddingCache.text_hash).in_(keys)
+    )
+    rows = (await session.execute(stmt)).all()
+    return {(r.model, r.dimensions, r.text_hash): [float(x) for x in r.embedding] for r in rows}
+
+
+async def _store_in_db(session: AsyncSession, entries: dict[CacheKey, list[float]]) -> None:
+    stmt = pg_insert(EmbeddingCache).values(
+        [
+            {"model": m, "dimensions": d, "text_hash": h, "embedding": emb}
+            for (m, d, h), emb in entries.items()
+        ]
+    )
+    await session.execute(stmt.on_conflict_do_nothing())
+
+
+async def get_cached_embeddings(session: AsyncSession, texts: list[str]) -> list[list[float] | None]:
+    """
+    Embeddings for texts, aligned with input: LRU, then the DB table, then the API.
+
+    New embeddings are written to the cache table in the caller's transaction (the
+    caller commits). Cache table errors are isolated in a savepoint and only cost the
+    cache, never the caller's transaction.
+    """
+    backend = get_backend()  # once per batch: keys and fresh embeddings share one model
+    results: list[list[float] | None] = [None] * len(texts)
+    wanted: dict[CacheKey, list[int]] = {}
+    for i, text in enumerate(texts):
+        if not normalize_text(text):
+            continue
+        key = cache_key(text, backend)
+        if (hit := _lru_get(key)) is not None:
+            results[i] = hit
+        else:
+            wanted.setdefault(key, []).append(i)
+    if not wanted:
+        return results
+
+    found: dict[CacheKey, list[float]] = {}
+    with session.no_autoflush:
+        try:
+            async with session.begin_nested():
+                found = await _load_from_db(session, list(wanted))
+        except SQLAlchemyError as e:
+            logger.warning("Embedding cache lookup failed: %s", e)
+
+    missing = [key for key in wanted if key not in found]
+    if missing:
+        fresh = await asyncio.to_thread(get_embeddings, [texts[wanted[k][0]] for k in missing], backend)
+        new_entries = {k: emb for k, emb in zip(missing, fresh, strict=True) if emb}
+        if new_entries:
+            with session.no_autoflush:
+                try:
+                    async with session.begin_nested():
+                        await _store_in_db(session, new_entries)
+                except SQLAlchemyError as e:
+                    logger.warning("Embedding cache write failed: %s", e)
+        found.update(new_entries)
+
+    for key, positions in wanted.items():
+        if (embedding := found.get(key)) is not None:
+            _lru_put(key, embedding)
+            for i in positions:
+                results[i] = embedding
+    return results
+
+
+async def get_cached_embedding(session: AsyncSession, text: str) -> list[float] | None:
+    return (await get_cached_embeddings(session, [text]))[0]
@@ -1,15 +1,43 @@
-"""Intel pipeline: scrape -> analyze -> store."""
+"""Intel storage and queries: staging analyzed items, inserting them, and listing and search."""
 
 import asyncio
-from uuid import UUID
+import base64
+import binascii
+import json
+import logging
+import threading
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+from uuid import UUID, uuid4
 
-from sqlalchemy import select
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    Select,
+    bindparam,
+    func,
+    insert,
+    literal_column,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from agent import analyze_scraped_data
-from embeddings import get_embedding
-from models import Competitor, IntelItem
-from scrapers.scrape_all import scrape_competitor
+from agent import IntelAnalysis, stream_scraped_data
+from config import settings
+from database import session_context
+from models import Competitor, IntelItem, IntelItemContent, IntelItemEmbedding
+from services.embedding_cache import get_cached_embedding, get_cached_embeddings
+
+logger = logging.getLogger(__name__)
+
+RRF_K = 60  # Reciprocal rank fusion constant; damps the weight of top ranks
+_TS_CONFIG = literal_column("'english'", type_=REGCONFIG)  # Text search configuration
 
 
 async def get_tracked_competitors_from_db(session: AsyncSession) -> list[Competitor]:
@@ -18,79 +46,306 @@ async def get_tracked_competitors_from_db(session: AsyncSession) -> list[Competi
     return list(result.scalars().all())
 
 
-async def run_pipeline(
-    competitor: Competitor,
-    session: AsyncSession,
-) -> list[IntelItem]:
+async def _stream_analyses(
+    items: list[dict[str, Any]],
+    competitor_name: str,
+) -> AsyncIterator[tuple[int, IntelAnalysis]]:
     """
-    Scrape competitor data, analyze with Claude, and persist to DB.
+    Run the sync streaming agent in a worker thread and yield its analyses on the event loop.
 
-    Returns the created IntelItem records.
+    If the consumer stops early (error, timeout, cancellation) the thread is told to
+    close the agent stream at its next analysis instead of being awaited.
     """
-    # 1. Scrape (sync, run in thread pool)
-    items = await asyncio.to_thread(scrape_competitor, competitor)
-    if not items:
-        return []
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
 
-    # 2. Analyze (sync, run in thread pool)
-    analyses = await asyncio.to_thread(analyze_scraped_data, items, competitor.name)
-    if not analyses:
-        return []
+    def produce() -> None:
+        try:
+            for pair in stream_scraped_data(items, competitor_name):
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, pair)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
 
-    # 3. Map and insert
-    created: list[IntelItem] = []
-    for i, analysis in enumerate(analyses):
-        raw_item = items[i] if i < len(items) else {}
-        raw_content = raw_item.get("raw_content") or raw_item.get("snippet")
-        source_url = analysis.source_url or raw_item.get("url")
-
-        intel = IntelItem(
-            competitor=competitor.name,
-            signal_type=analysis.signal_type,
-            threat_level=analysis.threat_level,
-            threat_reason=analysis.threat_reason,
-            summary=analysis.summary,
-            happyco_response=analysis.happyco_response,
-            confidence=analysis.confidence,
-            source_url=source_url,
-            raw_content=raw_content,
-        )
-        # Generate embedding for semantic search (sync, run in thread pool)
-        embed_text = f"{analysis.summary} {analysis.threat_reason}".strip()
-        if embed_text:
-            embedding = await asyncio.to_thread(get_embedding, embed_text)
-            if embedding:
-                intel.embedding = embedding
-        session.add(intel)
-        created.append(intel)
+    producer = asyncio.create_task(asyncio.to_thread(produce))
+    finished = False
+    try:
+        while (got := await queue.get()) is not done:
+            if isinstance(got, Exception):
+                raise got
+            yield got
+        finished = True
+    finally:
+        if finished:
+            await producer
+        else:
+            stop.set()
 
-    await session.commit()
-    for item in created:
-        await session.refresh(item)
+
+@dataclass
+class _StagedIntel:
+    """A pipeline result waiting to be inserted: intel_items columns plus side-table data."""
+
+    row: dict[str, Any]
+    raw_content: str | None
+    embedding: list[float] | None = None
+
+    @property
+    def embed_text(self) -> str:
+        return _embed_text(self.row["summary"], self.row["threat_reason"])
+
+
+def _build_intel_item(
+    competitor_name: str,
+    analysis: IntelAnalysis,
+    raw_item: dict[str, Any],
+) -> _StagedIntel:
+    """Map an agent analysis and its scraped source item to a staged intel row."""
+    return _StagedIntel(
+        row={
+            "id": uuid4(),
+            "competitor": competitor_name,
+            "signal_type": analysis.signal_type,
+            "threat_level": analysis.threat_level,
+            "threat_reason": analysis.threat_reason,
+            "summary": analysis.summary,
+            "happyco_response": analysis.happyco_response,
+            "confidence": analysis.confidence,
+            "source_url": analysis.source_url or raw_item.get("url"),
+        },
+        raw_content=raw_item.get("raw_content") or raw_item.get("snippet"),
+    )
+
+
+def _search_document(summary: Any, threat_reason: Any, raw_content: Any) -> ColumnElement:
+    """tsvector of summary (weight A), threat_reason (B) and the first 100k chars of raw_content (C)."""
+
+    def weighted(text: Any, weight: str) -> ColumnElement:
+        vector = func.to_tsvector(_TS_CONFIG, func.coalesce(text, ""))
+        return func.setweight(vector, literal_column(f"'{weight}'"))
+
+    return (
+        weighted(summary, "A")
+        .op("||")(weighted(threat_reason, "B"))
+        .op("||")(weighted(func.left(raw_content, 100_000), "C"))
+    )
+
+
+async def _insert_intel_items(session: AsyncSession, staged: list[_StagedIntel]) -> list[IntelItem]:
+    """
+    Insert staged rows and their side-table rows, returning the IntelItems in input order.
+
+    One multi-row INSERT ... RETURNING per table: RETURNING brings back server
+    defaults (detected_at, created_at) so no per-row refresh is needed, and ids are
+    assigned up front so content and embeddings don't wait on it.
+    """
+    stmt = insert(IntelItem).returning(IntelItem, sort_by_parameter_order=True)
+    created = list(await session.scalars(stmt, [s.row for s in staged]))
+
+    content_stmt = insert(IntelItemContent.__table__).values(
+        item_id=bindparam("item_id"),
+        raw_content=bindparam("content"),
+        search_tsv=_search_document(bindparam("summary"), bindparam("reason"), bindparam("content")),
+    )
+    await session.execute(
+        content_stmt,
+        [
+            {
+                "item_id": s.row["id"],
+                "content": s.raw_content,
+                "summary": s.row["summary"],
+                "reason": s.row["threat_reason"],
+            }
+            for s in staged
+        ],
+    )
+    vectors = [{"item_id": s.row["id"], "embedding": s.embedding} for s in staged if s.embedding]
+    if vectors:
+        await session.execute(insert(IntelItemEmbedding.__table__), vectors)
     return created
 
 
+def _embed_text(summary: str | None, threat_reason: str | None) -> str:
+    return f"{summary or ''} {threat_reason or ''}".strip()
+
+
+async def backfill_embeddings(session: AsyncSession, *, batch_size: int = 500) -> int:
+    """
+    Embed stored items that have no embedding (e.g. after switching embedding backend).
+
+    Processes up to batch_size items per call; returns how many were embedded.
+    """
+    stmt = (
+        select(IntelItem.id, IntelItem.summary, IntelItem.threat_reason)
+        .outerjoin(IntelItemEmbedding, IntelItemEmbedding.item_id == IntelItem.id)
+        .where(IntelItemEmbedding.item_id.is_(None))
+        .limit(batch_size)
+    )
+    rows = (await session.execute(stmt)).all()
+    if not rows:
+        return 0
+    embeddings = await get_cached_embeddings(session, [_embed_text(r.summary, r.threat_reason) for r in rows])
+    vectors = [
+        {"item_id": r.id, "embedding": embedding}
+        for r, embedding in zip(rows, embeddings, strict=True)
+        if embedding
+    ]
+    if vectors:
+        await session.execute(pg_insert(IntelItemEmbedding.__table__).on_conflict_do_nothing(), vectors)
+    await session.commit()
+    return len(vectors)
+
+
+def encode_cursor(item: IntelItem | Row) -> str:
+    """Opaque keyset cursor pointing just past item in (detected_at, id) DESC order."""
+    raw = json.dumps([item.detected_at.isoformat(), str(item.id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Inverse of encode_cursor. Raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        detected_at, item_id = json.loads(raw)
+        return datetime.fromisoformat(detected_at), UUID(item_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+# Columns served by list endpoints and the digest
+INTEL_LIST_COLUMNS = (
+    IntelItem.id,
+    IntelItem.competitor,
+    IntelItem.signal_type,
+    IntelItem.threat_level,
+    IntelItem.threat_reason,
+    IntelItem.summary,
+    IntelItem.happyco_response,
+    IntelItem.confidence,
+    IntelItem.source_url,
+    IntelItem.detected_at,
+    IntelItem.created_at,
+)
+
+
 async def get_intel_items(
     session: AsyncSession,
     *,
     competitor: str | None = None,
     signal_type: str | None = None,
     limit: int = 100,
-) -> list[IntelItem]:
-    """Query intel items with optional filters."""
-    stmt = select(IntelItem).order_by(IntelItem.detected_at.desc()).limit(limit)
+    cursor: str | None = None,
+) -> list[Row]:
+    """
+    Query intel items with optional filters, newest first.
+
+    Returns Core rows of INTEL_LIST_COLUMNS (attribute access like IntelItem, without
+    ORM identity-map overhead).
+
+    Pass encode_cursor(last item) as cursor to fetch the next page. Paging is keyset
+    on (detected_at, id), so every page is an index range scan regardless of depth.
+    Raises ValueError for a malformed cursor.
+    """
+    stmt = (
+        select(*INTEL_LIST_COLUMNS)
+        .order_by(IntelItem.detected_at.desc(), IntelItem.id.desc())
+        .limit(limit)
+    )
+    stmt = _filter_intel(stmt, competitor=competitor, signal_type=signal_type)
+    if cursor:
+        stmt = stmt.where(tuple_(IntelItem.detected_at, IntelItem.id) < decode_cursor(cursor))
+    result = await session.execute(stmt)
+    return list(result.all())
+
+
+async def get_intel_by_id(session: AsyncSession, item_id: UUID) -> IntelItem | None:
+    """Fetch a single intel item by ID, with its raw content (item.content) joined in."""
+    stmt = select(IntelItem).options(joinedload(IntelItem.content)).where(IntelItem.id == item_id)
+    result = await session.execute(stmt)
+    return result.scalars().first()
+
+
+async def _configure_ann_scan(session: AsyncSession) -> None:
+    """
+    Set HNSW scan options for the current transaction.
+
+    hnsw.ef_search trades recall for speed. With hnsw.iterative_scan the index keeps
+    producing candidates until the query's WHERE filters have filled its LIMIT, so
+    filtered searches stay on the index instead of returning too few rows.
+    """
+    options = [func.set_config("hnsw.ef_search", str(settings.hnsw_ef_search), True)]
+    if settings.hnsw_iterative_scan:
+        options.append(func.set_config("hnsw.iterative_scan", settings.hnsw_iterative_scan, True))
+    await session.execute(select(*options))
+
+
+def _filter_intel(
+    stmt: Select,
+    *,
+    competitor: str | None = None,
+    signal_type: str | None = None,
+    threat_level: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> Select:
+    """Add the shared intel search filters to stmt's WHERE clause."""
     if competitor:
         stmt = stmt.where(IntelItem.competitor == competitor)
     if signal_type:
         stmt = stmt.where(IntelItem.signal_type == signal_type)
-    result = await session.execute(stmt)
-    return list(result.scalars().all())
+    if threat_level:
+        stmt = stmt.where(IntelItem.threat_level == threat_level.upper())
+    if since:
+        stmt = stmt.where(IntelItem.detected_at >= since)
+    if until:
+        stmt = stmt.where(IntelItem.detected_at < until)
+    return stmt
 
 
-async def get_intel_by_id(session: AsyncSession, item_id: UUID) -> IntelItem | None:
-    """Fetch a single intel item by ID."""
-    result = await session.execute(select(IntelItem).where(IntelItem.id == item_id))
-    return result.scalars().first()
+def _vector_search_stmt(embedding: list[float], limit: int, max_distance: float | None, **filters) -> Select:
+    """
+    ANN query ordered by cosine distance, with filters and the distance cutoff in SQL.
+
+    Returns (id, distance) rows. intel_items is joined only when filtering. Under
+    relaxed iterative scans rows can come back slightly out of order, so callers
+    re-sort by distance.
+    """
+    distance = IntelItemEmbedding.embedding.cosine_distance(embedding)
+    stmt = (
+        select(IntelItemEmbedding.item_id.label("id"), distance.label("distance"))
+        .order_by(distance)
+        .limit(limit)
+    )
+    if max_distance is not None:
+        stmt = stmt.where(distance <= max_distance)
+    if any(filters.values()):
+        stmt = stmt.join(IntelItem, IntelItem.id == IntelItemEmbedding.item_id)
+        stmt = _filter_intel(stmt, **filters)
+    return stmt
+
+
+async def _load_in_order(session: AsyncSession, ids: list[UUID]) -> list[IntelItem]:
+    if not ids:
+        return []
+    result = await session.execute(select(IntelItem).where(IntelItem.id.in_(ids)))
+    by_id = {item.id: item for item in result.scalars().all()}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+async def _query_embedding(query: str) -> list[float] | None:
+    """
+    Cached embedding of a search query. A newly computed one is written to the cache
+    in its own short session, so the request's session stays read-only.
+    """
+    async with session_context() as cache_session:
+        embedding = await get_cached_embedding(cache_session, query)
+        await cache_session.commit()
+    return embedding
 
 
 async def get_intel_semantic_search(
@@ -98,23 +353,92 @@ async def get_intel_semantic_search(
     query: str,
     *,
     limit: int = 20,
+    max_distance: float | None = None,
+    competitor: str | None = None,
+    signal_type: str | None = None,
+    threat_level: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
 ) -> list[IntelItem]:
     """
     Semantic search: find intel items most similar to the query text.
 
-    Returns items ordered by cosine similarity (closest first).
+    Returns items ordered by cosine similarity (closest first), restricted by the
+    optional filters and to cosine distance <= max_distance (0 = identical, 2 = opposite).
     Returns empty list if OpenAI key missing or no embeddings exist.
+    Query embeddings come from the embedding cache, so repeated queries skip the API.
     """
-    embedding = await asyncio.to_thread(get_embedding, query)
+    embedding = await _query_embedding(query)
     if not embedding:
         return []
+    await _configure_ann_scan(session)
 
-    # pgvector cosine_distance: lower = more similar
-    stmt = (
-        select(IntelItem)
-        .where(IntelItem.embedding.isnot(None))
-        .order_by(IntelItem.embedding.cosine_distance(embedding))
-        .limit(limit)
+    stmt = _vector_search_stmt(
+        embedding,
+        limit,
+        max_distance,
+        competitor=competitor,
+        signal_type=signal_type,
+        threat_level=threat_level,
+        since=since,
+        until=until,
     )
-    result = await session.execute(stmt)
-    return list(result.scalars().all())
+    rows = sorted((await session.execute(stmt)).all(), key=lambda r: r.distance)
+    return await _load_in_order(session, [r.id for r in rows])
+
+
+def _tsquery(query: str):
+    """websearch_to_tsquery: plain words are ANDed, "quoted phrases" match exactly, -word excludes."""
+    return func.websearch_to_tsquery(_TS_CONFIG, query)
+
+
+def _is_exact_query(query: str) -> bool:
+    """A fully quoted query asks for exact term matches, which lexical search answers alone."""
+    q = query.strip()
+    return len(q) > 2 and q[0] == q[-1] == '"'
+
+
+def _rrf_fuse(rankings: list[list[UUID]], k: int = RRF_K) -> list[UUID]:
+    """Reciprocal rank fusion: score(d) = sum over rankings of 1 / (k + rank of d)."""
+    scores: dict[UUID, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item_id: -scores[item_id])
+
+
+async def get_intel_hybrid_search(
+    session: AsyncSession,
+    query: str,
+    *,
+    limit: int = 20,
+    max_distance: float | None = None,
+    **filters,
+) -> list[IntelItem]:
+    """
+    Hybrid search: full-text (tsvector/GIN) and vector (pgvector ANN) results fused by
+    reciprocal rank.
+
+    Falls back to lexical-only when no query embedding is available (e.g. OpenAI key
+    missing). Fully quoted queries ("AppFolio Realm") are exact-term lookups and skip
+    the embedding entirely. filters (competitor, signal_type, threat_level, since,
+    until) apply to both retrievers; max_distance only to the vector side.
+    """
+    candidates = max(limit, settings.hybrid_search_candidates)
+    tsquery = _tsquery(query)
+    lexical_stmt = (
+        select(IntelItem.id)
+        .join(IntelItemContent, IntelItemContent.item_id == IntelItem.id)
+        .where(IntelItemContent.search_tsv.op("@@")(tsquery))
+        .order_by(func.ts_rank_cd(IntelItemContent.search_tsv, tsquery).desc(), IntelItem.detected_at.desc())
+        .limit(candidates)
+    )
+    rankings = [list((await session.execute(_filter_intel(lexical_stmt, **filters))).scalars().all())]
+
+    embedding = None if _is_exact_query(query) else await _query_embedding(query)
+    if embedding:
+        await _configure_ann_scan(session)
+        rows = (await session.execute(_vector_search_stmt(embedding, candidates, max_distance, **filters))).all()
+        rankings.append([r.id for r in sorted(rows, key=lambda r: r.distance)])
+
+    return await _load_in_order(session, _rrf_fuse(rankings)[:limit])
@@ -0,0 +1,142 @@
+"""Run scheduled jobs in one process at a time across API workers and replicas.
+
+Every process runs the scheduler, so every process fires each job. A job only
+proceeds in the process that takes its row in job_leases: the lease is free once it
+has expired and the job has not completed within its minimum interval (so a replica
+firing a few seconds late does not run it again). The holder renews the lease while
+the job runs and marks completion at the end; if the holder dies, the lease expires
+after settings.job_lease_ttl_seconds and another process can take over, and a holder
+that finds its lease taken cancels its run.
+
+All lease statements run in their own short transactions (database.session_context),
+which works through transaction-mode connection poolers.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import socket
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from uuid import uuid4
+
+from sqlalchemy import func, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from config import settings
+from database import session_context
+from models import JobLease
+
+logger = logging.getLogger(__name__)
+
+HOLDER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+
+async def acquire_lease(job_id: str, *, min_interval: timedelta = timedelta(0)) -> bool:
+    """Take the lease for job_id if it is free; True if this process now holds it."""
+    ttl = timedelta(seconds=settings.job_lease_ttl_seconds)
+    stmt = (
+        pg_insert(JobLease)
+        .values(job_id=job_id, holder=HOLDER_ID, expires_at=func.now() + ttl)
+        .on_conflict_do_update(
+            index_elements=[JobLease.job_id],
+            set_={"holder": HOLDER_ID, "expires_at": func.now() + ttl},
+            where=(JobLease.expires_at < func.now())
+            & or_(
+                JobLease.last_completed_at.is_(None),
+                JobLease.last_completed_at < func.now() - min_interval,
+            ),
+        )
+        .returning(JobLease.holder)
+    )
+    async with session_context() as session:
+        holder = (await session.execute(stmt)).scalar_one_or_none()
+        await session.commit()
+    return holder == HOLDER_ID
+
+
+async def renew_lease(job_id: str) -> bool:
+    """Extend this process's lease by the TTL; False if it is no longer the holder."""
+    ttl = timedelta(seconds=settings.job_lease_ttl_seconds)
+    stmt = (
+        update(JobLease)
+        .where(JobLease.job_id == job_id, JobLease.holder == HOLDER_ID)
+        .values(expires_at=func.now() + ttl)
+    )
+    async with session_context() as session:
+        result = await session.execute(stmt)
+        await session.commit()
+    return result.rowcount == 1
+
+
+async def release_lease(job_id: str, *, completed: bool) -> None:
+    """Free the lease; completed=True also starts the job's minimum interval."""
+    values = {"expires_at": func.now()}
+    if completed:
+        values["last_completed_at"] = func.now()
+    stmt = update(JobLease).where(JobLease.job_id == job_id, JobLease.holder == HOLDER_ID).values(**values)
+    async with session_context() as session:
+        await session.execute(stmt)
+        await session.commit()
+
+
+async def _keep_renewed(job_id: str, task: asyncio.Task) -> None:
+    """Renew the lease while task runs; cancel task if another process has taken the lease."""
+    while True:
+        await asyncio.sleep(settings.job_lease_ttl_seconds / 3)
+        try:
+            if not await renew_lease(job_id):
+                logger.error("Lost lease for job %s to another process; cancelling this run", job_id)
+                task.cancel()
+                return
+        except Exception as e:
+            logger.warning("Lease renewal for job %s failed: %s", job_id, e)
+
+
+def with_lease(
+    job_id: str,
+    job: Callable[[], Awaitable[None]],
+    *,
+    min_interval: timedelta = timedelta(0),
+) -> Callable[[], Awaitable[None]]:
+    """
+    Wrap a scheduled job so it runs only in the process holding its lease.
+
+    The job runs as a task next to a renewer; if a renewal finds the lease taken (e.g.
+    this process stalled past the TTL), the job is cancelled so it never runs
+    alongside the new holder.
+    """
+
+    @functools.wraps(job)
+    async def run() -> None:
+        if not settings.database_url:
+            await job()
+            return
+        if not await acquire_lease(job_id, min_interval=min_interval):
+            logger.info("Job %s is running or ran recently in another process; skipping", job_id)
+            return
+        task = asyncio.create_task(job())
+        renewer = asyncio.create_task(_keep_renewed(job_id, task))
+
+        def lease_lost() -> bool:
+            return renewer.done() and not renewer.cancelled()
+
+        completed = False
+        try:
+            await task
+            completed = True
+        except asyncio.CancelledError:
+            if not lease_lost():
+                raise  # cancelled from outside (e.g. scheduler shutdown)
+            logger.warning("Job %s stopped after losing its lease", job_id)
+        finally:
+            lost = lease_lost()
+            renewer.cancel()
+            if not lost:
+                try:
+                    await release_lease(job_id, completed=completed)
+                except Exception as e:
+                    logger.warning("Releasing lease for job %s failed; it will expire: %s", job_id, e)
+
+    return run
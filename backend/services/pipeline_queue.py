@@ -0,0 +1,518 @@
+"""Durable, staged pipeline queue: scrape -> analyze -> embed -> store in pipeline_jobs.
+
+Each stage's output is persisted before the next stage starts, so a late failure
+(e.g. the commit after Claude has answered) does not throw away earlier work:
+
+- scrape: scrape one competitor's sources, drop items already queued (by this or by
+  source polling, services.seen_items), triage, then fan out into analyze jobs of
+  settings.pipeline_queue_chunk_items items each (one transaction).
+- analyze: run the agent on the chunk; payload becomes the staged intel rows.
+- embed: embed the staged rows; vectors are persisted in the embedding_cache table.
+- store: insert the rows (embeddings are cache hits) and mark the job done in the
+  same transaction, so rows are stored exactly once.
+
+Workers claim batches per stage with FOR UPDATE SKIP LOCKED (claim_jobs), so any
+number of workers can pull from any subset of stages; each worker runs one consumer
+per stage (run_queue_worker), so a slow scrape does not starve analyze or store. A claimed job stays claimed
+for settings.pipeline_queue_visibility_seconds, extended while its handler runs; if
+its worker dies, another picks it up from the last completed stage. Failures and
+expired claims both count as attempts: after settings.pipeline_queue_max_attempts
+per stage the job is marked failed.
+
+Jobs sharing a run_id form a run. POST /intel/run starts runs with
+enqueue_pipeline (joining a competitor's in-flight run rather than starting a
+second), GET /intel/runs/{id} reports get_run_progress, and cancel_run stops one.
+"""
+
+import asyncio
+import json
+import logging
+from collections.abc import Iterable
+from datetime import timedelta
+from typing import Any
+from uuid import UUID, uuid4
+
+from sqlalchemy import exists, func, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from config import settings
+from database import session_context
+from models import Competitor, PipelineJob
+from scrapers.scrape_all import SOURCES, scrape_source
+from services.embedding_cache import get_cached_embeddings
+from services.intel_service import (
+    _build_intel_item,
+    _insert_intel_items,
+    _StagedIntel,
+    _stream_analyses,
+)
+from services.job_lease import HOLDER_ID
+from services.seen_items import take_unseen
+from triage import ensure_triage_model, triage_items
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("scrape", "analyze", "embed", "store")
+ACTIVE_STATUSES = ("pending", "running")
+RETRY_BASE_SECONDS = 30
+
+
+async def _in_flight_run(session: AsyncSession, competitor_id: UUID) -> UUID | None:
+    """Id of a full run (one that started with a scrape) still working on competitor_id, if any."""
+    scrape = aliased(PipelineJob)
+    stmt = (
+        select(PipelineJob.run_id)
+        .where(PipelineJob.competitor_id == competitor_id, PipelineJob.status.in_(ACTIVE_STATUSES))
+        .where(exists().where(scrape.run_id == PipelineJob.run_id, scrape.stage == "scrape"))
+        .limit(1)
+    )
+    return (await session.execute(stmt)).scalar_one_or_none()
+
+
+async def enqueue_pipeline(
+    session: AsyncSession,
+    competitor: Competitor,
+    *,
+    run_id: UUID | None = None,
+) -> tuple[UUID, bool]:
+    """
+    Queue a full run (scrape job) for competitor, or join the run already in flight.
+
+    Returns (run_id, joined) and commits. A partial unique index allows one pending or
+    running scrape job per competitor, so concurrent triggers cannot both start a run.
+    """
+    run_id = run_id or uuid4()
+    for _ in range(2):
+        if (existing := await _in_flight_run(session, competitor.id)) is not None:
+            return existing, True
+        stmt = (
+            pg_insert(PipelineJob)
+            .values(
+                id=uuid4(),
+                run_id=run_id,
+                competitor_id=competitor.id,
+                competitor=competitor.name,
+                stage="scrape",
+                status="pending",
+                payload={},
+            )
+            .on_conflict_do_nothing(
+                index_elements=[PipelineJob.competitor_id],
+                index_where=(PipelineJob.stage == "scrape") & PipelineJob.status.in_(ACTIVE_STATUSES),
+            )
+            .returning(PipelineJob.run_id)
+        )
+        inserted = (await session.execute(stmt)).scalar_one_or_none()
+        await session.commit()
+        if inserted is not None:
+            return inserted, False
+    raise RuntimeError(f"Could not queue or join a run for {competitor.name}")
+
+
+async def cancel_run(session: AsyncSession, run_id: UUID) -> int:
+    """
+    Cancel a run's pending and running jobs (committed); returns how many.
+
+    A worker in the middle of a cancelled job finishes its current call, then finds it
+    no longer holds the job and discards the output.
+    """
+    result = await session.execute(
+        update(PipelineJob)
+        .where(PipelineJob.run_id == run_id, PipelineJob.status.in_(ACTIVE_STATUSES))
+        .values(status="cancelled", locked_by=None, locked_until=None, updated_at=func.now())
+    )
+    await session.commit()
+    return result.rowcount
+
+
+def _run_status(counts: dict[str, int]) -> str:
+    """Overall status from job counts by status: running, failed, cancelled or done."""
+    if counts.get("pending") or counts.get("running"):
+        return "running"
+    for status in ("failed", "cancelled"):
+        if counts.get(status):
+            return status
+    return "done"
+
+
+async def get_run_progress(session: AsyncSession, run_id: UUID) -> dict[str, Any] | None:
+    """
+    Progress of a run: job counts per competitor, stage and status, intel stored and
+    errors. None if the run has no jobs.
+    """
+    stored = func.coalesce(PipelineJob.payload["stored"].as_integer(), 0)
+    stmt = (
+        select(
+            PipelineJob.competitor,
+            PipelineJob.stage,
+            PipelineJob.status,
+            func.count().label("jobs"),
+            func.sum(stored).label("stored"),
+            func.max(PipelineJob.last_error).label("error"),
+            func.min(PipelineJob.created_at).label("started_at"),
+            func.max(PipelineJob.updated_at).label("updated_at"),
+        )
+        .where(PipelineJob.run_id == run_id)
+        .group_by(PipelineJob.competitor, PipelineJob.stage, PipelineJob.status)
+    )
+    rows = (await session.execute(stmt)).all()
+    if not rows:
+        return None
+
+    competitors: dict[str, dict[str, Any]] = {}
+    totals: dict[str, int] = {}
+    for row in rows:
+        entry = competitors.setdefault(
+            row.competitor,
+            {"competitor": row.competitor, "stages": {stage: {} for stage in STAGES}, "created": 0, "errors": []},
+        )
+        entry["stages"][row.stage][row.status] = row.jobs
+        if row.stage == "store" and row.status == "done":
+            entry["created"] += int(row.stored or 0)
+        if row.error and row.status in ("pending", "failed"):
+            entry["errors"].append(row.error)
+        totals[row.status] = totals.get(row.status, 0) + row.jobs
+    for entry in competitors.values():
+        counts: dict[str, int] = {}
+        for by_status in entry["stages"].values():
+            for status, n in by_status.items():
+                counts[status] = counts.get(status, 0) + n
+        entry["status"] = _run_status(counts)
+
+    return {
+        "run_id": str(run_id),
+        "status": _run_status(totals),
+        "created": sum(c["created"] for c in competitors.values()),
+        "started_at": min(r.started_at for r in rows).isoformat(),
+        "updated_at": max(r.updated_at for r in rows).isoformat(),
+        "competitors": sorted(competitors.values(), key=lambda c: c["competitor"]),
+    }
+
+
+async def claim_jobs(session: AsyncSession, stage: str, limit: int) -> list[PipelineJob]:
+    """
+    Claim up to limit runnable jobs at stage for this process (committed).
+
+    Runnable means pending and due, or running with an expired claim (its worker died)
+    and attempts left. Expired claims with no attempts left are marked failed first, so
+    a job that keeps killing its worker is not retried forever. SKIP LOCKED lets
+    concurrent workers claim disjoint batches without waiting.
+    """
+    visibility = timedelta(seconds=settings.pipeline_queue_visibility_seconds)
+    max_attempts = settings.pipeline_queue_max_attempts
+    expired = (PipelineJob.status == "running") & (PipelineJob.locked_until < func.now())
+    await session.execute(
+        update(PipelineJob)
+        .where(PipelineJob.stage == stage, expired, PipelineJob.attempts >= max_attempts)
+        .values(
+            status="failed",
+            last_error=f"Claim expired on each of {max_attempts} attempts",
+            locked_by=None,
+            locked_until=None,
+            updated_at=func.now(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    claimable = (
+        select(PipelineJob.id)
+        .where(
+            PipelineJob.stage == stage,
+            or_(
+                (PipelineJob.status == "pending") & (PipelineJob.run_at <= func.now()),
+                expired & (PipelineJob.attempts < max_attempts),
+            ),
+        )
+        .order_by(PipelineJob.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(PipelineJob)
+        .where(PipelineJob.id.in_(claimable.scalar_subquery()))
+        .values(
+            status="running",
+            locked_by=HOLDER_ID,
+            locked_until=func.now() + visibility,
+            attempts=PipelineJob.attempts + 1,
+            updated_at=func.now(),
+        )
+        .returning(PipelineJob)
+        .execution_options(synchronize_session=False)
+    )
+    jobs = list(await session.scalars(stmt))
+    await session.commit()
+    return jobs
+
+
+async def _extend_claim(job: PipelineJob) -> bool:
+    """Push job's claim out by the visibility timeout; False if this process no longer holds it."""
+    visibility = timedelta(seconds=settings.pipeline_queue_visibility_seconds)
+    async with session_context() as session:
+        result = await session.execute(
+            update(PipelineJob)
+            .where(PipelineJob.id == job.id, PipelineJob.locked_by == HOLDER_ID, PipelineJob.status == "running")
+            .values(locked_until=func.now() + visibility)
+        )
+        await session.commit()
+    return result.rowcount == 1
+
+
+async def _keep_claimed(job: PipelineJob, task: asyncio.Task) -> None:
+    """Extend job's claim while task runs; cancel task if the job was reclaimed or cancelled."""
+    while True:
+        await asyncio.sleep(settings.pipeline_queue_visibility_seconds / 3)
+        try:
+            if not await _extend_claim(job):
+                logger.warning("Lost claim on pipeline job %s (%s); stopping it", job.id, job.stage)
+                task.cancel()
+                return
+        except Exception as e:
+            logger.warning("Extending claim on pipeline job %s failed: %s", job.id, e)
+
+
+async def _advance(
+    session: AsyncSession,
+    job: PipelineJob,
+    payload: dict[str, Any],
+    next_stage: str | None,
+) -> bool:
+    """
+    Record job's stage output and move it to next_stage (None = done), in the caller's
+    transaction. False if this process no longer holds the claim; the caller must then
+    roll back instead of committing.
+    """
+    values: dict[str, Any] = {
+        "status": "pending" if next_stage else "done",
+        "payload": payload,
+        "attempts": 0,
+        "last_error": None,
+        "locked_by": None,
+        "locked_until": None,
+        "run_at": func.now(),
+        "updated_at": func.now(),
+    }
+    if next_stage:
+        values["stage"] = next_stage
+    result = await session.execute(
+        update(PipelineJob)
+        .where(PipelineJob.id == job.id, PipelineJob.locked_by == HOLDER_ID, PipelineJob.status == "running")
+        .values(**values)
+    )
+    return result.rowcount == 1
+
+
+async def _fail(session: AsyncSession, job: PipelineJob, error: Exception) -> None:
+    """Release job for a retry with exponential backoff, or mark it failed after the last attempt."""
+    final = job.attempts >= settings.pipeline_queue_max_attempts
+    delay = timedelta(seconds=RETRY_BASE_SECONDS * 2 ** max(job.attempts - 1, 0))
+    await session.execute(
+        update(PipelineJob)
+        .where(PipelineJob.id == job.id, PipelineJob.locked_by == HOLDER_ID)
+        .values(
+            status="failed" if final else "pending",
+            last_error=(str(error) or type(error).__name__)[:2000],
+            locked_by=None,
+            locked_until=None,
+            run_at=func.now() + delay,
+            updated_at=func.now(),
+        )
+    )
+    await session.commit()
+
+
+def _json_safe(value: Any) -> Any:
+    """Round-trip through JSON so scraped values (dates etc.) fit in a JSONB payload."""
+    return json.loads(json.dumps(value, default=str))
+
+
+def _chunks(items: list[Any], size: int) -> Iterable[list[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _staged_to_payload(staged: list[_StagedIntel]) -> dict[str, Any]:
+    return {"staged": [{"row": {**s.row, "id": str(s.row["id"])}, "raw_content": s.raw_content} for s in staged]}
+
+
+def _staged_from_payload(payload: dict[str, Any]) -> list[_StagedIntel]:
+    return [
+        _StagedIntel(row={**s["row"], "id": UUID(s["row"]["id"])}, raw_content=s["raw_content"])
+        for s in payload.get("staged", [])
+    ]
+
+
+async def enqueue_items(
+    session: AsyncSession,
+    *,
+    run_id: UUID,
+    competitor_id: UUID,
+    competitor: str,
+    items: list[dict[str, Any]],
+) -> int:
+    """
+    Triage scraped items and queue them as analyze jobs of pipeline_queue_chunk_items
+    each, in the caller's transaction (not committed). Returns the number of jobs.
+    """
+    lanes = [items]
+    if settings.triage_enabled:
+        await ensure_triage_model()
+        priority, low = triage_items(items)
+        lanes = [priority, low[: settings.triage_low_priority_max]]
+    jobs = [
+        {
+            "id": uuid4(),
+            "run_id": run_id,
+            "competitor_id": competitor_id,
+            "competitor": competitor,
+            "stage": "analyze",
+            "status": "pending",
+            "payload": {"items": _json_safe(chunk)},
+        }
+        for lane in lanes
+        for chunk in _chunks(lane, settings.pipeline_queue_chunk_items)
+    ]
+    if jobs:
+        await session.execute(insert(PipelineJob), jobs)
+    return len(jobs)
+
+
+async def _scrape_sources(competitor: dict[str, Any]) -> dict[str, list[dict[str, Any]]]:
+    """Items per source; a failed source is logged and skipped, all of them failing raises."""
+    scraped: dict[str, list[dict[str, Any]]] = {}
+    error: Exception | None = None
+    for source in SOURCES:
+        partial_errors: list[str] = []
+        try:
+            scraped[source] = await asyncio.to_thread(scrape_source, competitor, source, errors=partial_errors)
+        except Exception as e:
+            logger.warning("Scraping %s %s failed: %s", competitor["name"], source, e)
+            error = e
+        for message in partial_errors:
+            logger.warning("Scraping %s %s partly failed: %s", competitor["name"], source, message)
+    if not scraped and error is not None:
+        raise error
+    return scraped
+
+
+async def _run_scrape(session: AsyncSession, job: PipelineJob) -> bool:
+    """Scrape, drop seen items and triage; fan out into analyze jobs and finish this job in one transaction."""
+    source = (
+        await session.execute(
+            select(Competitor.name, Competitor.blog_url, Competitor.g2_slug, Competitor.capterra_slug).where(
+                Competitor.id == job.competitor_id
+            )
+        )
+    ).one_or_none()
+    if source is None:
+        raise LookupError(f"Competitor {job.competitor_id} no longer exists")
+    await session.commit()  # don't hold a transaction open while scraping
+    scraped = await _scrape_sources(dict(source._mapping))
+    items = []
+    for name, source_items in scraped.items():
+        items.extend(await take_unseen(session, job.competitor_id, name, source_items))
+    n_jobs = await enqueue_items(
+        session,
+        run_id=job.run_id,
+        competitor_id=job.competitor_id,
+        competitor=job.competitor,
+        items=items,
+    )
+    # Scrape is the fan-out point: the job itself is done once its children exist
+    n_scraped = sum(map(len, scraped.values()))
+    advanced = await _advance(session, job, {"scraped": n_scraped, "new": len(items), "analyze_jobs": n_jobs}, None)
+    logger.info(
+        "Scraped %d items (%d new) for %s into %d analyze jobs", n_scraped, len(items), job.competitor, n_jobs
+    )
+    return advanced
+
+
+async def _run_analyze(session: AsyncSession, job: PipelineJob) -> bool:
+    items = job.payload.get("items", [])
+    staged = [
+        _build_intel_item(job.competitor, analysis, items[i] if i < len(items) else {})
+        async for i, analysis in _stream_analyses(items, job.competitor)
+    ]
+    return await _advance(session, job, _staged_to_payload(staged), "embed")
+
+
+async def _run_embed(session: AsyncSession, job: PipelineJob) -> bool:
+    # New vectors land in embedding_cache in this transaction; store reads them back
+    staged = _staged_from_payload(job.payload)
+    await get_cached_embeddings(session, [s.embed_text for s in staged])
+    return await _advance(session, job, job.payload, "store")
+
+
+async def _run_store(session: AsyncSession, job: PipelineJob) -> bool:
+    staged = _staged_from_payload(job.payload)
+    embeddings = await get_cached_embeddings(session, [s.embed_text for s in staged])
+    for item, embedding in zip(staged, embeddings, strict=True):
+        item.embedding = embedding
+    if staged:
+        await _insert_intel_items(session, staged)
+    return await _advance(session, job, {"stored": len(staged)}, None)
+
+
+_HANDLERS = {"scrape": _run_scrape, "analyze": _run_analyze, "embed": _run_embed, "store": _run_store}
+
+
+async def process_job(job: PipelineJob) -> None:
+    """
+    Run job's current stage in its own session; commit its output or record the failure.
+
+    The claim is extended while the handler runs, so a long stage (e.g. a slow analyze)
+    is not reclaimed and paid for twice; if it is lost anyway, the handler is cancelled.
+    """
+    async with session_context() as session:
+        task = asyncio.create_task(_HANDLERS[job.stage](session, job))
+        heartbeat = asyncio.create_task(_keep_claimed(job, task))
+        try:
+            try:
+                still_claimed = await task
+            finally:
+                heartbeat.cancel()
+            if still_claimed:
+                await session.commit()
+            else:
+                await session.rollback()
+                logger.warning("Lost claim on pipeline job %s (%s); discarding its output", job.id, job.stage)
+        except asyncio.CancelledError:
+            if not heartbeat.done() or heartbeat.cancelled():
+                raise  # cancelled from outside (e.g. worker shutdown)
+            await session.rollback()
+        except Exception as e:
+            await session.rollback()
+            logger.exception("Pipeline job %s failed at %s for %s: %s", job.id, job.stage, job.competitor, e)
+            await _fail(session, job, e)
+
+
+async def process_stage(stage: str, *, limit: int | None = None) -> int:
+    """Claim a batch of jobs at stage and process them concurrently; returns how many were claimed."""
+    async with session_context() as session:
+        jobs = await claim_jobs(session, stage, limit or settings.pipeline_queue_batch_size)
+    if jobs:
+        await asyncio.gather(*(process_job(job) for job in jobs))
+    return len(jobs)
+
+
+async def run_queue_worker(stop: asyncio.Event, stages: Iterable[str] = STAGES) -> None:
+    """Run one consumer per stage until stop is set, so a slow stage never holds up the others."""
+    async with asyncio.TaskGroup() as tg:
+        for stage in dict.fromkeys(stages):
+            tg.create_task(_consume_stage(stage, stop))
+
+
+async def _consume_stage(stage: str, stop: asyncio.Event) -> None:
+    """Claim and run stage's jobs until stop is set, waiting only when nothing was claimable."""
+    while not stop.is_set():
+        try:
+            claimed = await process_stage(stage)
+        except Exception as e:
+            logger.exception("Claiming %s jobs failed: %s", stage, e)
+            claimed = 0
+        if not claimed:
+            try:
+                await asyncio.wait_for(stop.wait(), settings.pipeline_queue_poll_seconds)
+            except TimeoutError:
+                pass
@@ -0,0 +1,305 @@
+"""Monthly partition maintenance for intel_items: create ahead, archive and detach old.
+
+intel_items is range-partitioned by detected_at into one partition per month
+(intel_items_yYYYYmMM, see migrations/008_partition_intel_items.sql). The retention
+job always keeps partitions for upcoming months in place. With
+settings.retention_enabled it also writes each partition older than
+settings.retention_months (with raw content) to a zstd-compressed Parquet file under
+settings.archive_dir, which must be durable storage, and detaches the partition. Only
+with settings.retention_drop are archived partitions and their side-table rows
+deleted. Embeddings are not archived; they can be regenerated from the text.
+"""
+
+import logging
+import re
+from datetime import UTC, date, datetime
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+from sqlalchemy import column, delete, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import IntelItemContent, IntelItemEmbedding
+
+logger = logging.getLogger(__name__)
+
+_PARTITION_RE = re.compile(r"^intel_items_y(\d{4})m(\d{2})$")
+DEFAULT_PARTITION = "intel_items_default"
+ARCHIVE_BATCH_ROWS = 5_000
+
+ARCHIVE_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("competitor", pa.string()),
+        ("signal_type", pa.string()),
+        ("threat_level", pa.string()),
+        ("threat_reason", pa.string()),
+        ("summary", pa.string()),
+        ("happyco_response", pa.string()),
+        ("confidence", pa.float64()),
+        ("source_url", pa.string()),
+        ("raw_content", pa.string()),
+        ("detected_at", pa.timestamp("us", tz="UTC")),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+    ]
+)
+
+
+def add_months(month: date, n: int) -> date:
+    """First day of the month n months after month's month (n may be negative)."""
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"intel_items_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(name: str) -> date | None:
+    """Month covered by a partition named by partition_name, else None (e.g. the default partition)."""
+    match = _PARTITION_RE.match(name)
+    return date(int(match[1]), int(match[2]), 1) if match else None
+
+
+async def list_partitions(session: AsyncSession) -> list[str]:
+    result = await session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'intel_items'::regclass ORDER BY c.relname"
+        )
+    )
+    return list(result.scalars().all())
+
+
+async def list_detached_partitions(session: AsyncSession) -> list[str]:
+    """Monthly partition tables that were detached (archived but not dropped)."""
+    result = await session.execute(
+        text(
+            "SELECT c.relname FROM pg_class c "
+            "WHERE c.relkind = 'r' AND c.relname ~ '^intel_items_y[0-9]{4}m[0-9]{2}$' "
+            "AND c.relnamespace = (SELECT relnamespace FROM pg_class WHERE oid = 'intel_items'::regclass) "
+            "AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid) "
+            "ORDER BY c.relname"
+        )
+    )
+    return list(result.scalars().all())
+
+
+def _bounds(month: date) -> tuple[str, str]:
+    return f"{month.isoformat()} 00:00+00", f"{add_months(month, 1).isoformat()} 00:00+00"
+
+
+async def _create_partition(session: AsyncSession, month: date, *, has_default: bool) -> None:
+    """
+    Create month's partition. Rows for the month already in the default partition
+    (written while the partition was missing) are moved into it first; PARTITION OF
+    would otherwise fail on them.
+    """
+    name = partition_name(month)
+    start, end = _bounds(month)
+    in_range = f"detected_at >= '{start}' AND detected_at < '{end}'"
+    if has_default:
+        # Block inserts into the default partition until the new one is attached
+        await session.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN EXCLUSIVE MODE"))
+        stranded = (
+            await session.execute(
+                text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE {in_range}")
+            )
+        ).scalar()
+        if stranded:
+            await session.execute(
+                text(
+                    f"CREATE TABLE {name} (LIKE intel_items INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                )
+            )
+            await session.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                )
+            )
+            await session.execute(
+                text(
+                    f"ALTER TABLE intel_items ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"
+                )
+            )
+            logger.warning(
+                "Moved %d intel items from %s into new partition %s",
+                stranded,
+                DEFAULT_PARTITION,
+                name,
+            )
+            return
+    await session.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF intel_items FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+    )
+
+
+async def ensure_partitions(session: AsyncSession, *, today: date | None = None) -> list[str]:
+    """Create monthly partitions from the current month through settings.partition_months_ahead."""
+    current = (today or datetime.now(UTC).date()).replace(day=1)
+    existing = set(await list_partitions(session))
+    created = []
+    for n in range(settings.partition_months_ahead + 1):
+        month = add_months(current, n)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        await _create_partition(session, month, has_default=DEFAULT_PARTITION in existing)
+        created.append(name)
+    await session.commit()
+    return created
+
+
+def _archive_location() -> tuple[pafs.FileSystem, str]:
+    """
+    Filesystem and base path for archives from settings.archive_dir.
+
+    Raises ValueError unless it is set to an object store URI (s3://bucket/prefix,
+    gs://...) or an absolute path, so archives never land on a container's
+    ephemeral working directory by default.
+    """
+    location = settings.archive_dir.strip()
+    if not location:
+        raise ValueError("ARCHIVE_DIR is not set")
+    if "://" not in location and not location.startswith("/"):
+        raise ValueError(
+            f"ARCHIVE_DIR must be an absolute path on durable storage or an object store URI, got {location!r}"
+        )
+    return pafs.FileSystem.from_uri(location)
+
+
+def _archive_path(base: str, month: date) -> str:
+    return f"{base.rstrip('/')}/intel_items/{month:%Y-%m}.parquet"
+
+
+_ITEM_COLUMNS = (
+    "id",
+    "competitor",
+    "signal_type",
+    "threat_level",
+    "threat_reason",
+    "summary",
+    "happyco_response",
+    "confidence",
+    "source_url",
+    "detected_at",
+    "created_at",
+)
+
+
+async def _write_archive(session: AsyncSession, name: str, fs: pafs.FileSystem, path: str) -> int:
+    """
+    Write partition name's rows (with raw content) to a Parquet file at path; returns
+    the number of rows written.
+
+    Rows are read from the partition itself, not the parent by date, so exactly the
+    rows that will be detached are archived.
+    """
+    partition = table(name, *(column(c) for c in _ITEM_COLUMNS))
+    stmt = (
+        select(*(partition.c[c] for c in _ITEM_COLUMNS), IntelItemContent.raw_content)
+        .outerjoin(IntelItemContent, IntelItemContent.item_id == partition.c.id)
+        .order_by(partition.c.detected_at)
+    )
+    fs.create_dir(path.rsplit("/", 1)[0], recursive=True)
+    with (
+        fs.open_output_stream(path) as sink,
+        pq.ParquetWriter(sink, ARCHIVE_SCHEMA, compression="zstd") as writer,
+    ):
+        result = await session.stream(stmt.execution_options(yield_per=ARCHIVE_BATCH_ROWS))
+        async for batch in result.partitions():
+            columns: dict[str, list[Any]] = {field.name: [] for field in ARCHIVE_SCHEMA}
+            for row in batch:
+                for key, value in row._mapping.items():
+                    columns[key].append(str(value) if key == "id" else value)
+            writer.write_table(pa.table(columns, schema=ARCHIVE_SCHEMA))
+    with fs.open_input_file(path) as f:
+        return pq.ParquetFile(f).metadata.num_rows
+
+
+async def archive_partition(session: AsyncSession, name: str, *, attached: bool = True) -> int:
+    """
+    Archive one partition to Parquet and detach it; with settings.retention_drop also
+    delete its side-table rows and drop it. Returns the number of rows archived.
+
+    The file is written under a temporary name. After detaching, count(*) of the
+    partition must equal the rows in the file, else the transaction is rolled back
+    and the partition stays attached; only then is the file renamed into place.
+    attached=False handles a partition detached by an earlier run (dropped once
+    retention_drop is turned on); its archive is rewritten and checked the same way.
+    """
+    month = partition_month(name)
+    if month is None:
+        raise ValueError(f"Not a monthly intel_items partition: {name}")
+    fs, base = _archive_location()
+    path = _archive_path(base, month)
+    tmp = f"{path}.tmp"
+    written = await _write_archive(session, name, fs, tmp)
+    # End the read transaction: asyncpg keeps the streamed portal open until then,
+    # and Postgres refuses to drop a table an open portal reads from
+    await session.commit()
+
+    if attached:
+        await session.execute(text(f"ALTER TABLE intel_items DETACH PARTITION {name}"))
+    rows = (await session.execute(text(f"SELECT count(*) FROM {name}"))).scalar()
+    if rows != written:
+        await session.rollback()
+        fs.delete_file(tmp)
+        raise RuntimeError(f"Archive of {name} has {written} rows but the partition has {rows}")
+    if settings.retention_drop:
+        ids = select(column("id")).select_from(table(name))
+        for side in (IntelItemContent, IntelItemEmbedding):
+            await session.execute(delete(side).where(side.item_id.in_(ids)))
+        await session.execute(text(f"DROP TABLE {name}"))
+    fs.move(tmp, path)
+    await session.commit()
+    logger.info(
+        "Archived %d intel items from %s to %s (%s)",
+        rows,
+        name,
+        path,
+        "dropped" if settings.retention_drop else "detached; set RETENTION_DROP=true to drop",
+    )
+    return rows
+
+
+async def run_retention(session: AsyncSession, *, today: date | None = None) -> list[str]:
+    """
+    Create upcoming partitions; with settings.retention_enabled, also archive and
+    detach those older than the retention window.
+
+    Returns the names of archived partitions. Archiving is skipped (with an error
+    logged) when settings.archive_dir is not a durable location.
+    """
+    today = today or datetime.now(UTC).date()
+    await ensure_partitions(session, today=today)
+    if not settings.retention_enabled:
+        return []
+    try:
+        _archive_location()
+    except ValueError as e:
+        logger.error("Intel retention is enabled but nothing was archived: %s", e)
+        return []
+
+    cutoff = add_months(today.replace(day=1), -settings.retention_months)
+
+    def expired(name: str) -> bool:
+        month = partition_month(name)
+        return month is not None and month < cutoff
+
+    archived = []
+    for name in filter(expired, await list_partitions(session)):
+        await archive_partition(session, name)
+        archived.append(name)
+    if settings.retention_drop:
+        for name in filter(expired, await list_detached_partitions(session)):
+            await archive_partition(session, name, attached=False)
+            archived.append(name)
+    return archived
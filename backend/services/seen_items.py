@@ -0,0 +1,62 @@
+"""Which scraped items have already been queued for analysis, per (competitor, source).
+
+Source polling (services.source_polling) and full pipeline runs (services.pipeline_queue)
+both pass scraped items through take_unseen, so an item one of them has queued is not
+analyzed again by the other. Keys live in source_schedules.seen_keys, most recent
+first, capped at settings.source_poll_seen_keys.
+"""
+
+import hashlib
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import SourceSchedule
+
+
+def item_key(item: dict[str, Any]) -> str:
+    """Stable identity of a scraped item: its URL, else its title and snippet."""
+    basis = (item.get("url") or "").strip() or f"{item.get('title') or ''}|{item.get('snippet') or ''}"
+    return hashlib.sha256(basis.encode("utf-8")).hexdigest()[:32]
+
+
+async def take_unseen(
+    session: AsyncSession,
+    competitor_id: UUID,
+    source: str,
+    items: list[dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """
+    Items not seen before for (competitor_id, source); records their keys as seen.
+
+    Runs in the caller's transaction (not committed), which must also queue the
+    returned items, so an item is never marked seen without being queued. The
+    schedule row is locked until then, so a poll and a full run cannot both take the
+    same item. Sources without a schedule row yet (polling has not run for them) are
+    not filtered.
+    """
+    where = (SourceSchedule.competitor_id == competitor_id) & (SourceSchedule.source == source)
+    seen_keys = (
+        await session.execute(select(SourceSchedule.seen_keys).where(where).with_for_update())
+    ).scalar_one_or_none()
+    if seen_keys is None:
+        return items
+
+    seen = set(seen_keys)
+    new_items, new_keys = [], []
+    for item in items:
+        key = item_key(item)
+        if key not in seen:
+            seen.add(key)
+            new_items.append(item)
+            new_keys.append(key)
+    if new_keys:
+        await session.execute(
+            update(SourceSchedule)
+            .where(where)
+            .values(seen_keys=(new_keys + list(seen_keys))[: settings.source_poll_seen_keys])
+        )
+    return new_items
@@ -0,0 +1,152 @@
+"""Adaptive per-source polling: scrape each (competitor, source) on its own interval.
+
+Every active competitor gets a source_schedules row per source (blog only when it has
+a blog_url). The polling job scrapes the sources whose next_poll_at has passed and
+queues only items it has not seen before for analysis (services.pipeline_queue). A
+poll that finds new items shrinks the source's interval (SPEEDUP); one that finds
+nothing grows it (BACKOFF), always within settings.source_poll_min_hours and
+settings.source_poll_max_hours. Fast-moving blogs are then checked several times a
+day while a job board that rarely changes backs off to every couple of weeks.
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import session_context
+from models import Competitor, SourceSchedule
+from scrapers.scrape_all import SOURCES, scrape_source
+from services.pipeline_queue import enqueue_items
+from services.seen_items import take_unseen
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DEFAULT_HOURS = {"blog": 24, "reviews": 72, "jobs": 168}  # Starting interval per source
+SPEEDUP = 0.5  # Interval multiplier after a poll found new items
+BACKOFF = 1.5  # Interval multiplier after a poll found nothing new
+
+
+def _clamp(seconds: float) -> int:
+    floor = settings.source_poll_min_hours * 3600
+    ceiling = settings.source_poll_max_hours * 3600
+    return int(min(ceiling, max(floor, seconds)))
+
+
+def next_interval(current_seconds: int, changed: bool) -> int:
+    """Interval after a poll: shorter if it found new items, longer if not, within the floor and ceiling."""
+    return _clamp(current_seconds * (SPEEDUP if changed else BACKOFF))
+
+
+async def ensure_schedules(session: AsyncSession) -> None:
+    """Create schedule rows (due now) for active competitors' sources that have none yet."""
+    competitors = (await session.execute(select(Competitor.id, Competitor.blog_url).where(Competitor.is_active))).all()
+    rows = [
+        {
+            "competitor_id": c.id,
+            "source": source,
+            "interval_seconds": _clamp(SOURCE_DEFAULT_HOURS[source] * 3600),
+        }
+        for c in competitors
+        for source in SOURCES
+        if source != "blog" or c.blog_url
+    ]
+    if rows:
+        await session.execute(pg_insert(SourceSchedule).values(rows).on_conflict_do_nothing())
+
+
+async def poll_source(schedule: SourceSchedule, competitor: dict[str, Any]) -> int:
+    """
+    Scrape one source and queue its unseen items for analysis; returns how many.
+
+    The queued jobs and the schedule update commit together, so an item is never
+    marked seen without being queued. A failed scrape (scrape_source raises rather
+    than returning []) keeps the interval and retries after the floor, so an outage
+    does not back the source off. A partly failed one queues what it got and records
+    the failure in last_error.
+    """
+    where = (SourceSchedule.competitor_id == schedule.competitor_id) & (SourceSchedule.source == schedule.source)
+    partial_errors: list[str] = []
+    try:
+        items = await asyncio.to_thread(scrape_source, competitor, schedule.source, errors=partial_errors)
+    except Exception as e:
+        logger.warning("Polling %s %s failed: %s", competitor["name"], schedule.source, e)
+        retry = timedelta(hours=settings.source_poll_min_hours)
+        async with session_context() as session:
+            await session.execute(
+                update(SourceSchedule)
+                .where(where)
+                .values(
+                    last_error=(str(e) or type(e).__name__)[:2000],
+                    last_polled_at=func.now(),
+                    next_poll_at=func.now() + retry,
+                )
+            )
+            await session.commit()
+        return 0
+
+    async with session_context() as session:
+        new_items = await take_unseen(session, schedule.competitor_id, schedule.source, items)
+        interval = next_interval(schedule.interval_seconds, bool(new_items))
+        values: dict[str, Any] = {
+            "interval_seconds": interval,
+            "next_poll_at": func.now() + timedelta(seconds=interval),
+            "last_polled_at": func.now(),
+            # Part of the source failed (e.g. one review site): keep its items, note why
+            "last_error": "; ".join(partial_errors)[:2000] or None,
+        }
+        if new_items:
+            await enqueue_items(
+                session,
+                run_id=uuid4(),
+                competitor_id=schedule.competitor_id,
+                competitor=competitor["name"],
+                items=new_items,
+            )
+            values["last_changed_at"] = func.now()
+        await session.execute(update(SourceSchedule).where(where).values(**values))
+        await session.commit()
+    logger.info(
+        "Polled %s %s: %d new of %d items; next poll in %.1fh",
+        competitor["name"],
+        schedule.source,
+        len(new_items),
+        len(items),
+        interval / 3600,
+    )
+    return len(new_items)
+
+
+async def poll_due_sources(*, limit: int = 50) -> int:
+    """Poll up to limit due sources, settings.pipeline_scrape_concurrency at a time; returns new items queued."""
+    async with session_context() as session:
+        await ensure_schedules(session)
+        stmt = (
+            select(SourceSchedule, Competitor.name, Competitor.blog_url, Competitor.g2_slug, Competitor.capterra_slug)
+            .join(Competitor, Competitor.id == SourceSchedule.competitor_id)
+            .where(Competitor.is_active, SourceSchedule.next_poll_at <= func.now())
+            .order_by(SourceSchedule.next_poll_at)
+            .limit(limit)
+        )
+        due = (await session.execute(stmt)).all()
+        await session.commit()
+
+    semaphore = asyncio.Semaphore(max(1, settings.pipeline_scrape_concurrency))
+
+    async def poll(row: Any) -> int:
+        competitor = {
+            "name": row.name,
+            "blog_url": row.blog_url,
+            "g2_slug": row.g2_slug,
+            "capterra_slug": row.capterra_slug,
+        }
+        async with semaphore:
+            return await poll_source(row.SourceSchedule, competitor)
+
+    return sum(await asyncio.gather(*(poll(row) for row in due)))
@@ -0,0 +1,239 @@
+"""Streaming pipeline for many competitors: scrape -> analyze -> embed -> write, overlapped.
+
+Each stage is a pool of workers connected by bounded asyncio queues:
+
+- scrape (settings.pipeline_scrape_concurrency): scrape and triage a competitor, then
+  put its items on the analysis queue in batches of settings.pipeline_batch_items.
+- analyze (settings.pipeline_analyze_concurrency): stream the agent's analyses for a
+  batch and pass each staged row on as soon as it is parsed.
+- embed (settings.pipeline_embed_concurrency): collect rows into batches of up to
+  settings.embedding_batch_size and embed each in one cached call.
+- write (settings.pipeline_write_concurrency): collect embedded rows the same way and
+  bulk-insert each batch in its own transaction.
+
+Embed and write batches close when they are full, when an analysis batch has ended
+(its rows are all in), or settings.pipeline_batch_wait_seconds after their first row,
+so analyses trickling in are not embedded and written one row at a time.
+
+A full queue blocks its producers (backpressure), so memory stays bounded and the run
+takes about as long as its slowest stage rather than the sum of all stages. Scrapes
+and analysis batches are limited to settings.pipeline_timeout_seconds each; a failure
+is recorded against its competitor without stopping the others. A scrape thread that
+timed out cannot be stopped, so it keeps its concurrency slot until it returns.
+Batches are committed as they are written, so a competitor that fails part-way keeps
+the rows already stored and is reported as partial.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from config import settings
+from database import session_context
+from models import Competitor
+from scrapers.scrape_all import scrape_competitor
+from services.embedding_cache import get_cached_embeddings
+from services.intel_service import (
+    _build_intel_item,
+    _insert_intel_items,
+    _StagedIntel,
+    _stream_analyses,
+)
+from triage import ensure_triage_model, triage_items
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # End-of-stream marker; each downstream worker consumes exactly one
+_FLUSH = object()  # End of one analysis batch: pass on what has been collected so far
+
+
+@dataclass
+class PipelineResult:
+    """
+    Outcome of one competitor in run_streaming_pipeline.
+
+    created counts rows committed, also when error is set: a failure after some of
+    the competitor's batches were written does not remove them (partial).
+    """
+
+    competitor: str
+    created: int = 0
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def partial(self) -> bool:
+        return self.error is not None and self.created > 0
+
+
+async def _pool(n: int, worker: Callable[[], Awaitable[None]], downstream: asyncio.Queue | None, consumers: int) -> None:
+    """Run n copies of worker, then tell each of the downstream stage's consumers to stop."""
+    async with asyncio.TaskGroup() as group:
+        for _ in range(n):
+            group.create_task(worker())
+    if downstream is not None:
+        for _ in range(consumers):
+            await downstream.put(_DONE)
+
+
+async def _take_batch(
+    queue: asyncio.Queue,
+    limit: int,
+    weight: Callable[[Any], int] = lambda _: 1,
+) -> tuple[list[Any], bool, bool]:
+    """
+    Collect entries from queue until their weight reaches limit, a _FLUSH or _DONE
+    arrives, or settings.pipeline_batch_wait_seconds pass after the first entry.
+
+    Returns (entries, flushed, done); done means this consumer's _DONE was taken.
+    """
+    loop = asyncio.get_running_loop()
+    entries: list[Any] = []
+    total = 0
+    deadline: float | None = None
+    while total < limit:
+        remaining = None if deadline is None else deadline - loop.time()
+        if remaining is not None and remaining <= 0:
+            break
+        try:
+            got = await asyncio.wait_for(queue.get(), remaining)
+        except TimeoutError:
+            break
+        if got is _DONE:
+            return entries, False, True
+        if got is _FLUSH:
+            if entries:
+                return entries, True, False
+            continue
+        entries.append(got)
+        total += weight(got)
+        if deadline is None:
+            deadline = loop.time() + settings.pipeline_batch_wait_seconds
+    return entries, False, False
+
+
+async def run_streaming_pipeline(competitors: list[Competitor]) -> list[PipelineResult]:
+    """Run the pipeline for competitors with all stages overlapped; results are in input order."""
+    results = {c.name: PipelineResult(c.name) for c in competitors}
+    timeout = settings.pipeline_timeout_seconds
+    n_scrape = max(1, settings.pipeline_scrape_concurrency)
+    n_analyze = max(1, settings.pipeline_analyze_concurrency)
+    n_embed = max(1, settings.pipeline_embed_concurrency)
+    n_write = max(1, settings.pipeline_write_concurrency)
+    buffer = max(1, settings.pipeline_stream_buffer)
+
+    todo: asyncio.Queue = asyncio.Queue()
+    batches: asyncio.Queue = asyncio.Queue(buffer)
+    analyzed: asyncio.Queue = asyncio.Queue(buffer * settings.pipeline_batch_items)
+    embedded: asyncio.Queue = asyncio.Queue(buffer)
+    for competitor in competitors:
+        todo.put_nowait(competitor)
+
+    def fail(name: str, error: BaseException) -> None:
+        message = f"Timed out after {timeout:.0f}s" if isinstance(error, TimeoutError) else str(error) or type(error).__name__
+        logger.error("Pipeline stage failed for %s: %s", name, message)
+        if results[name].error is None:
+            results[name].error = message
+
+    # Held for as long as a scrape thread runs, which can outlast the timeout
+    scrape_slots = asyncio.Semaphore(n_scrape)
+
+    def scrape_finished(thread: asyncio.Future) -> None:
+        scrape_slots.release()
+        if not thread.cancelled():
+            thread.exception()  # mark retrieved; a timed-out scrape's error is not awaited
+
+    async def scrape() -> None:
+        while not todo.empty():
+            competitor = todo.get_nowait()
+            await scrape_slots.acquire()
+            thread = asyncio.ensure_future(asyncio.to_thread(scrape_competitor, competitor))
+            thread.add_done_callback(scrape_finished)
+            try:
+                # shield: the timeout abandons the thread but its slot stays taken until it returns
+                items = await asyncio.wait_for(asyncio.shield(thread), timeout)
+            except Exception as e:
+                fail(competitor.name, e)
+                continue
+            lanes = [items]
+            if settings.triage_enabled:
+                await ensure_triage_model()
+                priority, low = triage_items(items)
+                lanes = [priority, low[: settings.triage_low_priority_max]]
+            size = settings.pipeline_batch_items
+            for lane in lanes:
+                for start in range(0, len(lane), size):
+                    await batches.put((competitor.name, lane[start : start + size]))
+
+    async def analyze() -> None:
+        while (got := await batches.get()) is not _DONE:
+            name, batch = got
+            try:
+                async with asyncio.timeout(timeout):
+                    async for i, analysis in _stream_analyses(batch, name):
+                        await analyzed.put(_build_intel_item(name, analysis, batch[i] if i < len(batch) else {}))
+            except Exception as e:
+                fail(name, e)
+            await analyzed.put(_FLUSH)
+
+    async def embed() -> None:
+        done = False
+        while not done:
+            staged: list[_StagedIntel]
+            staged, flushed, done = await _take_batch(analyzed, settings.embedding_batch_size)
+            if not staged:
+                continue
+            try:
+                async with session_context() as session:
+                    embeddings = await get_cached_embeddings(session, [s.embed_text for s in staged])
+                    await session.commit()
+                for item, embedding in zip(staged, embeddings, strict=True):
+                    item.embedding = embedding
+            except Exception as e:
+                # Rows are still written; backfill_embeddings fills in missing vectors later
+                logger.warning("Embedding %d streamed items failed: %s", len(staged), e)
+            await embedded.put(staged)
+            if flushed:
+                await embedded.put(_FLUSH)
+
+    async def write() -> None:
+        done = False
+        while not done:
+            chunks, _, done = await _take_batch(embedded, settings.embedding_batch_size, weight=len)
+            staged = [item for chunk in chunks for item in chunk]
+            if not staged:
+                continue
+            try:
+                async with session_context() as session:
+                    await _insert_intel_items(session, staged)
+                    await session.commit()
+            except Exception as e:
+                for name in {s.row["competitor"] for s in staged}:
+                    fail(name, e)
+                continue
+            for item in staged:
+                results[item.row["competitor"]].created += 1
+
+    async with asyncio.TaskGroup() as group:
+        group.create_task(_pool(n_scrape, scrape, batches, n_analyze))
+        group.create_task(_pool(n_analyze, analyze, analyzed, n_embed))
+        group.create_task(_pool(n_embed, embed, embedded, n_write))
+        group.create_task(_pool(n_write, write, None, 0))
+
+    for result in results.values():
+        if result.partial:
+            logger.warning(
+                "Pipeline stored only part of %s's intel (%d items) before failing: %s",
+                result.competitor,
+                result.created,
+                result.error,
+            )
+        elif result.created:
+            logger.info("Pipeline created %d intel items for %s", result.created, result.competitor)
+    return [results[c.name] for c in competitors]
+
@@ -1,8 +1,10 @@
 import os
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from dotenv import load_dotenv
 
+from config import Settings
 from database import init_db
 
 load_dotenv()
@@ -26,3 +28,26 @@ async def db_session(database_url):
     from database import _session_factory
     async with _session_factory() as session:
         yield session
+
+
+@pytest.fixture
+def make_settings():
+    """Build Settings from defaults plus overrides, ignoring any local .env file."""
+
+    def make(**overrides) -> Settings:
+        return Settings(_env_file=None, **overrides)
+
+    return make
+
+
+@pytest.fixture
+def mock_session_context():
+    """Build a stand-in for database.session_context whose `async with` yields session."""
+
+    def make(session=None) -> MagicMock:
+        ctx = MagicMock()
+        ctx.return_value.__aenter__ = AsyncMock(return_value=session if session is not None else AsyncMock())
+        ctx.return_value.__aexit__ = AsyncMock(return_value=None)
+        return ctx
+
+    return make
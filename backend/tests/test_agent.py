@@ -5,7 +5,21 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from agent import IntelAnalysis, analyze_scraped_data
+from agent import IntelAnalysis, _iter_json_objects, analyze_scraped_data, stream_scraped_data
+from config import Settings
+
+
+def _settings(**overrides) -> Settings:
+    """Agent settings for tests: single-tier unless a test opts into tiering."""
+    values = {"anthropic_api_key": "test-key", "agent_tiering_enabled": False, **overrides}
+    return Settings(_env_file=None, **values)
+
+
+def _raw_response(text: str) -> MagicMock:
+    """Mock of messages.with_raw_response.create(): headers plus parse() -> Message."""
+    raw = MagicMock(headers={})
+    raw.parse.return_value = MagicMock(content=[MagicMock(text=text)])
+    return raw
 
 
 def test_intel_analysis_model():
@@ -68,10 +82,10 @@ def test_analyze_scraped_data_parses_json_response():
     ]
 
     mock_client_instance = MagicMock()
-    mock_client_instance.messages.create.return_value = mock_response
+    mock_client_instance.messages.with_raw_response.create.return_value.parse.return_value = mock_response
 
     with patch("agent.Anthropic", return_value=mock_client_instance), patch(
-        "agent.settings", MagicMock(anthropic_api_key="test-key")
+        "agent.settings", _settings()
     ):
         items = [
             {
@@ -111,10 +125,10 @@ def test_analyze_merges_source_url_from_items():
     ]
 
     mock_client_instance = MagicMock()
-    mock_client_instance.messages.create.return_value = mock_response
+    mock_client_instance.messages.with_raw_response.create.return_value.parse.return_value = mock_response
 
     with patch("agent.Anthropic", return_value=mock_client_instance), patch(
-        "agent.settings", MagicMock(anthropic_api_key="test-key")
+        "agent.settings", _settings()
     ):
         items = [{"title": "Post", "url": "https://example.com/post", "snippet": "..."}]
         result = analyze_scraped_data(items, "Buildium")
@@ -130,3 +144,143 @@ def test_analyze_raises_without_api_key():
                 [{"title": "x", "snippet": "y"}],
                 "AppFolio",
             )
+
+
+def _analysis_dict(summary: str, **overrides) -> dict:
+    return {
+        "summary": summary,
+        "threat_level": "LOW",
+        "threat_reason": "Minor",
+        "happyco_response": "Monitor",
+        "signal_type": "MARKETING_SHIFT",
+        "confidence": 0.7,
+        **overrides,
+    }
+
+
+def test_iter_json_objects_yields_each_object_across_chunk_boundaries():
+    """Objects split across stream chunks are emitted once their closing brace arrives."""
+    text = "```json\n" + json.dumps(
+        [_analysis_dict("Has {braces} and \"quotes\""), _analysis_dict("Second")]
+    ) + "\n```"
+    chunks = [text[i : i + 7] for i in range(0, len(text), 7)]
+
+    objects = list(_iter_json_objects(chunks))
+
+    assert len(objects) == 2
+    assert json.loads(objects[0])["summary"] == 'Has {braces} and "quotes"'
+    assert json.loads(objects[1])["summary"] == "Second"
+
+
+def test_stream_scraped_data_yields_indexed_analyses():
+    """stream_scraped_data yields (index, IntelAnalysis) from the streamed response."""
+    text = json.dumps([_analysis_dict("First"), _analysis_dict("Second", source_url="https://b")])
+    mock_stream = MagicMock()
+    mock_stream.text_stream = iter([text[:40], text[40:]])
+    mock_client_instance = MagicMock()
+    mock_client_instance.messages.stream.return_value.__enter__.return_value = mock_stream
+
+    with patch("agent.Anthropic", return_value=mock_client_instance), patch(
+        "agent.settings", _settings()
+    ):
+        items = [{"title": "A", "url": "https://a"}, {"title": "B", "url": "https://b"}]
+        result = list(stream_scraped_data(items, "AppFolio"))
+
+    assert [i for i, _ in result] == [0, 1]
+    assert result[0][1].summary == "First"
+    assert result[0][1].source_url == "https://a"
+    assert result[1][1].source_url == "https://b"
+
+
+def test_analyze_retries_only_invalid_and_missing_items():
+    """Valid analyses are kept; a follow-up request covers only the failed items."""
+    first = (
+        "["
+        + json.dumps(_analysis_dict("A"))
+        + ', {"summary": "missing fields"}, '
+        + json.dumps(_analysis_dict("C"))[:30]  # truncated output
+    )
+    retry = json.dumps([_analysis_dict("B retry"), _analysis_dict("C retry")])
+    responses = [_raw_response(first), _raw_response(retry)]
+    mock_client_instance = MagicMock()
+    mock_client_instance.messages.with_raw_response.create.side_effect = responses
+
+    items = [{"title": t, "url": f"https://{t}"} for t in ("a", "b", "c")]
+    with patch("agent.Anthropic", return_value=mock_client_instance), patch(
+        "agent.settings", _settings(agent_retry_budget=2)
+    ):
+        result = analyze_scraped_data(items, "AppFolio")
+
+    assert [r.summary for r in result] == ["A", "B retry", "C retry"]
+    assert [r.source_url for r in result] == ["https://a", "https://b", "https://c"]
+    assert mock_client_instance.messages.with_raw_response.create.call_count == 2
+    retry_message = mock_client_instance.messages.with_raw_response.create.call_args_list[1][1]["messages"][0]["content"]
+    assert "Title: a" not in retry_message
+    assert "Title: b" in retry_message and "Title: c" in retry_message
+
+
+def test_analyze_stops_after_retry_budget():
+    """Items still failing after the retry budget are dropped, not raised."""
+    mock_client_instance = MagicMock()
+    mock_client_instance.messages.with_raw_response.create.return_value = _raw_response("not json at all")
+
+    with patch("agent.Anthropic", return_value=mock_client_instance), patch(
+        "agent.settings", _settings(agent_retry_budget=1)
+    ):
+        result = analyze_scraped_data([{"title": "x"}], "AppFolio")
+
+    assert result == []
+    assert mock_client_instance.messages.with_raw_response.create.call_count == 2
+
+
+def test_tiered_analysis_escalates_only_medium_high_and_low_confidence():
+    """The fast model handles all items; only likely threats go to the main model."""
+    fast = json.dumps(
+        [
+            _analysis_dict("LOW sure", confidence=0.9),
+            _analysis_dict("Looks HIGH", threat_level="HIGH", confidence=0.9),
+            _analysis_dict("LOW unsure", confidence=0.3),
+        ]
+    )
+    main = json.dumps(
+        [
+            _analysis_dict("HIGH detail", threat_level="HIGH", confidence=0.95),
+            _analysis_dict("LOW confirmed", confidence=0.8),
+        ]
+    )
+    mock_client_instance = MagicMock()
+    mock_client_instance.messages.with_raw_response.create.side_effect = [
+        _raw_response(fast),
+        _raw_response(main),
+    ]
+
+    items = [{"title": t} for t in ("a", "b", "c")]
+    with patch("agent.Anthropic", return_value=mock_client_instance), patch(
+        "agent.settings",
+        _settings(agent_tiering_enabled=True, agent_fast_model="fast", agent_model="main"),
+    ):
+        result = analyze_scraped_data(items, "AppFolio")
+
+    assert [r.summary for r in result] == ["LOW sure", "HIGH detail", "LOW confirmed"]
+    calls = mock_client_instance.messages.with_raw_response.create.call_args_list
+    assert [c[1]["model"] for c in calls] == ["fast", "main"]
+    escalated_message = calls[1][1]["messages"][0]["content"]
+    assert "Title: a" not in escalated_message
+    assert "Title: b" in escalated_message and "Title: c" in escalated_message
+
+
+def test_tiered_analysis_keeps_fast_result_when_main_model_fails():
+    """If the main model cannot analyze an escalated item, the fast-tier analysis stands."""
+    fast = json.dumps([_analysis_dict("Fast HIGH", threat_level="HIGH", confidence=0.9)])
+    mock_client_instance = MagicMock()
+    mock_client_instance.messages.with_raw_response.create.side_effect = [
+        _raw_response(fast),
+        _raw_response("[]"),
+    ]
+
+    with patch("agent.Anthropic", return_value=mock_client_instance), patch(
+        "agent.settings", _settings(agent_tiering_enabled=True, agent_retry_budget=0)
+    ):
+        result = analyze_scraped_data([{"title": "a"}], "AppFolio")
+
+    assert [r.summary for r in result] == ["Fast HIGH"]
@@ -2,6 +2,8 @@
 
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 from scrapers.blog_scraper import (
     _parse_html_articles,
     _parse_rss_feed,
@@ -85,3 +87,6 @@ def test_fetch_blog_posts_handles_http_error(MockClient):
 
     items = fetch_blog_posts("https://example.com/blog")
     assert items == []
+
+    with pytest.raises(RuntimeError, match="Blog scrape failed: Connection error"):
+        fetch_blog_posts("https://example.com/blog", raise_errors=True)
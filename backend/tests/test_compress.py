@@ -0,0 +1,57 @@
+"""Tests for extractive compression of scraped content."""
+
+from agent import _build_user_message
+from compress import compress_text, estimate_tokens, find_boilerplate, strip_html
+
+
+def test_strip_html_removes_tags_scripts_and_entities():
+    raw = "<p>AppFolio&nbsp;launches <b>AI</b></p><script>track()</script>"
+    assert strip_html(raw) == "AppFolio launches AI"
+
+
+def test_compress_text_keeps_relevant_sentences_within_budget():
+    """Filler is dropped first; the signal sentence deep in the page survives."""
+    filler = " ".join(f"Our team enjoyed the event number {i} downtown." for i in range(40))
+    key = "AppFolio announced centralized maintenance pricing at $1 per unit."
+    text = f"{filler} {key} {filler}"
+
+    out = compress_text(text, token_budget=60)
+
+    assert key in out
+    assert estimate_tokens(out) <= 60
+    assert len(out) < len(text)
+
+
+def test_compress_text_drops_duplicate_and_boilerplate_sentences():
+    """Sentences repeated within an item or recurring across a site's pages are removed."""
+    footer = "Subscribe to our newsletter for updates."
+    items = [
+        f"Buildium launched a new owner portal. {footer}",
+        f"Buildium raised prices for small landlords. {footer} {footer}",
+        f"Buildium hired a new CFO. {footer}",
+    ]
+    boilerplate = find_boilerplate(items)
+
+    out = compress_text(items[1], token_budget=500, boilerplate=boilerplate)
+
+    assert out == "Buildium raised prices for small landlords."
+
+
+def test_build_user_message_keeps_content_shared_across_sites():
+    """A press release picked up by the blog and a review site is content, not boilerplate."""
+    release = "AppFolio launched AI maintenance triage for all customers."
+    items = [
+        {"url": "https://appfolio.com/blog/ai", "raw_content": f"{release} Read the full post."},
+        {"url": "https://www.g2.com/products/appfolio", "raw_content": f"{release} Reviewers were surprised."},
+    ]
+    message = _build_user_message(items, "AppFolio")
+    assert message.count(release) == 2
+
+
+def test_build_user_message_uses_compressed_content():
+    """Prompt carries stripped snippets and compressed content instead of a hard cut."""
+    items = [{"title": "Post", "snippet": "<p>New &amp; improved</p>", "raw_content": "x. " * 3000}]
+    message = _build_user_message(items, "AppFolio")
+    assert "Snippet: New & improved" in message
+    assert "Content: x." in message
+    assert len(message) < 2000
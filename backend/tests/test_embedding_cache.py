@@ -0,0 +1,86 @@
+"""Tests for the embedding cache (LRU + Postgres table)."""
+
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from embeddings import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL
+from services import embedding_cache
+from services.embedding_cache import cache_key, get_cached_embedding, get_cached_embeddings
+
+
+@pytest.fixture(autouse=True)
+def _empty_lru():
+    embedding_cache.clear_lru()
+    yield
+    embedding_cache.clear_lru()
+
+
+def _fake_session(db_rows: list) -> MagicMock:
+    """Session whose first execute returns db_rows for the cache lookup."""
+
+    @asynccontextmanager
+    async def nested():
+        yield
+
+    session = MagicMock()
+    session.begin_nested = nested
+    result = MagicMock()
+    result.all.return_value = db_rows
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+def test_cache_key_normalizes_whitespace_and_includes_model():
+    key = cache_key("  AppFolio   launched\nAI ")
+    assert key == cache_key("AppFolio launched AI")
+    assert key[:2] == (EMBEDDING_MODEL, EMBEDDING_DIMENSIONS)
+    assert len(key[2]) == 64
+
+
+@pytest.mark.asyncio
+async def test_misses_go_to_api_once_then_hit_lru():
+    """First call embeds via API and writes the table; repeat calls skip DB and API."""
+    session = _fake_session([])
+    with patch(
+        "services.embedding_cache.get_embeddings", return_value=[[0.5, 0.5]]
+    ) as mock_api:
+        first = await get_cached_embeddings(session, ["AI maintenance", "AI  maintenance"])
+        second = await get_cached_embedding(session, "AI maintenance")
+
+    assert first == [[0.5, 0.5], [0.5, 0.5]]
+    assert second == [0.5, 0.5]
+    mock_api.assert_called_once()
+    assert mock_api.call_args.args[0] == ["AI maintenance"]
+    assert session.execute.await_count == 2  # lookup + insert, nothing on the LRU hit
+
+
+@pytest.mark.asyncio
+async def test_db_hit_skips_api():
+    key = cache_key("turn time")
+    row = MagicMock(model=key[0], dimensions=key[1], text_hash=key[2], embedding=[1.0, 0.0])
+    session = _fake_session([row])
+    with patch("services.embedding_cache.get_embeddings") as mock_api:
+        result = await get_cached_embedding(session, "turn time")
+
+    assert result == [1.0, 0.0]
+    mock_api.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_empty_text_returns_none_without_lookup():
+    session = _fake_session([])
+    assert await get_cached_embeddings(session, ["", "  "]) == [None, None]
+    session.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_backend_is_resolved_once_per_batch():
+    session = _fake_session([])
+    with (
+        patch("services.embedding_cache.get_backend", wraps=embedding_cache.get_backend) as mock_backend,
+        patch("services.embedding_cache.get_embeddings", side_effect=lambda texts, backend: [[0.5]] * len(texts)),
+    ):
+        await get_cached_embeddings(session, [f"text {i}" for i in range(20)])
+    assert mock_backend.call_count == 1
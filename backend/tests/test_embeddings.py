@@ -1,19 +1,32 @@
-"""Tests for OpenAI embeddings."""
+"""Tests for embeddings and embedding backends."""
 
 from unittest.mock import MagicMock, patch
 
-from embeddings import get_embedding
+import numpy as np
+import pytest
+
+import embeddings
+from config import Settings
+from embeddings import HashingBackend, OpenAIBackend, get_backend, get_embedding, get_embeddings
+
+
+@pytest.fixture(autouse=True)
+def _fresh_client():
+    """Each test patches OpenAI, so don't reuse a client cached by an earlier test."""
+    embeddings._get_client.cache_clear()
+    yield
+    embeddings._get_client.cache_clear()
 
 
 def test_get_embedding_returns_none_without_api_key():
     """get_embedding returns None when OPENAI_API_KEY is missing."""
-    with patch("embeddings.settings", MagicMock(openai_api_key=None)):
+    with patch("embeddings.settings", Settings(_env_file=None, openai_api_key=None)):
         assert get_embedding("test text") is None
 
 
 def test_get_embedding_returns_none_for_empty_text():
     """get_embedding returns None for empty or whitespace-only text."""
-    with patch("embeddings.settings", MagicMock(openai_api_key="sk-test")):
+    with patch("embeddings.settings", Settings(_env_file=None, openai_api_key="sk-test")):
         assert get_embedding("") is None
         assert get_embedding("   ") is None
 
@@ -22,29 +35,156 @@ def test_get_embedding_returns_vector():
     """get_embedding returns 1536-dim vector from OpenAI."""
     fake_embedding = [0.1] * 1536
     mock_response = MagicMock()
-    mock_response.data = [MagicMock(embedding=fake_embedding)]
+    mock_response.data = [MagicMock(index=0, embedding=fake_embedding)]
 
     mock_client = MagicMock()
-    mock_client.embeddings.create.return_value = mock_response
+    mock_client.embeddings.with_raw_response.create.return_value.parse.return_value = mock_response
 
     with (
-        patch("embeddings.settings", MagicMock(openai_api_key="sk-test")),
+        patch("embeddings.settings", Settings(_env_file=None, openai_api_key="sk-test")),
         patch("embeddings.OpenAI", return_value=mock_client),
     ):
         result = get_embedding("AppFolio launched AI feature")
     assert result == fake_embedding
     assert len(result) == 1536
-    mock_client.embeddings.create.assert_called_once()
-    call_kwargs = mock_client.embeddings.create.call_args[1]
-    assert call_kwargs["input"] == "AppFolio launched AI feature"
+    mock_client.embeddings.with_raw_response.create.assert_called_once()
+    call_kwargs = mock_client.embeddings.with_raw_response.create.call_args[1]
+    assert call_kwargs["input"] == ["AppFolio launched AI feature"]
     assert call_kwargs["model"] == "text-embedding-3-small"
 
 
 def test_get_embedding_returns_none_on_api_error():
     """get_embedding returns None when API raises."""
     with (
-        patch("embeddings.settings", MagicMock(openai_api_key="sk-test")),
+        patch("embeddings.settings", Settings(_env_file=None, openai_api_key="sk-test")),
         patch("embeddings.OpenAI") as mock_openai,
     ):
-        mock_openai.return_value.embeddings.create.side_effect = Exception("API error")
+        mock_openai.return_value.embeddings.with_raw_response.create.side_effect = Exception("API error")
         assert get_embedding("test") is None
+
+
+def _batch_response(vectors: list[list[float]]) -> MagicMock:
+    raw = MagicMock(headers={})
+    # Provider may return data out of order; index maps it back
+    raw.parse.return_value.data = [
+        MagicMock(index=i, embedding=v) for i, v in reversed(list(enumerate(vectors)))
+    ]
+    return raw
+
+
+def test_get_embeddings_batches_in_one_request_and_keeps_order():
+    """get_embeddings sends all non-empty texts in one request and aligns output with input."""
+    mock_client = MagicMock()
+    mock_client.embeddings.with_raw_response.create.return_value = _batch_response([[1.0], [2.0]])
+
+    with (
+        patch("embeddings.settings", Settings(_env_file=None, openai_api_key="sk-test")),
+        patch("embeddings.OpenAI", return_value=mock_client),
+    ):
+        result = get_embeddings(["first", "  ", "second"])
+
+    assert result == [[1.0], None, [2.0]]
+    mock_client.embeddings.with_raw_response.create.assert_called_once()
+    assert mock_client.embeddings.with_raw_response.create.call_args[1]["input"] == ["first", "second"]
+
+
+def test_get_embeddings_isolates_invalid_input():
+    """A rejected batch is split so only the bad input is marked None."""
+
+    class BadRequest(Exception):
+        status_code = 400
+
+    def create(model, input):
+        if "bad" in input:
+            raise BadRequest("invalid input")
+        return _batch_response([[float(len(t))] for t in input])
+
+    mock_client = MagicMock()
+    mock_client.embeddings.with_raw_response.create.side_effect = create
+
+    with (
+        patch("embeddings.settings", Settings(_env_file=None, openai_api_key="sk-test")),
+        patch("embeddings.OpenAI", return_value=mock_client),
+    ):
+        result = get_embeddings(["a", "bad", "ccc", "dd"])
+
+    assert result == [[1.0], None, [3.0], [2.0]]
+
+
+def test_get_embeddings_splits_by_input_limit():
+    """Inputs beyond the per-request limit go into additional requests."""
+    mock_client = MagicMock()
+    mock_client.embeddings.with_raw_response.create.side_effect = lambda model, input: _batch_response(
+        [[0.0]] * len(input)
+    )
+
+    with (
+        patch("embeddings.settings", Settings(_env_file=None, openai_api_key="sk-test")),
+        patch("embeddings.OpenAI", return_value=mock_client),
+        patch("embeddings.MAX_BATCH_INPUTS", 2),
+    ):
+        result = get_embeddings(["a", "b", "c"])
+
+    assert result == [[0.0]] * 3
+    assert mock_client.embeddings.with_raw_response.create.call_count == 2
+
+
+def test_hashing_backend_is_deterministic_normalized_and_lexically_similar():
+    """Hashing vectors are unit length, stable, and closer for overlapping texts."""
+    backend = HashingBackend(256)
+    a, b, c, empty = backend.embed(
+        ["AppFolio AI maintenance launch", "AppFolio launches AI maintenance", "Buildium pricing page", "!!"]
+    )
+    assert len(a) == 256
+    assert abs(np.linalg.norm(a) - 1.0) < 1e-5
+    assert a == backend.embed(["AppFolio AI maintenance launch"])[0]
+    assert np.dot(a, b) > np.dot(a, c)
+    assert empty is None
+
+
+def test_get_backend_selects_from_settings():
+    with patch("embeddings.settings", Settings(_env_file=None, embedding_backend="hashing", embedding_dimensions=384)):
+        backend = get_backend()
+        assert isinstance(backend, HashingBackend)
+        assert backend.dimensions == 384
+        assert len(get_embedding("offline embedding")) == 384
+    with patch("embeddings.settings", Settings(_env_file=None, embedding_backend="openai")):
+        assert isinstance(get_backend(), OpenAIBackend)
+
+
+def test_onnx_backend_falls_back_to_hashing_when_unavailable():
+    """A missing ONNX runtime or model directory degrades to the hashing backend."""
+    with patch(
+        "embeddings.settings",
+        Settings(_env_file=None, embedding_backend="onnx", embedding_onnx_model_dir="/nonexistent"),
+    ):
+        assert isinstance(get_backend(), HashingBackend)
+
+
+def test_broken_onnx_setup_is_loaded_once_and_remembered():
+    """A failed model load falls back to hashing without retrying (and logging) on every call."""
+    embeddings._onnx_or_fallback.cache_clear()
+    settings = Settings(_env_file=None, embedding_backend="onnx", embedding_onnx_model_dir="/broken")
+    with (
+        patch("embeddings.settings", settings),
+        patch("embeddings.OnnxBackend", side_effect=FileNotFoundError("model.onnx")) as mock_load,
+    ):
+        backends = [get_backend() for _ in range(20)]
+    embeddings._onnx_or_fallback.cache_clear()
+
+    assert mock_load.call_count == 1
+    assert all(isinstance(b, HashingBackend) for b in backends)
+
+
+def test_openai_backend_requests_shortened_embeddings():
+    """Below 1536 dims the API's dimensions parameter is sent and the backend reports the size."""
+    mock_client = MagicMock()
+    mock_client.embeddings.with_raw_response.create.return_value.parse.return_value = MagicMock(
+        data=[MagicMock(index=0, embedding=[0.1] * 512)]
+    )
+    settings = Settings(_env_file=None, openai_api_key="sk-test", embedding_dimensions=512)
+    with patch("embeddings.settings", settings), patch("embeddings.OpenAI", return_value=mock_client):
+        backend = get_backend()
+        assert backend.dimensions == 512
+        assert len(get_embedding("short vector")) == 512
+    assert mock_client.embeddings.with_raw_response.create.call_args[1]["dimensions"] == 512
@@ -139,8 +139,8 @@ def test_run_pipeline_unknown_competitor(client_with_db):
 
 
 def test_search_intel(client_with_db):
-    """GET /intel/search?q=... returns semantically similar items."""
-    with patch("routes.intel.get_intel_semantic_search", new_callable=AsyncMock) as mock_search:
+    """GET /intel/search?q=... runs hybrid search by default."""
+    with patch("routes.intel.get_intel_hybrid_search", new_callable=AsyncMock) as mock_search:
         mock_search.return_value = []
         resp = client_with_db.get("/intel/search?q=AI+maintenance+feature")
     assert resp.status_code == 200
@@ -150,25 +150,131 @@ def test_search_intel(client_with_db):
     assert call_args[1]["limit"] == 20
 
 
+def test_search_intel_semantic_mode(client_with_db):
+    """GET /intel/search?mode=semantic uses embedding similarity only."""
+    with patch("routes.intel.get_intel_semantic_search", new_callable=AsyncMock) as mock_search:
+        mock_search.return_value = []
+        resp = client_with_db.get("/intel/search?q=pricing&mode=semantic")
+    assert resp.status_code == 200
+    mock_search.assert_called_once()
+
+
 def test_run_pipeline_success(client_with_db):
-    """POST /intel/run creates intel and returns count."""
+    """POST /intel/run queues a run and returns its id without waiting for it."""
     mock_comp = MagicMock()
     mock_comp.name = "AppFolio"
     mock_comp.slug = "appfolio"
+    run_id = uuid4()
     with (
         patch("routes.intel.get_tracked_competitors_from_db", new_callable=AsyncMock) as mock_get,
-        patch("routes.intel.run_pipeline", new_callable=AsyncMock) as mock_run,
+        patch("routes.intel.enqueue_pipeline", new_callable=AsyncMock) as mock_enqueue,
     ):
         mock_get.return_value = [mock_comp]
-        mock_run.return_value = [MagicMock()]  # one created item
+        mock_enqueue.return_value = (run_id, False)
         resp = client_with_db.post("/intel/run?competitor=AppFolio")
-    assert resp.status_code == 200
+    assert resp.status_code == 202
+    data = resp.json()
+    assert data["run_id"] == str(run_id)
+    assert data["competitors_run"] == ["AppFolio"]
+    mock_enqueue.assert_awaited_once()
+    call_args = mock_enqueue.call_args
+    assert call_args[0][1].name == "AppFolio"  # (session, Competitor)
+    assert call_args[0][1].slug == "appfolio"
+
+
+def test_run_pipeline_all_competitors_joins_in_flight_runs(client_with_db):
+    """POST /intel/run for all competitors starts one run; competitors already running join theirs."""
+    comps = [MagicMock(), MagicMock()]
+    comps[0].name, comps[1].name = "AppFolio", "Buildium"
+    in_flight = uuid4()
+
+    async def enqueue(session, competitor, *, run_id):
+        return (in_flight, True) if competitor.name == "Buildium" else (run_id, False)
+
+    with (
+        patch("routes.intel.get_tracked_competitors_from_db", new_callable=AsyncMock) as mock_get,
+        patch("routes.intel.enqueue_pipeline", side_effect=enqueue),
+    ):
+        mock_get.return_value = comps
+        resp = client_with_db.post("/intel/run")
+    assert resp.status_code == 202
     data = resp.json()
-    assert data["created"] == 1
-    assert "AppFolio" in data["competitors_run"]
-    mock_run.assert_called_once()
-    call_args = mock_run.call_args
-    assert len(call_args[0]) == 2  # (Competitor, session)
-    assert call_args[0][0].name == "AppFolio"  # first arg is Competitor-like
-    assert call_args[0][0].slug == "appfolio"
-    assert call_args[0][1] is not None  # session
+    assert data["competitors_run"] == ["AppFolio", "Buildium"]
+    assert data["runs"][0] == {"competitor": "AppFolio", "run_id": data["run_id"], "joined": False}
+    assert data["runs"][1] == {"competitor": "Buildium", "run_id": str(in_flight), "joined": True}
+
+
+def test_get_run_progress_and_cancel(client_with_db):
+    """GET /intel/runs/{id} returns progress; cancel reports cancelled jobs; unknown runs are 404."""
+    run_id = uuid4()
+    progress = {"run_id": str(run_id), "status": "running", "created": 2, "competitors": []}
+    with (
+        patch("routes.intel.get_run_progress", new_callable=AsyncMock) as mock_progress,
+        patch("routes.intel.cancel_run", new_callable=AsyncMock) as mock_cancel,
+    ):
+        mock_progress.return_value = progress
+        assert client_with_db.get(f"/intel/runs/{run_id}").json() == progress
+        mock_cancel.return_value = 3
+        assert client_with_db.post(f"/intel/runs/{run_id}/cancel").json() == {"run_id": str(run_id), "cancelled": 3}
+
+        mock_progress.return_value = None
+        mock_cancel.return_value = 0
+        assert client_with_db.get(f"/intel/runs/{uuid4()}").status_code == 404
+        assert client_with_db.post(f"/intel/runs/{uuid4()}/cancel").status_code == 404
+
+
+def _fake_item(detected_at):
+    item = MagicMock()
+    item.id = uuid4()
+    item.competitor = "AppFolio"
+    item.signal_type = "PRODUCT_LAUNCH"
+    item.threat_level = "LOW"
+    item.threat_reason = "r"
+    item.summary = "s"
+    item.happyco_response = "h"
+    item.confidence = 0.5
+    item.source_url = None
+    item.detected_at = detected_at
+    item.created_at = detected_at
+    return item
+
+
+def test_list_intel_returns_next_cursor_and_pages(client_with_db):
+    """GET /intel fetches one extra row to detect a next page and passes cursor through."""
+    from services.intel_service import decode_cursor
+
+    items = [_fake_item(datetime(2026, 1, 3 - i, tzinfo=UTC)) for i in range(3)]
+    with patch("routes.intel.get_intel_items", new_callable=AsyncMock) as mock_get:
+        mock_get.return_value = items
+        resp = client_with_db.get("/intel?limit=2")
+        data = resp.json()
+        assert data["count"] == 2
+        assert mock_get.call_args[1]["limit"] == 3
+        assert decode_cursor(data["next_cursor"]) == (items[1].detected_at, items[1].id)
+
+        mock_get.return_value = items[2:]
+        resp = client_with_db.get(f"/intel/AppFolio?limit=2&cursor={data['next_cursor']}")
+    assert resp.json()["next_cursor"] is None
+    assert mock_get.call_args[1]["cursor"] == data["next_cursor"]
+
+
+def test_list_intel_invalid_cursor(client_with_db):
+    """A malformed cursor is a 400, not a server error."""
+    with patch("routes.intel.get_intel_items", new_callable=AsyncMock, side_effect=ValueError("Invalid cursor")):
+        resp = client_with_db.get("/intel/signals/PRODUCT_LAUNCH?cursor=garbage")
+    assert resp.status_code == 400
+
+
+def test_search_intel_passes_filters_and_cutoff(client_with_db):
+    with patch("routes.intel.get_intel_hybrid_search", new_callable=AsyncMock) as mock_search:
+        mock_search.return_value = []
+        resp = client_with_db.get(
+            "/intel/search?q=pricing&competitor=Buildium&threat_level=HIGH&since=2026-01-01T00:00:00Z&max_distance=0.4"
+        )
+    assert resp.status_code == 200
+    kwargs = mock_search.call_args[1]
+    assert kwargs["competitor"] == "Buildium"
+    assert kwargs["threat_level"] == "HIGH"
+    assert kwargs["since"] == datetime(2026, 1, 1, tzinfo=UTC)
+    assert kwargs["max_distance"] == 0.4
+    assert client_with_db.get("/intel/search?q=x&max_distance=3").status_code == 422
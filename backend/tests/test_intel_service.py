@@ -1,10 +1,26 @@
 """Tests for intel service."""
 
-from unittest.mock import AsyncMock, MagicMock
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
 
 import pytest
+from sqlalchemy.dialects import postgresql
 
-from services.intel_service import get_tracked_competitors_from_db
+from agent import IntelAnalysis
+from config import Settings
+from services.intel_service import (
+    _build_intel_item,
+    _insert_intel_items,
+    _query_embedding,
+    backfill_embeddings,
+    decode_cursor,
+    encode_cursor,
+    get_intel_hybrid_search,
+    get_intel_items,
+    get_intel_semantic_search,
+    get_tracked_competitors_from_db,
+)
 
 
 @pytest.mark.asyncio
@@ -30,3 +46,185 @@ async def test_get_tracked_competitors_from_db_returns_active_competitors():
     assert competitors[1].name == "Buildium"
     assert competitors[1].slug == "buildium"
     mock_session.execute.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_insert_intel_items_bulk_inserts_rows_content_and_embeddings():
+    """Staged analyses are written with one INSERT per table."""
+    analysis = IntelAnalysis(
+        summary="Item",
+        threat_level="LOW",
+        threat_reason="Minor",
+        happyco_response="Monitor",
+        signal_type="HIRING_SIGNAL",
+        confidence=0.5,
+    )
+    staged = [
+        _build_intel_item("AppFolio", analysis, {"url": "https://a", "snippet": "a"}),
+        _build_intel_item("AppFolio", analysis, {"url": "https://b", "raw_content": "b body"}),
+    ]
+    staged[0].embedding = [0.1] * 1536
+    session = AsyncMock()
+    session.scalars = AsyncMock(side_effect=lambda stmt, rows: [MagicMock(**row) for row in rows])
+    session.execute = AsyncMock()
+
+    created = await _insert_intel_items(session, staged)
+
+    assert [c.source_url for c in created] == ["https://a", "https://b"]
+    stmt, rows = session.scalars.await_args.args
+    assert "RETURNING" in str(stmt)
+    ids = [r["id"] for r in rows]
+    (content_stmt, content_rows), (vector_stmt, vector_rows) = [c.args for c in session.execute.await_args_list]
+    assert "INSERT INTO intel_item_content" in str(content_stmt)
+    assert "to_tsvector" in str(content_stmt)
+    assert [(r["item_id"], r["content"]) for r in content_rows] == [(ids[0], "a"), (ids[1], "b body")]
+    assert "INSERT INTO intel_item_embeddings" in str(vector_stmt)
+    assert [r["item_id"] for r in vector_rows] == ids[:1]
+    session.commit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_backfill_embeddings_embeds_items_without_vectors():
+    item_id = uuid4()
+    result = MagicMock()
+    result.all.return_value = [MagicMock(id=item_id, summary="A", threat_reason="B")]
+    session = AsyncMock()
+    session.execute = AsyncMock(return_value=result)
+
+    with patch(
+        "services.intel_service.get_cached_embeddings",
+        new_callable=AsyncMock,
+        return_value=[[0.2, 0.3]],
+    ) as mock_embed:
+        count = await backfill_embeddings(session)
+
+    assert count == 1
+    mock_embed.assert_awaited_once_with(session, ["A B"])
+    select_stmt = session.execute.await_args_list[0].args[0]
+    assert "LEFT OUTER JOIN intel_item_embeddings" in str(select_stmt)
+    upsert, vectors = session.execute.await_args_list[1].args
+    assert "ON CONFLICT DO NOTHING" in str(upsert.compile(dialect=postgresql.dialect()))
+    assert vectors == [{"item_id": item_id, "embedding": [0.2, 0.3]}]
+    session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_semantic_search_filters_and_cutoff_run_in_the_ann_query():
+    """Filters and max_distance are SQL predicates on the ANN query; results sorted by distance."""
+    near, far = MagicMock(id=uuid4()), MagicMock(id=uuid4())
+    ann = MagicMock()
+    ann.all.return_value = [MagicMock(id=far.id, distance=0.3), MagicMock(id=near.id, distance=0.1)]
+    session = AsyncMock()
+    session.execute = AsyncMock(side_effect=[MagicMock(), ann, _ids_result([far, near])])
+    settings = Settings(_env_file=None, hnsw_ef_search=80, hnsw_iterative_scan="relaxed_order")
+
+    with (
+        patch("services.intel_service._query_embedding", new_callable=AsyncMock, return_value=[0.1, 0.2]),
+        patch("services.intel_service.settings", settings),
+    ):
+        items = await get_intel_semantic_search(
+            session,
+            "AI maintenance",
+            competitor="AppFolio",
+            threat_level="high",
+            since=datetime(2026, 1, 1, tzinfo=UTC),
+            max_distance=0.5,
+        )
+
+    assert items == [near, far]
+    scan_options, search = [c.args[0] for c in session.execute.await_args_list[:2]]
+    assert {"80", "relaxed_order"} <= set(scan_options.compile().params.values())
+    sql = str(search)
+    assert "intel_items.competitor =" in sql
+    assert "intel_items.threat_level =" in sql
+    assert "intel_items.detected_at >=" in sql
+    assert "<=> " in sql and "<= " in sql
+    assert "HIGH" in search.compile().params.values()
+    session.commit.assert_not_awaited()  # GET search never commits the request session
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    item = MagicMock(detected_at=datetime(2026, 3, 1, 12, tzinfo=UTC), id=uuid4())
+    assert decode_cursor(encode_cursor(item)) == (item.detected_at, item.id)
+    for bad in ("garbage", "", encode_cursor(item)[:-3] + "!!!"):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+@pytest.mark.asyncio
+async def test_get_intel_items_keyset_after_cursor():
+    """A cursor becomes a (detected_at, id) row comparison, never an OFFSET; only list columns are read."""
+    item = MagicMock(detected_at=datetime(2026, 3, 1, tzinfo=UTC), id=uuid4())
+    row = MagicMock(id=uuid4())
+    result = MagicMock()
+    result.all.return_value = [row]
+    session = AsyncMock()
+    session.execute = AsyncMock(return_value=result)
+
+    assert await get_intel_items(session, competitor="AppFolio", cursor=encode_cursor(item)) == [row]
+
+    sql = str(session.execute.await_args.args[0])
+    assert "(intel_items.detected_at, intel_items.id) <" in sql
+    assert "ORDER BY intel_items.detected_at DESC, intel_items.id DESC" in sql
+    assert "OFFSET" not in sql
+    assert "raw_content" not in sql and "embedding" not in sql
+
+
+@pytest.mark.asyncio
+async def test_query_embedding_is_cached_in_its_own_session(mock_session_context):
+    cache_session = AsyncMock()
+    with (
+        patch("services.intel_service.session_context", mock_session_context(cache_session)),
+        patch("services.intel_service.get_cached_embedding", new_callable=AsyncMock, return_value=[0.1]) as mock_get,
+    ):
+        assert await _query_embedding("AI maintenance") == [0.1]
+    mock_get.assert_awaited_once_with(cache_session, "AI maintenance")
+    cache_session.commit.assert_awaited_once()
+
+
+def _ids_result(ids):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = ids
+    return result
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_fuses_lexical_and_vector_rankings():
+    """Items ranked well by both retrievers come first (reciprocal rank fusion)."""
+    a, b, c = (MagicMock(id=uuid4()) for _ in range(3))
+    vector = MagicMock()
+    vector.all.return_value = [MagicMock(id=c.id, distance=0.1), MagicMock(id=b.id, distance=0.2)]
+    session = AsyncMock()
+    session.execute = AsyncMock(
+        side_effect=[
+            _ids_result([a.id, b.id]),  # lexical
+            MagicMock(),  # set hnsw scan options
+            vector,
+            _ids_result([a, b, c]),  # item load
+        ]
+    )
+    with patch("services.intel_service._query_embedding", new_callable=AsyncMock, return_value=[0.1]):
+        items = await get_intel_hybrid_search(session, "AppFolio AI", limit=3)
+
+    assert items[0] is b
+    assert {items[1], items[2]} == {a, c}
+    session.commit.assert_not_awaited()
+    lexical_sql = str(session.execute.await_args_list[0].args[0])
+    assert "@@ websearch_to_tsquery" in lexical_sql
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_falls_back_to_lexical_and_skips_embedding_for_quoted_query():
+    a = MagicMock(id=uuid4())
+    session = AsyncMock()
+    session.execute = AsyncMock(side_effect=[_ids_result([a.id]), _ids_result([a])])
+    with patch("services.intel_service._query_embedding", new_callable=AsyncMock) as mock_embed:
+        items = await get_intel_hybrid_search(session, '"Realm-X"')
+
+    assert items == [a]
+    mock_embed.assert_not_awaited()
+    session.commit.assert_not_awaited()
+
+    session.execute = AsyncMock(side_effect=[_ids_result([])])
+    with patch("services.intel_service._query_embedding", new_callable=AsyncMock, return_value=None):
+        assert await get_intel_hybrid_search(session, "no key configured") == []
@@ -0,0 +1,124 @@
+"""Tests for scheduled-job leases."""
+
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from services import job_lease
+from services.job_lease import HOLDER_ID, acquire_lease, with_lease
+
+
+@pytest.fixture
+def lease_settings(make_settings):
+    return make_settings(database_url="postgresql://test", job_lease_ttl_seconds=300)
+
+
+@pytest.mark.asyncio
+async def test_acquire_lease_takes_only_expired_and_not_recently_completed(lease_settings, mock_session_context):
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = HOLDER_ID
+    session = AsyncMock()
+    session.execute = AsyncMock(return_value=result)
+
+    with (
+        patch("services.job_lease.settings", lease_settings),
+        patch("services.job_lease.session_context", mock_session_context(session)),
+    ):
+        assert await acquire_lease("weekly_digest", min_interval=timedelta(days=1))
+
+    sql = str(session.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (job_id) DO UPDATE" in sql
+    assert "job_leases.expires_at < now()" in sql
+    assert "job_leases.last_completed_at <" in sql
+    assert "RETURNING job_leases.holder" in sql
+    session.commit.assert_awaited_once()
+
+    result.scalar_one_or_none.return_value = None  # held elsewhere: conflict row not updated
+    with (
+        patch("services.job_lease.settings", lease_settings),
+        patch("services.job_lease.session_context", mock_session_context(session)),
+    ):
+        assert not await acquire_lease("weekly_digest")
+
+
+@pytest.mark.asyncio
+async def test_with_lease_runs_job_only_when_acquired_and_marks_completion(lease_settings):
+    job = AsyncMock()
+    wrapped = with_lease("weekly_digest", job, min_interval=timedelta(days=1))
+
+    with (
+        patch("services.job_lease.settings", lease_settings),
+        patch.object(job_lease, "acquire_lease", AsyncMock(return_value=False)),
+    ):
+        await wrapped()
+    job.assert_not_awaited()
+
+    with (
+        patch("services.job_lease.settings", lease_settings),
+        patch.object(job_lease, "acquire_lease", AsyncMock(return_value=True)) as mock_acquire,
+        patch.object(job_lease, "release_lease", AsyncMock()) as mock_release,
+    ):
+        await wrapped()
+    job.assert_awaited_once()
+    mock_acquire.assert_awaited_once_with("weekly_digest", min_interval=timedelta(days=1))
+    mock_release.assert_awaited_once_with("weekly_digest", completed=True)
+
+
+@pytest.mark.asyncio
+async def test_with_lease_releases_without_completion_when_job_fails(lease_settings):
+    job = AsyncMock(side_effect=RuntimeError("scrape failed"))
+    with (
+        patch("services.job_lease.settings", lease_settings),
+        patch.object(job_lease, "acquire_lease", AsyncMock(return_value=True)),
+        patch.object(job_lease, "release_lease", AsyncMock()) as mock_release,
+    ):
+        with pytest.raises(RuntimeError):
+            await with_lease("weekly_digest", job)()
+    mock_release.assert_awaited_once_with("weekly_digest", completed=False)
+
+
+def _fast_renewal_settings():
+    return MagicMock(database_url="postgresql://test", job_lease_ttl_seconds=0.03)
+
+
+@pytest.mark.asyncio
+async def test_with_lease_renews_while_job_runs():
+    async def job():
+        await asyncio.sleep(0.1)
+
+    with (
+        patch("services.job_lease.settings", _fast_renewal_settings()),
+        patch.object(job_lease, "acquire_lease", AsyncMock(return_value=True)),
+        patch.object(job_lease, "renew_lease", AsyncMock(return_value=True)) as mock_renew,
+        patch.object(job_lease, "release_lease", AsyncMock()) as mock_release,
+    ):
+        await with_lease("weekly_digest", job)()
+
+    assert mock_renew.await_count >= 2
+    mock_release.assert_awaited_once_with("weekly_digest", completed=True)
+
+
+@pytest.mark.asyncio
+async def test_with_lease_cancels_job_when_lease_is_lost():
+    cancelled = asyncio.Event()
+
+    async def job():
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with (
+        patch("services.job_lease.settings", _fast_renewal_settings()),
+        patch.object(job_lease, "acquire_lease", AsyncMock(return_value=True)),
+        patch.object(job_lease, "renew_lease", AsyncMock(return_value=False)),
+        patch.object(job_lease, "release_lease", AsyncMock()) as mock_release,
+    ):
+        await asyncio.wait_for(with_lease("weekly_digest", job)(), timeout=5)
+
+    assert cancelled.is_set()
+    mock_release.assert_not_awaited()  # the lease belongs to the new holder now
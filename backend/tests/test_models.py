@@ -8,9 +8,7 @@ def test_intel_item_has_required_columns():
     assert hasattr(IntelItem, "summary")
     assert hasattr(IntelItem, "happyco_response")
     assert hasattr(IntelItem, "confidence")
-    assert hasattr(IntelItem, "embedding")
     assert hasattr(IntelItem, "source_url")
-    assert hasattr(IntelItem, "raw_content")
 
 
 def test_digest_has_required_columns():
@@ -26,3 +24,39 @@ def test_intel_item_table_name():
 
 def test_digest_table_name():
     assert Digest.__tablename__ == "digests"
+
+
+def test_embedding_cache_table():
+    from models import EmbeddingCache
+
+    assert EmbeddingCache.__tablename__ == "embedding_cache"
+    pk = [c.name for c in EmbeddingCache.__table__.primary_key.columns]
+    assert pk == ["model", "dimensions", "text_hash"]
+
+
+def test_embedding_storage_selects_column_type():
+    from unittest.mock import patch
+
+    from pgvector.sqlalchemy import HALFVEC, Vector
+
+    import models
+    from config import Settings
+    from models import IntelItemEmbedding
+
+    with patch("models.settings", Settings(_env_file=None, embedding_storage="halfvec", embedding_dimensions=512)):
+        column_type = models._embedding_type()
+    assert isinstance(column_type, HALFVEC)
+    assert column_type.dim == 512
+    assert isinstance(IntelItemEmbedding.__table__.c.embedding.type, Vector)
+
+
+def test_cold_columns_live_in_side_tables():
+    """raw_content, the search document and embeddings are keyed by item id outside intel_items."""
+    from models import IntelItemContent, IntelItemEmbedding
+
+    hot = set(IntelItem.__table__.c.keys())
+    assert not hot & {"raw_content", "embedding", "search_tsv"}
+    for model in (IntelItemContent, IntelItemEmbedding):
+        assert model.__table__.c.item_id.primary_key
+    assert "search_tsv" in IntelItemContent.__table__.c
+    assert IntelItem.content.property.viewonly
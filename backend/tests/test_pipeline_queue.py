@@ -0,0 +1,384 @@
+"""Tests for the durable pipeline queue."""
+
+import asyncio
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from agent import IntelAnalysis
+from models import PipelineJob
+from services.job_lease import HOLDER_ID
+from services.pipeline_queue import (
+    cancel_run,
+    claim_jobs,
+    enqueue_pipeline,
+    get_run_progress,
+    process_job,
+    run_queue_worker,
+)
+
+
+@pytest.fixture
+def queue_settings(make_settings):
+    return make_settings(pipeline_queue_chunk_items=2, pipeline_queue_max_attempts=3, triage_enabled=False)
+
+
+def _job(stage, payload=None, attempts=1):
+    return PipelineJob(
+        id=uuid4(),
+        run_id=uuid4(),
+        competitor_id=uuid4(),
+        competitor="AppFolio",
+        stage=stage,
+        status="running",
+        payload=payload or {},
+        attempts=attempts,
+        locked_by=HOLDER_ID,
+    )
+
+
+def _session(rowcount=1):
+    session = AsyncMock()
+    session.execute = AsyncMock(return_value=MagicMock(rowcount=rowcount))
+    return session
+
+
+def _updates(session):
+    """Compiled UPDATE pipeline_jobs statements and their bound values."""
+    out = []
+    for call in session.execute.await_args_list:
+        compiled = call.args[0].compile(dialect=postgresql.dialect())
+        if str(compiled).startswith("UPDATE pipeline_jobs"):
+            out.append(compiled.params)
+    return out
+
+
+@pytest.mark.asyncio
+async def test_claim_jobs_uses_skip_locked_and_marks_running(queue_settings):
+    session = AsyncMock()
+    session.scalars = AsyncMock(return_value=[MagicMock()])
+
+    with patch("services.pipeline_queue.settings", queue_settings):
+        jobs = await claim_jobs(session, "analyze", 4)
+
+    assert len(jobs) == 1
+    compiled = session.scalars.await_args.args[0].compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "pipeline_jobs.locked_until < now()" in sql
+    assert "pipeline_jobs.attempts < %(attempts_2)s" in sql
+    assert compiled.params["attempts_2"] == 3
+    assert "RETURNING" in sql
+    session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_claim_jobs_fails_expired_jobs_out_of_attempts(queue_settings):
+    session = AsyncMock()
+    session.scalars = AsyncMock(return_value=[])
+
+    with patch("services.pipeline_queue.settings", queue_settings):
+        await claim_jobs(session, "analyze", 4)
+
+    compiled = session.execute.await_args.args[0].compile(dialect=postgresql.dialect())
+    assert "pipeline_jobs.locked_until < now()" in str(compiled)
+    assert "pipeline_jobs.attempts >= %(attempts_1)s" in str(compiled)
+    assert compiled.params["status"] == "failed"
+    assert compiled.params["attempts_1"] == 3
+
+
+def _heartbeat_settings():
+    return MagicMock(pipeline_queue_visibility_seconds=0.03, pipeline_queue_max_attempts=3)
+
+
+@pytest.mark.asyncio
+async def test_process_job_extends_claim_while_handler_runs(mock_session_context):
+    async def slow_analyze(session, job):
+        await asyncio.sleep(0.1)
+        return True
+
+    session = _session()
+    with (
+        patch("services.pipeline_queue.settings", _heartbeat_settings()),
+        patch("services.pipeline_queue.session_context", mock_session_context(session)),
+        patch.dict("services.pipeline_queue._HANDLERS", {"analyze": slow_analyze}),
+        patch("services.pipeline_queue._extend_claim", AsyncMock(return_value=True)) as mock_extend,
+    ):
+        await process_job(_job("analyze"))
+
+    assert mock_extend.await_count >= 2
+    session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_process_job_stops_handler_when_claim_is_lost(mock_session_context):
+    cancelled = asyncio.Event()
+
+    async def stuck_analyze(session, job):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    session = _session()
+    with (
+        patch("services.pipeline_queue.settings", _heartbeat_settings()),
+        patch("services.pipeline_queue.session_context", mock_session_context(session)),
+        patch.dict("services.pipeline_queue._HANDLERS", {"analyze": stuck_analyze}),
+        patch("services.pipeline_queue._extend_claim", AsyncMock(return_value=False)),
+        patch("services.pipeline_queue._fail", new_callable=AsyncMock) as mock_fail,
+    ):
+        await asyncio.wait_for(process_job(_job("analyze")), timeout=5)
+
+    assert cancelled.is_set()
+    session.rollback.assert_awaited_once()
+    session.commit.assert_not_called()
+    mock_fail.assert_not_awaited()  # the job belongs to whoever reclaimed it
+
+
+@pytest.mark.asyncio
+async def test_scrape_fans_out_unseen_items_into_analyze_chunks(queue_settings, mock_session_context):
+    session = _session()
+    source = MagicMock()
+    source._mapping = {"name": "AppFolio", "blog_url": None, "g2_slug": None, "capterra_slug": None}
+    session.execute.return_value.one_or_none.return_value = source
+    blog = [{"url": f"https://a/{i}"} for i in range(6)]
+
+    def scrape_source(competitor, source, errors):
+        if source == "jobs":
+            raise RuntimeError("Jobs scrape failed")
+        return blog if source == "blog" else []
+
+    async def take_unseen(session, competitor_id, source, items):
+        return items[1:]  # the first blog post was already queued by a poll
+
+    with (
+        patch("services.pipeline_queue.settings", queue_settings),
+        patch("services.pipeline_queue.session_context", mock_session_context(session)),
+        patch("services.pipeline_queue.scrape_source", scrape_source),
+        patch("services.pipeline_queue.take_unseen", side_effect=take_unseen) as mock_take,
+    ):
+        await process_job(_job("scrape"))
+
+    assert [c.args[2] for c in mock_take.await_args_list] == ["blog", "reviews"]  # jobs failed
+    inserted = next(c.args[1] for c in session.execute.await_args_list if len(c.args) > 1)
+    assert [len(j["payload"]["items"]) for j in inserted] == [2, 2, 1]
+    assert {j["stage"] for j in inserted} == {"analyze"}
+    params = _updates(session)[-1]
+    assert params["status"] == "done"
+    assert params["payload"] == {"scraped": 6, "new": 5, "analyze_jobs": 3}
+    session.commit.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_scrape_fails_when_every_source_fails(queue_settings, mock_session_context):
+    session = _session()
+    session.execute.return_value.one_or_none.return_value = MagicMock(_mapping={"name": "AppFolio"})
+
+    with (
+        patch("services.pipeline_queue.settings", queue_settings),
+        patch("services.pipeline_queue.session_context", mock_session_context(session)),
+        patch("services.pipeline_queue.scrape_source", side_effect=RuntimeError("offline")),
+    ):
+        await process_job(_job("scrape"))
+
+    params = _updates(session)[-1]
+    assert (params["status"], params["last_error"]) == ("pending", "offline")
+
+
+@pytest.mark.asyncio
+async def test_analyze_persists_staged_rows_and_advances_to_embed(mock_session_context):
+    analysis = IntelAnalysis(
+        summary="New AI inspections",
+        threat_level="HIGH",
+        threat_reason="Overlaps core product",
+        happyco_response="Ship faster",
+        signal_type="PRODUCT_LAUNCH",
+        confidence=0.9,
+    )
+
+    async def fake_stream(items, competitor):
+        yield 0, analysis
+
+    session = _session()
+    job = _job("analyze", {"items": [{"url": "https://a", "raw_content": "body"}]})
+
+    with (
+        patch("services.pipeline_queue.session_context", mock_session_context(session)),
+        patch("services.pipeline_queue._stream_analyses", fake_stream),
+    ):
+        await process_job(job)
+
+    params = _updates(session)[-1]
+    assert params["stage"] == "embed"
+    assert params["status"] == "pending"
+    staged = params["payload"]["staged"]
+    assert staged[0]["row"]["summary"] == "New AI inspections"
+    assert staged[0]["row"]["source_url"] == "https://a"
+    assert staged[0]["raw_content"] == "body"
+    session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_store_rolls_back_when_claim_was_lost(mock_session_context):
+    """If another worker reclaimed the job, the inserted rows are discarded."""
+    payload = {
+        "staged": [
+            {
+                "row": {"id": str(uuid4()), "summary": "s", "threat_reason": "r", "competitor": "AppFolio"},
+                "raw_content": None,
+            }
+        ]
+    }
+    session = _session(rowcount=0)
+
+    with (
+        patch("services.pipeline_queue.session_context", mock_session_context(session)),
+        patch("services.pipeline_queue.get_cached_embeddings", AsyncMock(return_value=[None])),
+        patch("services.pipeline_queue._insert_intel_items", new_callable=AsyncMock) as mock_insert,
+    ):
+        await process_job(_job("store", payload))
+
+    mock_insert.assert_awaited_once()
+    session.rollback.assert_awaited_once()
+    session.commit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_failed_stage_is_retried_then_marked_failed(queue_settings, mock_session_context):
+    async def failing_stream(items, competitor):
+        raise RuntimeError("overloaded")
+        yield  # pragma: no cover
+
+    for attempts, status in ((1, "pending"), (3, "failed")):
+        session = _session()
+        with (
+            patch("services.pipeline_queue.settings", queue_settings),
+            patch("services.pipeline_queue.session_context", mock_session_context(session)),
+            patch("services.pipeline_queue._stream_analyses", failing_stream),
+        ):
+            await process_job(_job("analyze", {"items": [{}]}, attempts=attempts))
+
+        session.rollback.assert_awaited_once()
+        params = _updates(session)[-1]
+        assert params["status"] == status
+        assert params["last_error"] == "overloaded"
+
+
+def _scalar_result(value):
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = value
+    return result
+
+
+@pytest.mark.asyncio
+async def test_queue_worker_keeps_other_stages_moving_during_a_slow_scrape(make_settings):
+    stop = asyncio.Event()
+    scrape_started = asyncio.Event()
+    release_scrape = asyncio.Event()
+    stored = []
+
+    async def fake_process_stage(stage, limit=None):
+        if stage == "scrape":
+            scrape_started.set()
+            await release_scrape.wait()
+            return 0
+        if stage == "store" and len(stored) < 3:
+            stored.append(scrape_started.is_set() and not release_scrape.is_set())
+            if len(stored) == 3:
+                release_scrape.set()
+                stop.set()
+            return 1
+        return 0
+
+    with (
+        patch("services.pipeline_queue.settings", make_settings(pipeline_queue_poll_seconds=0.01)),
+        patch("services.pipeline_queue.process_stage", side_effect=fake_process_stage),
+    ):
+        await asyncio.wait_for(run_queue_worker(stop), timeout=5)
+
+    # Store jobs were claimed and run while the scrape was still in progress
+    assert stored[1:] == [True, True]
+
+
+@pytest.mark.asyncio
+async def test_enqueue_pipeline_joins_in_flight_run():
+    in_flight = uuid4()
+    session = AsyncMock()
+    session.execute = AsyncMock(return_value=_scalar_result(in_flight))
+    competitor = MagicMock(id=uuid4())
+
+    assert await enqueue_pipeline(session, competitor) == (in_flight, True)
+    session.execute.assert_awaited_once()
+    session.commit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_pipeline_starts_run_guarded_by_partial_unique_index():
+    run_id = uuid4()
+    session = AsyncMock()
+    session.execute = AsyncMock(side_effect=[_scalar_result(None), _scalar_result(run_id)])
+    competitor = MagicMock(id=uuid4())
+    competitor.name = "AppFolio"
+
+    assert await enqueue_pipeline(session, competitor, run_id=run_id) == (run_id, False)
+    sql = str(session.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (competitor_id) WHERE" in sql
+    assert "DO NOTHING RETURNING pipeline_jobs.run_id" in sql
+    session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_run_progress_groups_by_competitor_and_stage():
+    now = datetime.now(UTC)
+
+    def row(competitor, stage, status, jobs, stored=None, error=None):
+        return MagicMock(
+            competitor=competitor,
+            stage=stage,
+            status=status,
+            jobs=jobs,
+            stored=stored,
+            error=error,
+            started_at=now,
+            updated_at=now,
+        )
+
+    result = MagicMock()
+    result.all.return_value = [
+        row("AppFolio", "scrape", "done", 1),
+        row("AppFolio", "store", "done", 2, stored=7),
+        row("AppFolio", "analyze", "pending", 1, error="overloaded"),
+        row("Buildium", "scrape", "failed", 1, error="blocked"),
+    ]
+    session = AsyncMock()
+    session.execute = AsyncMock(return_value=result)
+    run_id = uuid4()
+
+    progress = await get_run_progress(session, run_id)
+
+    assert progress["status"] == "running"
+    assert progress["created"] == 7
+    appfolio, buildium = progress["competitors"]
+    assert appfolio["status"] == "running"
+    assert appfolio["stages"]["analyze"] == {"pending": 1}
+    assert appfolio["stages"]["store"] == {"done": 2}
+    assert appfolio["errors"] == ["overloaded"]
+    assert (buildium["status"], buildium["errors"]) == ("failed", ["blocked"])
+
+    result.all.return_value = []
+    assert await get_run_progress(session, run_id) is None
+
+
+@pytest.mark.asyncio
+async def test_cancel_run_cancels_only_unfinished_jobs():
+    session = _session(rowcount=2)
+    assert await cancel_run(session, uuid4()) == 2
+    compiled = session.execute.await_args.args[0].compile(dialect=postgresql.dialect())
+    assert "pipeline_jobs.status IN" in str(compiled)
+    assert compiled.params["status"] == "cancelled"
+    session.commit.assert_awaited_once()
@@ -0,0 +1,99 @@
+"""Tests for the adaptive API rate limiter."""
+
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from rate_limit import AdaptiveLimiter, retry_after_seconds
+
+
+class FakeStatusError(Exception):
+    def __init__(self, status_code: int, headers: dict | None = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = MagicMock(headers=headers or {})
+
+
+def test_retry_after_seconds_parses_seconds_and_ms():
+    assert retry_after_seconds({"retry-after": "3"}) == 3.0
+    assert retry_after_seconds({"retry-after-ms": "250"}) == 0.25
+    assert retry_after_seconds({}) is None
+
+
+def test_call_retries_429_honoring_retry_after_and_halves_limit():
+    """A 429 halves concurrency and the retry waits at least retry-after."""
+    limiter = AdaptiveLimiter("test", max_concurrency=8, backoff_base=0.5)
+    fn = MagicMock(side_effect=[FakeStatusError(429, {"retry-after": "2"}), MagicMock(headers={})])
+
+    with patch("rate_limit.time.sleep") as mock_sleep:
+        limiter.call(fn)
+
+    assert fn.call_count == 2
+    assert 2.0 <= mock_sleep.call_args[0][0] <= 2.5
+    assert limiter.limit < 8
+    assert limiter.in_flight == 0
+
+
+def test_call_does_not_retry_client_errors():
+    limiter = AdaptiveLimiter("test", max_concurrency=2)
+    fn = MagicMock(side_effect=FakeStatusError(400))
+    with pytest.raises(FakeStatusError):
+        limiter.call(fn)
+    assert fn.call_count == 1
+    assert limiter.in_flight == 0
+
+
+def test_call_gives_up_after_max_retries():
+    limiter = AdaptiveLimiter("test", max_concurrency=2, max_retries=2)
+    fn = MagicMock(side_effect=FakeStatusError(529))
+    with patch("rate_limit.time.sleep"), pytest.raises(FakeStatusError):
+        limiter.call(fn)
+    assert fn.call_count == 3
+    assert limiter.limit == 1
+
+
+def test_success_increases_limit_additively_and_tracks_headers():
+    limiter = AdaptiveLimiter("test", max_concurrency=8)
+    limiter.limit = 2.0
+    limiter.record_success(
+        {"anthropic-ratelimit-requests-remaining": "40", "anthropic-ratelimit-tokens-remaining": "9000"}
+    )
+    assert limiter.limit == 2.5
+    assert limiter.requests_remaining == 40
+    assert limiter.tokens_remaining == 9000
+
+
+def test_exhausted_request_budget_pauses_new_requests():
+    """requests-remaining 0 pauses acquisition until the reported reset."""
+    limiter = AdaptiveLimiter("test", max_concurrency=4)
+    limiter.record_success({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1.5s"})
+    assert limiter._paused_until > 0
+
+
+def test_stream_holds_slot_and_retries_opening():
+    limiter = AdaptiveLimiter("test", max_concurrency=1)
+    opened = []
+
+    @contextmanager
+    def ok_stream():
+        opened.append(True)
+        assert limiter.in_flight == 1
+        yield MagicMock(response=MagicMock(headers={}))
+
+    managers = iter([MagicMock(__enter__=MagicMock(side_effect=FakeStatusError(503))), ok_stream()])
+    with patch("rate_limit.time.sleep"), limiter.stream(lambda: next(managers)):
+        assert limiter.in_flight == 1
+    assert opened == [True]
+    assert limiter.in_flight == 0
+
+
+def test_stream_releases_slot_when_opening_raises():
+    limiter = AdaptiveLimiter("test", max_concurrency=1)
+
+    def open_stream():
+        raise ValueError("bad request params")
+
+    with pytest.raises(ValueError), limiter.stream(open_stream):
+        pass
+    assert limiter.in_flight == 0
@@ -0,0 +1,215 @@
+"""Tests for intel_items partition retention."""
+
+from datetime import UTC, date, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pyarrow.parquet as pq
+import pytest
+
+from config import Settings
+from services.retention import (
+    add_months,
+    archive_partition,
+    ensure_partitions,
+    partition_month,
+    partition_name,
+    run_retention,
+)
+
+
+def _partitions_result(names):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = names
+    return result
+
+
+def test_month_arithmetic_and_partition_names():
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_name(date(2026, 3, 1)) == "intel_items_y2026m03"
+    assert partition_month("intel_items_y2026m03") == date(2026, 3, 1)
+    assert partition_month("intel_items_default") is None
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_creates_missing_months_ahead():
+    session = AsyncMock()
+    session.execute = AsyncMock(return_value=_partitions_result(["intel_items_y2026m10"]))
+
+    with patch("services.retention.settings", Settings(_env_file=None, partition_months_ahead=2)):
+        created = await ensure_partitions(session, today=date(2026, 10, 19))
+
+    assert created == ["intel_items_y2026m11", "intel_items_y2026m12"]
+    ddl = str(session.execute.await_args_list[-1].args[0])
+    assert "PARTITION OF intel_items" in ddl
+    assert "FROM ('2026-12-01 00:00+00') TO ('2027-01-01 00:00+00')" in ddl
+    session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_moves_rows_out_of_default_partition():
+    listed = _partitions_result(["intel_items_default", "intel_items_y2026m10"])
+    stranded = MagicMock()
+    stranded.scalar.return_value = 4
+    session = AsyncMock()
+    session.execute = AsyncMock(
+        side_effect=[listed, MagicMock(), stranded, MagicMock(), MagicMock(), MagicMock()]
+    )
+
+    with patch("services.retention.settings", Settings(_env_file=None, partition_months_ahead=1)):
+        created = await ensure_partitions(session, today=date(2026, 10, 19))
+
+    assert created == ["intel_items_y2026m11"]
+    statements = [str(c.args[0]) for c in session.execute.await_args_list[1:]]
+    assert statements[0] == "LOCK TABLE intel_items_default IN EXCLUSIVE MODE"
+    assert statements[2].startswith("CREATE TABLE intel_items_y2026m11 (LIKE intel_items")
+    assert "DELETE FROM intel_items_default" in statements[3]
+    assert "INSERT INTO intel_items_y2026m11 SELECT * FROM moved" in statements[3]
+    assert statements[4].startswith("ALTER TABLE intel_items ATTACH PARTITION intel_items_y2026m11")
+
+
+def _archive_session(row, *, partition_rows=1):
+    async def partitions():
+        yield [row]
+
+    streamed = MagicMock()
+    streamed.partitions = partitions
+    counted = MagicMock()
+    counted.scalar.return_value = partition_rows
+    session = AsyncMock()
+    session.stream = AsyncMock(return_value=streamed)
+    session.execute = AsyncMock(return_value=counted)
+    return session
+
+
+def _archived_row():
+    item_id = uuid4()
+    row = MagicMock(id=item_id)
+    row._mapping = {
+        "id": item_id,
+        "competitor": "AppFolio",
+        "signal_type": "PRODUCT_LAUNCH",
+        "threat_level": "HIGH",
+        "threat_reason": "r",
+        "summary": "s",
+        "happyco_response": "h",
+        "confidence": 0.9,
+        "source_url": None,
+        "raw_content": "body",
+        "detected_at": datetime(2024, 1, 5, tzinfo=UTC),
+        "created_at": datetime(2024, 1, 5, tzinfo=UTC),
+    }
+    return row
+
+
+@pytest.mark.asyncio
+async def test_archive_partition_writes_parquet_then_detaches(tmp_path):
+    row = _archived_row()
+    session = _archive_session(row)
+
+    with patch("services.retention.settings", Settings(_env_file=None, archive_dir=str(tmp_path))):
+        count = await archive_partition(session, "intel_items_y2024m01")
+
+    assert count == 1
+    table = pq.read_table(tmp_path / "intel_items" / "2024-01.parquet")
+    assert table.column("id").to_pylist() == [str(row.id)]
+    assert table.column("raw_content").to_pylist() == ["body"]
+    assert "FROM intel_items_y2024m01" in str(session.stream.await_args.args[0])
+    statements = [str(c.args[0]) for c in session.execute.await_args_list]
+    assert statements == [
+        "ALTER TABLE intel_items DETACH PARTITION intel_items_y2024m01",
+        "SELECT count(*) FROM intel_items_y2024m01",
+    ]
+    assert not (tmp_path / "intel_items" / "2024-01.parquet.tmp").exists()
+
+
+@pytest.mark.asyncio
+async def test_archive_partition_drops_only_when_asked(tmp_path):
+    session = _archive_session(_archived_row())
+
+    with patch(
+        "services.retention.settings",
+        Settings(_env_file=None, archive_dir=str(tmp_path), retention_drop=True),
+    ):
+        await archive_partition(session, "intel_items_y2024m01")
+
+    statements = [str(c.args[0]) for c in session.execute.await_args_list]
+    assert any(
+        "DELETE FROM intel_item_content" in s and "FROM intel_items_y2024m01" in s
+        for s in statements
+    )
+    assert any("DELETE FROM intel_item_embeddings" in s for s in statements)
+    assert statements[-1] == "DROP TABLE intel_items_y2024m01"
+
+
+@pytest.mark.asyncio
+async def test_archive_partition_keeps_partition_when_row_counts_differ(tmp_path):
+    session = _archive_session(_archived_row(), partition_rows=2)
+
+    with (
+        patch("services.retention.settings", Settings(_env_file=None, archive_dir=str(tmp_path))),
+        pytest.raises(RuntimeError, match="1 rows but the partition has 2"),
+    ):
+        await archive_partition(session, "intel_items_y2024m01")
+
+    assert not list((tmp_path / "intel_items").iterdir())
+    session.rollback.assert_awaited_once()  # undoes the detach
+    assert session.commit.await_count == 1  # only the one ending the archive read
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("archive_dir", ["", "archive"])
+async def test_archive_partition_requires_durable_archive_dir(archive_dir):
+    session = _archive_session(_archived_row())
+    with (
+        patch("services.retention.settings", Settings(_env_file=None, archive_dir=archive_dir)),
+        pytest.raises(ValueError, match="ARCHIVE_DIR"),
+    ):
+        await archive_partition(session, "intel_items_y2024m01")
+    session.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_run_retention_only_creates_partitions_by_default():
+    session = AsyncMock()
+    with (
+        patch("services.retention.settings", Settings(_env_file=None)),
+        patch("services.retention.ensure_partitions", new_callable=AsyncMock) as mock_ensure,
+        patch("services.retention.archive_partition", new_callable=AsyncMock) as mock_archive,
+    ):
+        assert await run_retention(session, today=date(2026, 10, 19)) == []
+
+    mock_ensure.assert_awaited_once()
+    mock_archive.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_run_retention_archives_only_partitions_past_the_window(tmp_path):
+    names = [
+        "intel_items_default",
+        "intel_items_y2024m09",
+        "intel_items_y2024m10",
+        "intel_items_y2026m10",
+    ]
+    session = AsyncMock()
+    session.execute = AsyncMock(return_value=_partitions_result(names))
+
+    with (
+        patch(
+            "services.retention.settings",
+            Settings(
+                _env_file=None,
+                retention_enabled=True,
+                retention_months=24,
+                archive_dir=str(tmp_path),
+            ),
+        ),
+        patch("services.retention.ensure_partitions", new_callable=AsyncMock) as mock_ensure,
+        patch("services.retention.archive_partition", new_callable=AsyncMock) as mock_archive,
+    ):
+        archived = await run_retention(session, today=date(2026, 10, 19))
+
+    mock_ensure.assert_awaited_once()
+    assert archived == ["intel_items_y2024m09"]
+    mock_archive.assert_awaited_once_with(session, "intel_items_y2024m09")
@@ -2,6 +2,7 @@
 
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
 
 from scrapers.review_scraper import _parse_google_organic, fetch_reviews
@@ -44,3 +45,25 @@ def test_fetch_reviews_raises_without_api_key():
     with patch("scrapers.review_scraper.settings", MagicMock(serpapi_key=None)):
         with pytest.raises(ValueError, match="SERPAPI_KEY is required"):
             fetch_reviews("AppFolio")
+
+
+@patch("scrapers.review_scraper._serpapi_request")
+def test_fetch_reviews_keeps_capterra_results_when_g2_fails(mock_serp):
+    """A failed G2 search is recorded while Capterra's reviews are still returned."""
+    capterra = {"organic_results": [{"title": "Capterra Review", "link": "https://capterra.com/1"}]}
+    mock_serp.side_effect = [httpx.ConnectError("unreachable"), capterra]
+    errors: list[str] = []
+    with patch("scrapers.review_scraper.settings", MagicMock(serpapi_key="test")):
+        items = fetch_reviews("AppFolio", raise_errors=True, errors=errors)
+    assert [i["title"] for i in items] == ["Capterra Review"]
+    assert errors == ["G2 reviews scrape failed: unreachable"]
+
+
+@patch("scrapers.review_scraper._serpapi_request")
+def test_fetch_reviews_raise_errors_when_both_searches_fail(mock_serp):
+    """Both searches failing returns [] by default and raises with raise_errors."""
+    mock_serp.side_effect = httpx.ConnectError("unreachable")
+    with patch("scrapers.review_scraper.settings", MagicMock(serpapi_key="test")):
+        assert fetch_reviews("AppFolio") == []
+        with pytest.raises(RuntimeError, match="G2 reviews scrape failed.*Capterra reviews scrape failed"):
+            fetch_reviews("AppFolio", raise_errors=True)
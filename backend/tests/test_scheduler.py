@@ -10,19 +10,20 @@ from scheduler import (
     shutdown_scheduler,
     start_scheduler,
 )
+from services.streaming_pipeline import PipelineResult
 
 
 def test_get_scheduler_configures_weekly_job():
     """get_scheduler returns scheduler with Monday 7:00 AM UTC job."""
     shutdown_scheduler()  # Reset so we get fresh scheduler
     sched = get_scheduler()
-    jobs = sched.get_jobs()
-    assert len(jobs) == 1
-    assert jobs[0].id == "weekly_digest"
-    assert jobs[0].name == "Weekly Monday Digest"
+    jobs = {job.id: job for job in sched.get_jobs()}
+    assert set(jobs) == {"weekly_digest", "intel_retention", "source_polling"}
+    assert jobs["weekly_digest"].name == "Weekly Monday Digest"
     # Verify it's a cron trigger (implementation details may vary by APScheduler version)
     from apscheduler.triggers.cron import CronTrigger
-    assert isinstance(jobs[0].trigger, CronTrigger)
+    assert isinstance(jobs["weekly_digest"].trigger, CronTrigger)
+    assert isinstance(jobs["intel_retention"].trigger, CronTrigger)
 
 
 @pytest.mark.asyncio
@@ -36,7 +37,7 @@ async def test_weekly_digest_job_no_database():
 
 @pytest.mark.asyncio
 async def test_weekly_digest_job_runs_pipeline_and_send():
-    """_weekly_digest_job runs pipeline for all competitors then sends digest."""
+    """With source polling off, _weekly_digest_job runs pipeline for all competitors then sends digest."""
     mock_session = AsyncMock()
     mock_session.commit = AsyncMock()
     mock_session.refresh = AsyncMock()
@@ -47,22 +48,56 @@ async def test_weekly_digest_job_runs_pipeline_and_send():
         patch("scheduler.settings") as mock_settings,
         patch("scheduler.session_context") as mock_ctx,
         patch("scheduler.get_tracked_competitors_from_db", new_callable=AsyncMock) as mock_get_comp,
-        patch("scheduler.run_pipeline", new_callable=AsyncMock) as mock_pipeline,
+        patch("scheduler.run_streaming_pipeline", new_callable=AsyncMock) as mock_pipeline,
+        patch("scheduler.refresh_triage_model", new_callable=AsyncMock) as mock_refresh,
+        patch("scheduler.backfill_embeddings", new_callable=AsyncMock, return_value=0) as mock_backfill,
         patch("scheduler.create_and_send_digest", new_callable=AsyncMock) as mock_send,
     ):
         mock_settings.database_url = "postgresql://test"
-        mock_ctx.return_value.__aenter__ = AsyncMock(return_value=mock_session)
-        mock_ctx.return_value.__aexit__ = AsyncMock(return_value=None)
+        mock_settings.source_polling_enabled = False
+        events = []
+        mock_ctx.return_value.__aenter__ = AsyncMock(
+            side_effect=lambda: events.append("open") or mock_session
+        )
+        mock_ctx.return_value.__aexit__ = AsyncMock(side_effect=lambda *_: events.append("close"))
         mock_get_comp.return_value = [mock_comp]
-        mock_pipeline.return_value = []
+        mock_pipeline.side_effect = lambda _: events.append("pipeline") or [
+            PipelineResult("AppFolio", created=2)
+        ]
         mock_send.return_value = MagicMock(week_of="2025-02-24", recipient="jindou@happy.co")
 
         await _weekly_digest_job()
 
+        mock_refresh.assert_awaited_once_with(mock_session)
         mock_get_comp.assert_called_once_with(mock_session)
-        assert mock_pipeline.call_count == 1
-        mock_pipeline.assert_called_with(mock_comp, mock_session)
+        mock_pipeline.assert_awaited_once_with([mock_comp])
+        mock_backfill.assert_awaited_once_with(mock_session)
         mock_send.assert_called_once_with(mock_session, since_days=7)
+        # No session is held open while the pipeline runs
+        assert events == ["open", "close", "pipeline", "open", "close"]
+
+
+@pytest.mark.asyncio
+async def test_weekly_digest_job_reads_stored_intel_when_polling():
+    """With source polling on, the digest job doesn't scrape; it only builds and sends the digest."""
+    mock_session = AsyncMock()
+    with (
+        patch("scheduler.settings") as mock_settings,
+        patch("scheduler.session_context") as mock_ctx,
+        patch("scheduler.run_streaming_pipeline", new_callable=AsyncMock) as mock_pipeline,
+        patch("scheduler.refresh_triage_model", new_callable=AsyncMock),
+        patch("scheduler.backfill_embeddings", new_callable=AsyncMock, return_value=0),
+        patch("scheduler.create_and_send_digest", new_callable=AsyncMock) as mock_send,
+    ):
+        mock_settings.database_url = "postgresql://test"
+        mock_settings.source_polling_enabled = True
+        mock_ctx.return_value.__aenter__ = AsyncMock(return_value=mock_session)
+        mock_ctx.return_value.__aexit__ = AsyncMock(return_value=None)
+
+        await _weekly_digest_job()
+
+    mock_pipeline.assert_not_called()
+    mock_send.assert_called_once_with(mock_session, since_days=7)
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,23 @@
+"""Tests for scraping all of a competitor's sources."""
+
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+from scrapers.scrape_all import scrape_competitor
+
+
+@patch("scrapers.review_scraper._serpapi_request")
+def test_scrape_competitor_keeps_capterra_reviews_when_g2_fails(mock_serp):
+    """scrape_competitor stays best-effort: one failed search or source does not empty the result."""
+    capterra = {"organic_results": [{"title": "Capterra Review", "link": "https://capterra.com/1"}]}
+    mock_serp.side_effect = [httpx.ConnectError("unreachable"), capterra]
+    competitor = {"name": "AppFolio", "blog_url": None, "g2_slug": None, "capterra_slug": None}
+
+    with (
+        patch("scrapers.review_scraper.settings", MagicMock(serpapi_key="test")),
+        patch("scrapers.scrape_all.fetch_job_listings", side_effect=RuntimeError("Jobs scrape failed")),
+    ):
+        items = scrape_competitor(competitor)
+
+    assert [i["title"] for i in items] == ["Capterra Review"]
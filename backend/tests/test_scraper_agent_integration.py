@@ -3,6 +3,7 @@
 from unittest.mock import MagicMock, patch
 
 from agent import analyze_scraped_data
+from config import Settings
 from scrapers.blog_scraper import _parse_rss_feed
 from scrapers.competitor_config import COMPETITORS, get_competitor
 
@@ -43,9 +44,9 @@ def test_agent_accepts_scraper_format():
         )
     ]
     mock_client = MagicMock()
-    mock_client.messages.create.return_value = mock_response
+    mock_client.messages.with_raw_response.create.return_value.parse.return_value = mock_response
     with patch("agent.Anthropic", return_value=mock_client), patch(
-        "agent.settings", MagicMock(anthropic_api_key="test-key")
+        "agent.settings", Settings(_env_file=None, anthropic_api_key="test-key", agent_tiering_enabled=False)
     ):
         result = analyze_scraped_data(items, "AppFolio")
     assert len(result) == 1
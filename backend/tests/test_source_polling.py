@@ -0,0 +1,160 @@
+"""Tests for adaptive per-source polling."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from models import SourceSchedule
+from services.seen_items import item_key, take_unseen
+from services.source_polling import next_interval, poll_source
+
+HOUR = 3600
+_COMPETITOR = {"name": "AppFolio", "blog_url": "https://appfolio.com/blog", "g2_slug": None, "capterra_slug": None}
+
+
+def _schedule(seen_keys=(), interval_hours=24):
+    return SourceSchedule(
+        competitor_id=uuid4(),
+        source="blog",
+        interval_seconds=interval_hours * HOUR,
+        seen_keys=list(seen_keys),
+    )
+
+
+@pytest.fixture
+def poll_settings(make_settings):
+    return make_settings(source_poll_min_hours=6, source_poll_max_hours=336, source_poll_seen_keys=3)
+
+
+def _update_params(session, index=-1):
+    stmt = session.execute.await_args_list[index].args[0]
+    return stmt.compile(dialect=postgresql.dialect()).params
+
+
+def _session(seen_keys=None):
+    """Session whose SELECT of the schedule's seen_keys returns seen_keys."""
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = seen_keys
+    session = AsyncMock()
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+def test_next_interval_speeds_up_on_change_and_backs_off_within_bounds(poll_settings):
+    with patch("services.source_polling.settings", poll_settings):
+        assert next_interval(24 * HOUR, changed=True) == 12 * HOUR
+        assert next_interval(24 * HOUR, changed=False) == 36 * HOUR
+        assert next_interval(8 * HOUR, changed=True) == 6 * HOUR  # floor
+        assert next_interval(300 * HOUR, changed=False) == 336 * HOUR  # ceiling
+
+
+def test_item_key_prefers_url():
+    assert item_key({"url": "https://a", "title": "x"}) == item_key({"url": " https://a ", "title": "y"})
+    assert item_key({"title": "x", "snippet": "s"}) != item_key({"title": "x", "snippet": "t"})
+
+
+@pytest.mark.asyncio
+async def test_poll_source_queues_only_unseen_items_and_speeds_up(poll_settings, mock_session_context):
+    old = {"url": "https://a/old"}
+    new = {"url": "https://a/new"}
+    schedule = _schedule(seen_keys=[item_key(old)])
+    session = _session(schedule.seen_keys)
+
+    with (
+        patch("services.source_polling.settings", poll_settings),
+        patch("services.source_polling.session_context", mock_session_context(session)),
+        patch("services.source_polling.scrape_source", return_value=[old, new]),
+        patch("services.source_polling.enqueue_items", new_callable=AsyncMock) as mock_enqueue,
+    ):
+        queued = await poll_source(schedule, _COMPETITOR)
+
+    assert queued == 1
+    assert mock_enqueue.await_args.kwargs["items"] == [new]
+    assert mock_enqueue.await_args.kwargs["competitor"] == "AppFolio"
+    params = _update_params(session)
+    assert params["interval_seconds"] == 12 * HOUR
+    assert _update_params(session, 1)["seen_keys"] == [item_key(new), item_key(old)]
+    assert "last_changed_at" in str(session.execute.await_args_list[-1].args[0])
+    session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_poll_source_backs_off_when_nothing_is_new(poll_settings, mock_session_context):
+    item = {"url": "https://a/old"}
+    schedule = _schedule(seen_keys=[item_key(item)], interval_hours=48)
+    session = _session(schedule.seen_keys)
+
+    with (
+        patch("services.source_polling.settings", poll_settings),
+        patch("services.source_polling.session_context", mock_session_context(session)),
+        patch("services.source_polling.scrape_source", return_value=[item]),
+        patch("services.source_polling.enqueue_items", new_callable=AsyncMock) as mock_enqueue,
+    ):
+        assert await poll_source(schedule, _COMPETITOR) == 0
+
+    mock_enqueue.assert_not_called()
+    assert _update_params(session)["interval_seconds"] == 72 * HOUR
+    assert "last_changed_at" not in str(session.execute.await_args_list[-1].args[0])
+
+
+@pytest.mark.asyncio
+async def test_poll_source_failure_keeps_interval_and_records_error(poll_settings, mock_session_context):
+    schedule = _schedule()
+    session = AsyncMock()
+
+    with (
+        patch("services.source_polling.settings", poll_settings),
+        patch("services.source_polling.session_context", mock_session_context(session)),
+        patch("services.source_polling.scrape_source", side_effect=ValueError("SERPAPI_KEY missing")),
+    ):
+        assert await poll_source(schedule, _COMPETITOR) == 0
+
+    params = _update_params(session)
+    assert params["last_error"] == "SERPAPI_KEY missing"
+    assert "interval_seconds" not in params
+
+
+@pytest.mark.asyncio
+async def test_take_unseen_locks_schedule_and_records_new_keys(poll_settings):
+    seen = [item_key({"url": f"https://a/{i}"}) for i in range(3)]
+    items = [{"url": "https://a/0"}, {"url": "https://a/new"}, {"url": "https://a/new"}]
+    session = _session(seen)
+
+    with patch("services.seen_items.settings", poll_settings):
+        new = await take_unseen(session, uuid4(), "blog", items)
+
+    assert new == [{"url": "https://a/new"}]
+    select_sql = str(session.execute.await_args_list[0].args[0].compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE" in select_sql
+    assert _update_params(session)["seen_keys"] == [item_key(new[0]), *seen[:2]]  # capped at 3
+    session.commit.assert_not_called()
+
+    session = _session(None)  # no schedule row yet: nothing to filter against
+    assert await take_unseen(session, uuid4(), "jobs", items) == items
+    session.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_poll_source_queues_partial_results_and_records_the_failure(poll_settings, mock_session_context):
+    item = {"url": "https://capterra.com/1"}
+    schedule = _schedule()
+    session = _session([])
+
+    def scrape_source(competitor, source, errors):
+        errors.append("G2 reviews scrape failed: unreachable")
+        return [item]
+
+    with (
+        patch("services.source_polling.settings", poll_settings),
+        patch("services.source_polling.session_context", mock_session_context(session)),
+        patch("services.source_polling.scrape_source", scrape_source),
+        patch("services.source_polling.enqueue_items", new_callable=AsyncMock) as mock_enqueue,
+    ):
+        assert await poll_source(schedule, _COMPETITOR) == 1
+
+    assert mock_enqueue.await_args.kwargs["items"] == [item]
+    params = _update_params(session)
+    assert params["last_error"] == "G2 reviews scrape failed: unreachable"
+    assert params["interval_seconds"] == 12 * HOUR
@@ -0,0 +1,211 @@
+"""Tests for the streaming multi-competitor pipeline."""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from agent import IntelAnalysis
+from services.streaming_pipeline import run_streaming_pipeline
+
+
+def _competitor(name):
+    comp = MagicMock()
+    comp.name = name
+    return comp
+
+
+def _analysis(i):
+    return IntelAnalysis(
+        summary=f"Item {i}",
+        threat_level="LOW",
+        threat_reason="Minor",
+        happyco_response="Monitor",
+        signal_type="HIRING_SIGNAL",
+        confidence=0.5,
+    )
+
+
+async def _fake_stream(items, competitor):
+    for i in range(len(items)):
+        yield i, _analysis(i)
+
+
+@pytest.fixture
+def stages(make_settings, mock_session_context):
+    """Patch the pipeline's stage functions: stages(scrape, stream=..., insert=..., **settings overrides)."""
+    settings = make_settings(
+        triage_enabled=False,
+        pipeline_batch_items=2,
+        pipeline_stream_buffer=1,
+        pipeline_timeout_seconds=1,
+    )
+
+    @contextmanager
+    def patched(scrape, stream=_fake_stream, insert=None, **overrides):
+        with (
+            patch("services.streaming_pipeline.settings", settings.model_copy(update=overrides)),
+            patch("services.streaming_pipeline.session_context", mock_session_context()),
+            patch("services.streaming_pipeline.scrape_competitor", side_effect=scrape),
+            patch("services.streaming_pipeline._stream_analyses", stream),
+            patch(
+                "services.streaming_pipeline.get_cached_embeddings",
+                AsyncMock(side_effect=lambda session, texts: [[0.1] for _ in texts]),
+            ),
+            patch("services.streaming_pipeline._insert_intel_items", insert or AsyncMock()),
+        ):
+            yield
+
+    return patched
+
+
+@pytest.mark.asyncio
+async def test_streams_all_competitors_and_reports_each(stages):
+    def scrape(competitor):
+        if competitor.name == "Buildium":
+            raise RuntimeError("blocked")
+        return [{"url": f"https://{competitor.name}/{i}"} for i in range(5)]
+
+    insert = AsyncMock()
+    with stages(scrape, insert=insert):
+        results = await run_streaming_pipeline([_competitor("AppFolio"), _competitor("Buildium")])
+
+    assert [(r.competitor, r.created, r.error) for r in results] == [
+        ("AppFolio", 5, None),
+        ("Buildium", 0, "blocked"),
+    ]
+    written = [s for call in insert.await_args_list for s in call.args[1]]
+    assert len(written) == 5
+    assert all(s.embedding == [0.1] for s in written)
+
+
+@pytest.mark.asyncio
+async def test_stages_overlap_across_competitors(stages):
+    """A later scrape can wait on an earlier competitor's rows being written."""
+    first_written = threading.Event()
+
+    def scrape(competitor):
+        if competitor.name == "Buildium":
+            assert first_written.wait(timeout=5), "writes did not start before the last scrape finished"
+        return [{"url": "https://a"}]
+
+    async def insert(session, staged):
+        first_written.set()
+
+    with stages(scrape, insert=insert):
+        results = await asyncio.wait_for(
+            run_streaming_pipeline([_competitor("AppFolio"), _competitor("Buildium")]),
+            timeout=10,
+        )
+
+    assert [r.created for r in results] == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_stuck_analysis_batch_times_out_without_blocking_others(stages):
+    async def stream(items, competitor):
+        if competitor == "Yardi":
+            await asyncio.sleep(30)
+        async for pair in _fake_stream(items, competitor):
+            yield pair
+
+    with stages(lambda c: [{"url": "https://a"}], stream=stream):
+        results = await run_streaming_pipeline([_competitor("Yardi"), _competitor("AppFolio")])
+
+    assert results[0].error == "Timed out after 1s"
+    assert (results[1].created, results[1].error) == (1, None)
+
+
+@pytest.mark.asyncio
+async def test_competitor_failing_part_way_is_reported_as_partial(stages):
+    async def stream(items, competitor):
+        if items[0]["url"] == "https://a/2":  # the second batch hangs
+            await asyncio.sleep(30)
+        async for pair in _fake_stream(items, competitor):
+            yield pair
+
+    with stages(lambda c: [{"url": f"https://a/{i}"} for i in range(3)], stream=stream):
+        (result,) = await run_streaming_pipeline([_competitor("AppFolio")])
+
+    assert (result.created, result.error) == (2, "Timed out after 1s")
+    assert result.partial and not result.ok
+
+
+@pytest.mark.asyncio
+async def test_timed_out_scrape_thread_keeps_its_slot(stages):
+    """A scrape thread that outlives its timeout still counts against the scrape concurrency."""
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def scrape(competitor):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(1.3 if competitor.name == "Yardi" else 0)  # past the 1s timeout
+        with lock:
+            running -= 1
+        return [{"url": "https://a"}]
+
+    with stages(scrape, pipeline_scrape_concurrency=1):
+        results = await run_streaming_pipeline([_competitor("Yardi"), _competitor("AppFolio")])
+
+    assert peak == 1
+    assert results[0].error == "Timed out after 1s"
+    assert (results[1].created, results[1].error) == (1, None)
+
+
+@pytest.mark.asyncio
+async def test_slowly_streamed_analyses_are_embedded_and_written_in_batches(stages):
+    """Analyses trickling in are collected per analysis batch, not embedded and written one by one."""
+
+    async def slow_stream(items, competitor):
+        for i in range(len(items)):
+            await asyncio.sleep(0.05)
+            yield i, _analysis(i)
+
+    embed = AsyncMock(side_effect=lambda session, texts: [[0.1] for _ in texts])
+    insert = AsyncMock()
+    with (
+        stages(
+            lambda c: [{"url": f"https://a/{i}"} for i in range(25)],
+            stream=slow_stream,
+            insert=insert,
+            pipeline_batch_items=25,
+            pipeline_batch_wait_seconds=5,
+            pipeline_timeout_seconds=10,
+        ),
+        patch("services.streaming_pipeline.get_cached_embeddings", embed),
+    ):
+        (result,) = await run_streaming_pipeline([_competitor("AppFolio")])
+
+    assert result.created == 25
+    assert [len(c.args[1]) for c in embed.await_args_list] == [25]
+    assert [len(c.args[1]) for c in insert.await_args_list] == [25]
+
+
+@pytest.mark.asyncio
+async def test_batch_wait_bounds_how_long_rows_are_held(stages):
+    async def slow_stream(items, competitor):
+        for i in range(len(items)):
+            await asyncio.sleep(0.1)
+            yield i, _analysis(i)
+
+    embed = AsyncMock(side_effect=lambda session, texts: [[0.1] for _ in texts])
+    with (
+        stages(
+            lambda c: [{"url": f"https://a/{i}"} for i in range(6)],
+            stream=slow_stream,
+            pipeline_batch_items=6,
+            pipeline_batch_wait_seconds=0.25,
+            pipeline_timeout_seconds=10,
+        ),
+        patch("services.streaming_pipeline.get_cached_embeddings", embed),
+    ):
+        (result,) = await run_streaming_pipeline([_competitor("AppFolio")])
+
+    assert result.created == 6
+    assert 1 < embed.await_count < 6
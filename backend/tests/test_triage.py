@@ -0,0 +1,91 @@
+"""Tests for local pre-triage relevance scoring."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+import triage
+from triage import (
+    TriageModel,
+    ensure_triage_model,
+    refresh_triage_model,
+    rule_score,
+    score_items,
+    triage_items,
+)
+
+
+def test_rule_score_ranks_signal_above_noise():
+    """Signal keywords and HappyCo topics score above boilerplate and generic job posts."""
+    launch = rule_score("AppFolio launches AI maintenance automation for unit turns")
+    job = rule_score("Leasing Consultant - AppFolio")
+    fluff = rule_score("Top 10 tips for landlords. Subscribe to our newsletter")
+    assert launch > 0.5
+    assert job < 0.2
+    assert fluff < 0.2
+
+
+def test_triage_items_splits_by_threshold_best_first():
+    """triage_items returns priority items in order and low-priority items best-first."""
+    items = [
+        {"title": "Receptionist"},
+        {"title": "Buildium announces partnership with Zillow"},
+        {"title": "Quarterly recap"},
+    ]
+    priority, low = triage_items(items, threshold=0.5)
+    assert priority == [items[1]]
+    assert low == [items[2], items[0]]
+
+
+def test_items_without_keyword_hits_pass_default_threshold(make_settings):
+    """Plain complaints the rules have no keyword for still reach the agent."""
+    complaint = {"title": "AppFolio review", "snippet": "slow and hard to use"}
+    with patch("triage.settings", make_settings()):
+        priority, low = triage_items([complaint])
+    assert (priority, low) == ([complaint], [])
+
+
+def test_triage_model_learns_from_labels():
+    """The hashed model separates relevant from noise texts it was trained on."""
+    relevant = [f"centralized maintenance platform launch {i}" for i in range(30)]
+    noise = [f"office holiday party photos {i}" for i in range(30)]
+    model = TriageModel.fit(relevant + noise, [1] * 30 + [0] * 30)
+    probs = model.predict(["new centralized maintenance launch", "holiday party photos"])
+    assert probs[0] > 0.5 > probs[1]
+
+    scores = score_items([{"title": "holiday party photos"}], model)
+    assert scores[0] < rule_score("holiday party photos")
+
+
+@pytest.mark.asyncio
+async def test_refresh_triage_model_needs_enough_history():
+    """With too little stored intel, refresh keeps the rules-only scorer."""
+    result = MagicMock()
+    result.all.return_value = [MagicMock(summary="x", raw_content=None, threat_level="LOW")]
+    session = AsyncMock()
+    session.execute = AsyncMock(return_value=result)
+    assert await refresh_triage_model(session) is None
+
+
+@pytest.mark.asyncio
+async def test_ensure_triage_model_trains_once_per_max_age(make_settings, mock_session_context):
+    """Every process trains its own model, then reuses it until it is stale."""
+    clock = [0.0]
+
+    async def refresh(session):
+        triage._model_checked_at = clock[0]
+
+    with (
+        patch("triage.settings", make_settings(triage_model_max_age_hours=24)),
+        patch("triage.session_context", mock_session_context()),
+        patch("triage._model_checked_at", None),
+        patch("triage.time.monotonic", side_effect=lambda: clock[0]),
+        patch("triage.refresh_triage_model", AsyncMock(side_effect=refresh)) as mock_refresh,
+    ):
+        await ensure_triage_model()
+        clock[0] = 3600.0
+        await ensure_triage_model()
+        assert mock_refresh.await_count == 1
+        clock[0] = 25 * 3600.0
+        await ensure_triage_model()
+        assert mock_refresh.await_count == 2
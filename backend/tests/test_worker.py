@@ -0,0 +1,43 @@
+"""Tests for the worker entry point and running the API without the scheduler."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from config import Settings
+from main import app
+from worker import run_worker
+
+
+@pytest.mark.asyncio
+async def test_run_worker_runs_scheduler_until_stopped():
+    stop = asyncio.Event()
+    with (
+        patch("worker.settings", Settings(_env_file=None, database_url="postgresql://test")),
+        patch("worker.init_db") as mock_init,
+        patch("worker.start_scheduler") as mock_start,
+        patch("worker.shutdown_scheduler") as mock_shutdown,
+        patch("worker.run_queue_worker", new_callable=AsyncMock) as mock_queue,
+    ):
+        task = asyncio.create_task(run_worker(stop, stages=["analyze"]))
+        await asyncio.sleep(0)
+        mock_start.assert_called_once()
+        mock_shutdown.assert_not_called()
+        stop.set()
+        await task
+
+    mock_init.assert_called_once_with("postgresql://test")
+    mock_queue.assert_awaited_once_with(stop, ["analyze"])
+    mock_shutdown.assert_called_once()
+
+
+def test_api_starts_without_scheduler_when_disabled():
+    with (
+        patch("main.settings", Settings(_env_file=None, run_scheduler_in_api=False)),
+        patch("main.start_scheduler") as mock_start,
+    ):
+        with TestClient(app) as client:
+            assert client.get("/health").status_code == 200
+    mock_start.assert_not_called()
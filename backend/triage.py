@@ -0,0 +1,230 @@
+"""Local relevance pre-triage: score scraped items before they are sent to Claude.
+
+Combines keyword/regex rules per signal type with an optional hashed logistic-regression
+model trained from stored IntelItem history (HIGH/MEDIUM = relevant, LOW = noise).
+Each process that triages trains its own copy of the model (ensure_triage_model) and
+retrains it after settings.triage_model_max_age_hours.
+"""
+
+import asyncio
+import logging
+import re
+import time
+import zlib
+from typing import Any
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import session_context
+from models import IntelItem, IntelItemContent
+
+logger = logging.getLogger(__name__)
+
+# Keyword rules per signal type (matched against title + snippet + raw_content)
+SIGNAL_PATTERNS: dict[str, re.Pattern[str]] = {
+    name: re.compile(pattern, re.IGNORECASE)
+    for name, pattern in {
+        "PRODUCT_LAUNCH": r"\b(launch\w*|introduc\w*|announc\w*|unveil\w*|new feature|now available|release[sd]?|beta)\b",
+        "PRICING_CHANGE": r"\b(pric(e|es|ing)|per unit|per door|discount\w*|free trial|subscription|fees?)\b",
+        "MARKETING_SHIFT": r"\b(rebrand\w*|campaign|positioning|case stud(y|ies)|benchmark report)\b",
+        "HIRING_SIGNAL": r"\b(head of|director|vp|vice president|principal|staff engineer|machine learning|ai engineer|product manager)\b",
+        "CUSTOMER_COMPLAINT": r"\b(bug\w*|broken|terrible|frustrat\w*|outage|worst|cancel\w*|switch(ed|ing)? (to|from)|poor support)\b",
+        "PARTNERSHIP": r"\b(partner(s|ship|ships|ed)?|integrat(e|es|ed|ion|ions)|acqui(re|res|red|sition)|marketplace|open api)\b",
+    }.items()
+}
+
+# Topics that touch HappyCo differentiators (turn time, centralized maintenance, AI, marketplace)
+HAPPYCO_PATTERN = re.compile(
+    r"\b(maintenance|work orders?|unit turns?|make[- ]ready|inspections?|centraliz\w*|ai|automation|renewals?|resident satisfaction)\b",
+    re.IGNORECASE,
+)
+
+# Boilerplate, SEO fluff, listing pages and generic job posts
+NOISE_PATTERN = re.compile(
+    r"\b(cookie policy|privacy policy|subscribe to our newsletter|all rights reserved|top \d+ (tips|ways)|"
+    r"ultimate guide|read more|leasing (consultant|agent)|receptionist|intern(ship)?|"
+    r"sales development representative|customer service representative|see all reviews)\b",
+    re.IGNORECASE,
+)
+
+N_FEATURES = 2**18
+MIN_TRAINING_ITEMS = 50
+_BIAS_FEATURE = 0
+
+NEUTRAL_SCORE = 0.25  # Rule score with no hits: above the default threshold, so only noise drops an item
+
+_model: "TriageModel | None" = None
+_model_checked_at: float | None = None  # time.monotonic() of this process's last training attempt
+
+
+def _item_text(item: dict[str, Any]) -> str:
+    return " ".join(str(item.get(k) or "") for k in ("title", "snippet", "raw_content"))
+
+
+def rule_score(text: str) -> float:
+    """
+    Score 0..1 from keyword rules: signal hits and HappyCo topics add, noise subtracts.
+
+    Keywords cannot cover every phrasing of a real signal (e.g. "slow and hard to use"),
+    so an item without hits starts at NEUTRAL_SCORE and is kept; the rules only push
+    out items carrying noise markers.
+    """
+    signal_hits = sum(1 for p in SIGNAL_PATTERNS.values() if p.search(text))
+    score = NEUTRAL_SCORE + 0.2 * min(signal_hits, 3)
+    if HAPPYCO_PATTERN.search(text):
+        score += 0.2
+    if NOISE_PATTERN.search(text):
+        score -= 0.25
+    return float(min(max(score, 0.0), 1.0))
+
+
+def _featurize(texts: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Hash unigrams and bigrams into N_FEATURES buckets (flat sparse rows).
+
+    Returns (indices, values, offsets): row r owns indices[offsets[r]:offsets[r+1]].
+    Every row carries a bias feature, so no row is empty.
+    """
+    indices: list[int] = []
+    values: list[float] = []
+    offsets = [0]
+    for text in texts:
+        tokens = re.findall(r"[a-z0-9]+", text.lower())
+        counts: dict[int, float] = {_BIAS_FEATURE: 1.0}
+        for gram in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:], strict=False)]:
+            h = zlib.crc32(gram.encode()) % (N_FEATURES - 1) + 1
+            counts[h] = counts.get(h, 0.0) + 1.0
+        row = np.log1p(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+        row /= np.linalg.norm(row)
+        indices.extend(counts.keys())
+        values.extend(row.tolist())
+        offsets.append(len(indices))
+    return (
+        np.asarray(indices, dtype=np.int64),
+        np.asarray(values, dtype=np.float64),
+        np.asarray(offsets, dtype=np.int64),
+    )
+
+
+class TriageModel:
+    """Hashed logistic-regression relevance model."""
+
+    def __init__(self, weights: np.ndarray):
+        self.weights = weights
+
+    def predict(self, texts: list[str]) -> np.ndarray:
+        """Probability of relevance per text."""
+        if not texts:
+            return np.zeros(0)
+        idx, val, offsets = _featurize(texts)
+        z = np.add.reduceat(self.weights[idx] * val, offsets[:-1])
+        return 1.0 / (1.0 + np.exp(-z))
+
+    @classmethod
+    def fit(
+        cls,
+        texts: list[str],
+        labels: list[int],
+        *,
+        epochs: int = 200,
+        learning_rate: float = 2.0,
+        l2: float = 1e-4,
+    ) -> "TriageModel":
+        """Full-batch gradient descent on the hashed features (class-balanced)."""
+        idx, val, offsets = _featurize(texts)
+        y = np.asarray(labels, dtype=np.float64)
+        lengths = np.diff(offsets)
+        pos = max(y.sum(), 1.0)
+        neg = max(len(y) - y.sum(), 1.0)
+        sample_weight = np.where(y == 1, len(y) / (2 * pos), len(y) / (2 * neg))
+        w = np.zeros(N_FEATURES)
+        for _ in range(epochs):
+            z = np.add.reduceat(w[idx] * val, offsets[:-1])
+            p = 1.0 / (1.0 + np.exp(-z))
+            g = (p - y) * sample_weight
+            grad = np.bincount(idx, weights=val * np.repeat(g, lengths), minlength=N_FEATURES)
+            w -= learning_rate * (grad / len(y) + l2 * w)
+        return cls(w)
+
+
+def get_triage_model() -> TriageModel | None:
+    """Return the model trained by refresh_triage_model, if any."""
+    return _model
+
+
+async def refresh_triage_model(session: AsyncSession, *, limit: int = 5000) -> TriageModel | None:
+    """
+    Retrain the relevance model from stored intel (HIGH/MEDIUM = relevant, LOW = noise).
+
+    Keeps the rules-only scorer when history is too small or has a single class.
+    """
+    global _model, _model_checked_at
+    _model_checked_at = time.monotonic()
+    stmt = (
+        select(IntelItem.summary, IntelItemContent.raw_content, IntelItem.threat_level)
+        .outerjoin(IntelItemContent, IntelItemContent.item_id == IntelItem.id)
+        .order_by(IntelItem.detected_at.desc())
+        .limit(limit)
+    )
+    rows = (await session.execute(stmt)).all()
+    texts = [f"{r.summary or ''} {r.raw_content or ''}" for r in rows]
+    labels = [1 if (r.threat_level or "").upper() in ("HIGH", "MEDIUM") else 0 for r in rows]
+    if len(rows) < MIN_TRAINING_ITEMS or len(set(labels)) < 2:
+        logger.info("Triage model not trained: %d labeled items", len(rows))
+        return _model
+    _model = await asyncio.to_thread(TriageModel.fit, texts, labels)
+    logger.info("Triage model trained on %d items", len(rows))
+    return _model
+
+
+async def ensure_triage_model() -> TriageModel | None:
+    """
+    Train this process's model if it has not tried yet or its last try is older than
+    settings.triage_model_max_age_hours. Uses its own session; on failure the current
+    model (or the rules alone) stays in use.
+    """
+    max_age = settings.triage_model_max_age_hours * 3600
+    if _model_checked_at is not None and time.monotonic() - _model_checked_at < max_age:
+        return _model
+    try:
+        async with session_context() as session:
+            return await refresh_triage_model(session)
+    except Exception as e:
+        logger.warning("Triage model refresh failed; using %s: %s", "previous model" if _model else "rules only", e)
+        return _model
+
+
+def score_items(items: list[dict[str, Any]], model: TriageModel | None = None) -> list[float]:
+    """Relevance score per item: rules alone, or averaged with the trained model."""
+    texts = [_item_text(it) for it in items]
+    rules = np.asarray([rule_score(t) for t in texts])
+    model = model or _model
+    if model is None or not texts:
+        return rules.tolist()
+    return ((rules + model.predict(texts)) / 2).tolist()
+
+
+def triage_items(
+    items: list[dict[str, Any]],
+    *,
+    threshold: float | None = None,
+    model: TriageModel | None = None,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Split items into (priority, low_priority) by relevance score.
+
+    Low-priority items are ordered best-first; callers drop them or analyze them
+    in a separate, later lane.
+    """
+    if threshold is None:
+        threshold = settings.triage_threshold
+    scores = score_items(items, model)
+    priority = [it for it, s in zip(items, scores, strict=True) if s >= threshold]
+    low = sorted(
+        ((s, i) for i, s in enumerate(scores) if s < threshold),
+        key=lambda pair: -pair[0],
+    )
+    return priority, [items[i] for _, i in low]
@@ -0,0 +1,76 @@
+"""Background worker entry point: runs the scheduler and the pipeline queue outside the API.
+
+Scraping, Playwright and agent calls in scheduled runs compete with API requests for
+the event loop and thread pool when they share a process. Run the worker separately
+and set RUN_SCHEDULER_IN_API=false on the API so the two can be sized independently.
+
+The worker also consumes the durable pipeline queue (services.pipeline_queue). Each
+stage can be scaled on its own by running workers for a subset of stages, e.g. extra
+analyze workers without the scheduler.
+
+Usage (from backend/):
+    python -m worker
+    python -m worker --stages analyze --no-scheduler
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+from collections.abc import Iterable
+
+from config import settings, validate_required_env
+from database import init_db
+from scheduler import shutdown_scheduler, start_scheduler
+from services.pipeline_queue import STAGES, run_queue_worker
+
+logger = logging.getLogger(__name__)
+
+
+async def run_worker(
+    stop: asyncio.Event | None = None,
+    *,
+    stages: Iterable[str] = STAGES,
+    scheduler: bool = True,
+) -> None:
+    """Run the scheduler and queue consumers for stages until stop is set (or SIGINT/SIGTERM)."""
+    validate_required_env()
+    if settings.database_url:
+        init_db(settings.database_url)
+
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows event loops
+            pass
+
+    stages = list(stages)
+    if scheduler:
+        start_scheduler()
+    consumer = None
+    if settings.database_url and stages:
+        consumer = asyncio.create_task(run_queue_worker(stop, stages))
+    logger.info("Worker started (scheduler %s, queue stages: %s)", "on" if scheduler else "off", ", ".join(stages) or "none")
+    try:
+        await stop.wait()
+    finally:
+        if consumer is not None:
+            await consumer  # finishes the jobs it has claimed
+        if scheduler:
+            shutdown_scheduler()
+        logger.info("Worker stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="*", choices=STAGES, default=list(STAGES), help="Queue stages to consume")
+    parser.add_argument("--no-scheduler", action="store_true", help="Don't run scheduled jobs in this worker")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(run_worker(stages=args.stages, scheduler=not args.no_scheduler))
+
+
+if __name__ == "__main__":
+    main()